@@ -0,0 +1,338 @@
+"""
+Module with static analyses over the method bodies of a loaded program.
+
+These run on the ClassDefs produced by the interpreter and never execute any Brewin code.
+"""
+
+import operator
+
+from intbase import InterpreterBase
+from type_valuev2 import Type
+from astv2 import (NAME_KIND, CONST_KIND, BINARY_KIND, UNARY_KIND, child_statements,
+                   statement_expressions, sub_expressions)
+
+
+SHORT_CIRCUIT_OPS = ("&", "|")
+
+# result types of the binary operators, keyed by the (primitive) type of both operands
+__ARITHMETIC_OPS = {"+", "-", "*", "/", "%"}
+__COMPARISON_OPS = {"==", "!=", "<", "<=", ">", ">="}
+__DIVISION_OPS = {"/", "%"}  # the only int operators that can raise, on a zero divisor
+BINARY_RESULT_TYPES = {
+    InterpreterBase.INT_DEF: {
+        **{op: InterpreterBase.INT_DEF for op in __ARITHMETIC_OPS},
+        **{op: InterpreterBase.BOOL_DEF for op in __COMPARISON_OPS},
+    },
+    InterpreterBase.STRING_DEF: {
+        "+": InterpreterBase.STRING_DEF,
+        **{op: InterpreterBase.BOOL_DEF for op in __COMPARISON_OPS},
+    },
+    InterpreterBase.BOOL_DEF: {
+        op: InterpreterBase.BOOL_DEF for op in ("&", "|", "==", "!=")
+    },
+}
+
+__PRIMITIVE_TYPES = {InterpreterBase.INT_DEF, InterpreterBase.BOOL_DEF, InterpreterBase.STRING_DEF}
+
+COUNTER_COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "!=": operator.ne,
+}
+
+LITERAL_TYPE_NAMES = {
+    Type.INT: InterpreterBase.INT_DEF,
+    Type.STRING: InterpreterBase.STRING_DEF,
+    Type.BOOL: InterpreterBase.BOOL_DEF,
+}
+
+
+def find_short_circuit_hazards(class_index):
+    """
+    Finds every & and | expression whose result could differ between eager and short-circuit
+    evaluation. That is the case whenever the right-hand side could have a side effect (a method
+    call or a new) or could raise an error that eager evaluation would report.
+    Returns a list of (line_num, description) tuples in source order; the line is that of the
+    enclosing statement.
+    """
+    hazards = []
+    for class_def in class_index.values():
+        fields = {field.field_name: field.field_type for field in class_def.get_fields()}
+        for method in class_def.get_methods().values():
+            scopes = [fields, dict(method.formal_params)]
+            __check_statement(method.code, scopes, hazards)
+    hazards.sort(key=lambda hazard: hazard[0] if hazard[0] is not None else -1)
+    return hazards
+
+
+class CounterLoop:
+    """
+    Plan for a counter-style while loop, e.g., (while (< i n) (begin ... (set i (+ i 1)))):
+    an integer counter compared against a bound and stepped by a constant in the loop body.
+
+    The bound is either an int literal (bound_literal) or a variable (bound_name); a variable
+    bound is loop-invariant if the body can't assign to it.
+    """
+
+    __slots__ = ("counter", "compare", "bound_literal", "bound_name", "invariant_bound")
+
+    def __init__(self, counter, compare, bound_literal, bound_name, invariant_bound):
+        self.counter = counter
+        self.compare = compare
+        self.bound_literal = bound_literal
+        self.bound_name = bound_name
+        self.invariant_bound = invariant_bound
+
+
+def find_counter_loops(class_index):
+    """
+    Recognizes counter-style while loops in every method body and attaches a CounterLoop plan
+    to each matching WhileNode. Returns the number of loops recognized.
+    """
+    count = 0
+    for class_def in class_index.values():
+        for method in class_def.get_methods().values():
+            count += plan_counter_loops(method)
+    return count
+
+
+def plan_counter_loops(method):
+    """
+    Like find_counter_loops, for the body of a single method.
+    """
+    return __find_counter_loops(method.code, [dict(method.formal_params)])
+
+
+def __find_counter_loops(code, local_scopes):
+    count = 0
+    if code.kind == InterpreterBase.LET_DEF:
+        local_scopes = local_scopes + [{name: var_type for var_type, name, _ in code.variables}]
+    if code.kind == InterpreterBase.WHILE_DEF:
+        code.plan = __plan_counter_loop(code.condition, code.body, local_scopes)
+        if code.plan is not None:
+            count += 1
+    for statement in child_statements(code):
+        count += __find_counter_loops(statement, local_scopes)
+    return count
+
+
+def __plan_counter_loop(condition, body, local_scopes):
+    if condition.kind != BINARY_KIND:
+        return None
+    compare = COUNTER_COMPARISONS.get(condition.operator)
+    if compare is None or condition.left.kind != NAME_KIND:
+        return None  # the counter must be a variable
+    counter = condition.left.name
+    # the body must step the counter by a constant at its top level
+    statements = body.statements if body.kind == InterpreterBase.BEGIN_DEF else [body]
+    if not any(__is_constant_step(statement, counter) for statement in statements):
+        return None
+    bound = condition.right
+    if bound.kind == CONST_KIND:
+        if bound.value.type() != Type.INT:
+            return None
+        return CounterLoop(counter, compare, bound.value.value(), None, True)
+    if bound.kind != NAME_KIND:
+        return None
+    assigned = set()
+    __collect_assigned(body, assigned)
+    is_local = any(bound.name in scope for scope in local_scopes)
+    # a field bound could also be changed by any method the body calls
+    invariant = bound.name not in assigned and (is_local or not __statement_has_side_effects(body))
+    return CounterLoop(counter, compare, None, bound.name, invariant)
+
+
+def __is_constant_step(statement, counter):
+    # (set i (+ i c)) or (set i (- i c)) with an int literal c
+    if statement.kind != InterpreterBase.SET_DEF or statement.name != counter:
+        return False
+    expr = statement.expr
+    if expr.kind != BINARY_KIND or expr.operator not in ("+", "-"):
+        return False
+    return (expr.left.kind == NAME_KIND and expr.left.name == counter
+            and expr.right.kind == CONST_KIND and expr.right.value.type() == Type.INT)
+
+
+def __collect_assigned(code, assigned):
+    # names targeted by set/inputi/inputs anywhere in a statement
+    if code.kind in (InterpreterBase.SET_DEF, InterpreterBase.INPUT_INT_DEF,
+                     InterpreterBase.INPUT_STRING_DEF):
+        assigned.add(code.name)
+    for statement in child_statements(code):
+        __collect_assigned(statement, assigned)
+
+
+def __statement_has_side_effects(code):
+    if any(has_side_effects(expr) for expr in statement_expressions(code)):
+        return True
+    return any(__statement_has_side_effects(statement) for statement in child_statements(code))
+
+
+class Accessor:
+    """
+    Plan for inlining a trivial getter, (method int get_x () (return x)), or setter,
+    (method void set_x ((int v)) (set x v)), at its call sites (see ObjectDef.invoke_method).
+
+    param_name is None for a getter. field_type is the type the field must have for the inlined
+    access to behave exactly like the call: the return type of a getter, whose result then
+    needs no return type check, or the (primitive) parameter type of a setter, whose argument
+    then needs no assignment check. The field itself is only known once the method runs on an
+    object, so that check is done at run time.
+    """
+
+    __slots__ = ("field_name", "param_name", "field_type")
+
+    def __init__(self, field_name, param_name, field_type):
+        self.field_name = field_name
+        self.param_name = param_name
+        self.field_type = field_type
+
+
+def find_accessor(method):
+    """
+    Returns an Accessor for a method whose body is just a getter's or setter's, or None.
+    """
+    code = method.code
+    params = method.formal_params
+    if code.kind == InterpreterBase.RETURN_DEF:
+        if params or code.expr is None or code.expr.kind != NAME_KIND:
+            return None
+        return Accessor(code.expr.name, None, method.return_type)
+    if code.kind == InterpreterBase.SET_DEF:
+        if len(params) != 1 or method.return_type != InterpreterBase.VOID_DEF:
+            return None
+        (param_name, param_type), = params.items()
+        if (code.expr.kind != NAME_KIND or code.expr.name != param_name
+                or code.name == param_name or param_type not in __PRIMITIVE_TYPES):
+            return None
+        return Accessor(code.name, param_name, param_type)
+    return None
+
+
+def find_pure_methods(class_index):
+    """
+    Finds the methods whose result depends only on their arguments: no print, inputi or inputs,
+    no new, no set or read of a field, and only calls to pure methods on me or super.
+    Since a call through me can reach any override, a call to method name m only counts as pure
+    if every method named m in the program is pure.
+    Returns the set of pure MethodDefs; only those with a primitive return type are included.
+    """
+    primitives = {InterpreterBase.INT_DEF, InterpreterBase.BOOL_DEF, InterpreterBase.STRING_DEF}
+    methods = [method for class_def in class_index.values()
+               for method in class_def.get_methods().values()]
+    # candidate methods that are pure on their own, with the method names they call
+    candidates = {}
+    for method in methods:
+        callees = set()
+        if __is_locally_pure(method.code, [set(method.formal_params)], callees):
+            candidates[method] = callees
+    # drop methods that may call an impure method until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        pure_names = {method.method_name for method in candidates}
+        impure_names = {method.method_name for method in methods if method not in candidates}
+        for method, callees in list(candidates.items()):
+            if any(name not in pure_names or name in impure_names for name in callees):
+                del candidates[method]
+                changed = True
+    return {method for method in candidates if method.return_type in primitives}
+
+
+def __is_locally_pure(code, scopes, callees):
+    # scopes is a list of sets of local variable names (params, let variables)
+    kind = code.kind
+    if kind not in (InterpreterBase.BEGIN_DEF, InterpreterBase.LET_DEF, InterpreterBase.SET_DEF,
+                    InterpreterBase.IF_DEF, InterpreterBase.WHILE_DEF,
+                    InterpreterBase.RETURN_DEF, InterpreterBase.CALL_DEF):
+        return False  # print, inputi, inputs or an invalid statement
+    if kind == InterpreterBase.LET_DEF:
+        scopes = scopes + [{name for _, name, _ in code.variables}]
+    if kind == InterpreterBase.SET_DEF and not any(code.name in scope for scope in scopes):
+        return False  # setting a field
+    if not all(__is_pure_expression(expr, scopes, callees)
+               for expr in statement_expressions(code)):
+        return False
+    return all(__is_locally_pure(statement, scopes, callees)
+               for statement in child_statements(code))
+
+
+def __is_pure_expression(expr, scopes, callees):
+    kind = expr.kind
+    if kind == NAME_KIND:
+        return any(expr.name in scope for scope in scopes)  # reading a field isn't pure
+    if kind == CONST_KIND:
+        return True
+    if kind == InterpreterBase.CALL_DEF:
+        if expr.target.kind not in (InterpreterBase.ME_DEF, InterpreterBase.SUPER_DEF):
+            return False
+        callees.add(expr.method_name)
+        return all(__is_pure_expression(arg, scopes, callees) for arg in expr.args)
+    if kind in (BINARY_KIND, UNARY_KIND):
+        return all(__is_pure_expression(sub_expr, scopes, callees)
+                   for sub_expr in sub_expressions(expr))
+    return False  # me as a value, new, or an invalid expression
+
+
+def static_type(expr, scopes):
+    """
+    Returns the type name an expression is guaranteed to evaluate to without raising an error,
+    or None if that can't be determined statically (e.g., it contains a call).
+    scopes is a list of {variable name: type name} maps, innermost last.
+    """
+    kind = expr.kind
+    if kind == NAME_KIND:
+        for scope in reversed(scopes):
+            if expr.name in scope:
+                return scope[expr.name]
+        return None
+    if kind == CONST_KIND:
+        return LITERAL_TYPE_NAMES.get(expr.value.type())
+    if kind == BINARY_KIND:
+        left = static_type(expr.left, scopes)
+        right = static_type(expr.right, scopes)
+        if left is None or left != right or left not in BINARY_RESULT_TYPES:
+            return None
+        if expr.operator in __DIVISION_OPS and not __is_nonzero_literal(expr.right):
+            return None  # dividing by zero raises
+        return BINARY_RESULT_TYPES[left].get(expr.operator)
+    if kind == UNARY_KIND:
+        if static_type(expr.operand, scopes) == InterpreterBase.BOOL_DEF:
+            return InterpreterBase.BOOL_DEF
+    return None
+
+
+def __is_nonzero_literal(expr):
+    return expr.kind == CONST_KIND and expr.value.type() == Type.INT and expr.value.value() != 0
+
+
+def has_side_effects(expr):
+    """
+    True if evaluating the expression could call a method or create an object.
+    """
+    if expr.kind in (InterpreterBase.CALL_DEF, InterpreterBase.NEW_DEF):
+        return True
+    return any(has_side_effects(sub_expr) for sub_expr in sub_expressions(expr))
+
+
+def __check_statement(code, scopes, hazards):
+    if code.kind == InterpreterBase.LET_DEF:
+        scopes = scopes + [{name: var_type for var_type, name, _ in code.variables}]
+    for expr in statement_expressions(code):
+        __check_expression(expr, scopes, code.line_num, hazards)
+    for statement in child_statements(code):
+        __check_statement(statement, scopes, hazards)
+
+
+def __check_expression(expr, scopes, line_num, hazards):
+    if expr.kind == BINARY_KIND and expr.operator in SHORT_CIRCUIT_OPS:
+        if has_side_effects(expr.right):
+            hazards.append(
+                (line_num, f"right operand of {expr.operator} calls a method or creates an object"))
+        elif static_type(expr.right, scopes) != InterpreterBase.BOOL_DEF:
+            hazards.append(
+                (line_num, f"right operand of {expr.operator} may raise an error"))
+    for sub_expr in sub_expressions(expr):
+        __check_expression(sub_expr, scopes, line_num, hazards)
@@ -0,0 +1,479 @@
+"""
+Module with the compact AST used to execute method bodies.
+
+BParser.parse produces nested lists in which every token is a StringWithLineNumber. Once a
+class is loaded, its method bodies are converted into the __slots__ node classes below:
+identifiers are interned plain strings, literals are pre-built Values, and line numbers are
+only kept on statements and calls, which is where errors are reported. Nothing holds on to the
+parse tree afterwards, so it is freed as soon as loading finishes.
+
+Each node has a class-level `kind`; statement kinds are the keywords from InterpreterBase so
+ObjectDef can dispatch on them just like it did on the first token of a parsed statement.
+"""
+
+import sys
+
+from intbase import InterpreterBase
+from type_valuev2 import create_value
+
+
+NAME_KIND = "name"
+CONST_KIND = "const"
+BINARY_KIND = "binary"
+UNARY_KIND = "unary"
+INVALID_KIND = "invalid"
+
+BINARY_OPERATORS = frozenset(["+", "-", "*", "/", "%", "==", "!=", "<", "<=", ">", ">=", "&", "|"])
+UNARY_OPERATORS = frozenset(["!"])
+
+
+def intern_token(token):
+    """
+    Returns a token as an interned plain str, dropping its line number.
+    """
+    return sys.intern(str(token))
+
+
+class Node:
+    """
+    Base class for all AST nodes; renders nodes back into s-expressions for tracing and errors.
+    """
+
+    __slots__ = ()
+    kind = None
+
+    def __repr__(self):
+        return to_source(self)
+
+
+# statements
+
+
+class BeginNode(Node):
+    """(begin statement1 statement2 ...)"""
+
+    __slots__ = ("line_num", "statements")
+    kind = InterpreterBase.BEGIN_DEF
+
+    def __init__(self, line_num, statements):
+        self.line_num = line_num
+        self.statements = statements
+
+
+class SetNode(Node):
+    """(set name expression)"""
+
+    __slots__ = ("line_num", "name", "expr")
+    kind = InterpreterBase.SET_DEF
+
+    def __init__(self, line_num, name, expr):
+        self.line_num = line_num
+        self.name = name
+        self.expr = expr
+
+
+class IfNode(Node):
+    """(if condition then_statement [else_statement])"""
+
+    __slots__ = ("line_num", "condition", "then_statement", "else_statement")
+    kind = InterpreterBase.IF_DEF
+
+    def __init__(self, line_num, condition, then_statement, else_statement):
+        self.line_num = line_num
+        self.condition = condition
+        self.then_statement = then_statement
+        self.else_statement = else_statement
+
+
+class WhileNode(Node):
+    """
+    (while condition body)
+    plan holds an analysisv2.CounterLoop if the loop was recognized as a counter loop.
+    """
+
+    __slots__ = ("line_num", "condition", "body", "plan")
+    kind = InterpreterBase.WHILE_DEF
+
+    def __init__(self, line_num, condition, body):
+        self.line_num = line_num
+        self.condition = condition
+        self.body = body
+        self.plan = None
+
+
+class ReturnNode(Node):
+    """
+    (return [expression])
+    tail is set if nothing in the method can run after this return (see build_statement).
+    """
+
+    __slots__ = ("line_num", "expr", "tail")
+    kind = InterpreterBase.RETURN_DEF
+
+    def __init__(self, line_num, expr, tail=False):
+        self.line_num = line_num
+        self.expr = expr
+        self.tail = tail
+
+
+class InputNode(Node):
+    """(inputs name) or (inputi name)"""
+
+    __slots__ = ("line_num", "name", "kind")
+
+    def __init__(self, line_num, name, kind):
+        self.line_num = line_num
+        self.name = name
+        self.kind = kind
+
+
+class PrintNode(Node):
+    """(print expression1 expression2 ...)"""
+
+    __slots__ = ("line_num", "exprs")
+    kind = InterpreterBase.PRINT_DEF
+
+    def __init__(self, line_num, exprs):
+        self.line_num = line_num
+        self.exprs = exprs
+
+
+class LetNode(Node):
+    """
+    (let ((type1 name1 value1) ...) statement1 statement2 ...)
+    variables is a list of (type, name, Value) triples; the Value is None for an invalid literal.
+    """
+
+    __slots__ = ("line_num", "variables", "statements")
+    kind = InterpreterBase.LET_DEF
+
+    def __init__(self, line_num, variables, statements):
+        self.line_num = line_num
+        self.variables = variables
+        self.statements = statements
+
+
+class InvalidStatementNode(Node):
+    """A malformed or unknown statement; executing it is a syntax error."""
+
+    __slots__ = ("line_num", "keyword")
+    kind = INVALID_KIND
+
+    def __init__(self, line_num, keyword):
+        self.line_num = line_num
+        self.keyword = keyword
+
+
+# expressions (a call is both a statement and an expression)
+
+
+class CallNode(Node):
+    """
+    (call target method_name arg1 arg2 ...)
+    cache holds the call site's inline_cachev2.InlineCache.
+    """
+
+    __slots__ = ("line_num", "target", "method_name", "args", "cache")
+    kind = InterpreterBase.CALL_DEF
+
+    def __init__(self, line_num, target, method_name, args):
+        self.line_num = line_num
+        self.target = target
+        self.method_name = method_name
+        self.args = args
+        self.cache = None
+
+    def __reduce__(self):
+        # the inline cache is run-time state; a pickled program (see compilev2) starts cold
+        return CallNode, (self.line_num, self.target, self.method_name, self.args)
+
+
+class NameNode(Node):
+    """A reference to a parameter, local variable or field."""
+
+    __slots__ = ("name",)
+    kind = NAME_KIND
+
+    def __init__(self, name):
+        self.name = name
+
+
+class ConstNode(Node):
+    """A literal, e.g., 5, "abc", true or null, with its pre-built Value."""
+
+    __slots__ = ("token", "value")
+    kind = CONST_KIND
+
+    def __init__(self, token, value):
+        self.token = token
+        self.value = value
+
+
+class MeNode(Node):
+    """me"""
+
+    __slots__ = ()
+    kind = InterpreterBase.ME_DEF
+
+
+class SuperNode(Node):
+    """super, only valid as the target of a call"""
+
+    __slots__ = ()
+    kind = InterpreterBase.SUPER_DEF
+
+
+class BinaryOpNode(Node):
+    """
+    (operator left right)
+    quickened holds the site's quickenv2 fast path once it has been specialized.
+    """
+
+    __slots__ = ("operator", "left", "right", "quickened")
+    kind = BINARY_KIND
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+        self.quickened = None
+
+    def __reduce__(self):
+        # the quickened fast path is run-time state and not picklable; start unspecialized
+        return BinaryOpNode, (self.operator, self.left, self.right)
+
+
+class UnaryOpNode(Node):
+    """(operator operand)"""
+
+    __slots__ = ("operator", "operand")
+    kind = UNARY_KIND
+
+    def __init__(self, operator, operand):
+        self.operator = operator
+        self.operand = operand
+
+
+class NewNode(Node):
+    """(new class_name)"""
+
+    __slots__ = ("class_name",)
+    kind = InterpreterBase.NEW_DEF
+
+    def __init__(self, class_name):
+        self.class_name = class_name
+
+
+class InvalidExpressionNode(Node):
+    """A malformed expression, e.g., (+ 1); evaluating it is a syntax error."""
+
+    __slots__ = ("items",)
+    kind = INVALID_KIND
+
+    def __init__(self, items):
+        self.items = items
+
+
+# walking the tree
+
+
+def child_statements(statement):
+    """
+    Returns the statements nested directly inside a statement node.
+    """
+    kind = statement.kind
+    if kind in (InterpreterBase.BEGIN_DEF, InterpreterBase.LET_DEF):
+        return statement.statements
+    if kind == InterpreterBase.IF_DEF:
+        if statement.else_statement is None:
+            return [statement.then_statement]
+        return [statement.then_statement, statement.else_statement]
+    if kind == InterpreterBase.WHILE_DEF:
+        return [statement.body]
+    return []
+
+
+def statement_expressions(statement):
+    """
+    Returns the expressions a statement node evaluates itself (not those of nested statements).
+    A call statement is its own expression.
+    """
+    kind = statement.kind
+    if kind == InterpreterBase.SET_DEF:
+        return [statement.expr]
+    if kind in (InterpreterBase.IF_DEF, InterpreterBase.WHILE_DEF):
+        return [statement.condition]
+    if kind == InterpreterBase.RETURN_DEF:
+        return [] if statement.expr is None else [statement.expr]
+    if kind == InterpreterBase.PRINT_DEF:
+        return statement.exprs
+    if kind == InterpreterBase.CALL_DEF:
+        return [statement]
+    return []
+
+
+def sub_expressions(expr):
+    """
+    Returns the operands of an expression node.
+    """
+    kind = expr.kind
+    if kind == BINARY_KIND:
+        return [expr.left, expr.right]
+    if kind == UNARY_KIND:
+        return [expr.operand]
+    if kind == InterpreterBase.CALL_DEF:
+        return [expr.target] + expr.args
+    if isinstance(expr, InvalidExpressionNode):
+        return expr.items
+    return []
+
+
+# building nodes from the parse tree
+
+
+def build_statement(code, tail=False):
+    """
+    Converts a parsed statement (nested lists of StringWithLineNumber) into a statement node.
+    tail is set for the body of a method; a return is then marked as a tail return if it is
+    reached only through the last statement of begins and lets and the branches of ifs, i.e.,
+    if the method would end right after it anyway.
+    """
+    if not isinstance(code, list) or not code or isinstance(code[0], list):
+        return InvalidStatementNode(getattr(code, "line_num", None), to_source(code))
+    tok = code[0]
+    line_num = tok.line_num
+    try:
+        if tok == InterpreterBase.BEGIN_DEF:
+            return BeginNode(line_num, __build_block(code[1:], tail))
+        if tok == InterpreterBase.SET_DEF:
+            return SetNode(line_num, intern_token(code[1]), build_expression(code[2]))
+        if tok == InterpreterBase.IF_DEF:
+            else_statement = build_statement(code[3], tail) if len(code) == 4 else None
+            return IfNode(line_num, build_expression(code[1]), build_statement(code[2], tail),
+                          else_statement)
+        if tok == InterpreterBase.CALL_DEF:
+            return build_expression(code)
+        if tok == InterpreterBase.WHILE_DEF:
+            return WhileNode(line_num, build_expression(code[1]), build_statement(code[2]))
+        if tok == InterpreterBase.RETURN_DEF:
+            expr = build_expression(code[1]) if len(code) > 1 else None
+            return ReturnNode(line_num, expr, tail)
+        if tok in (InterpreterBase.INPUT_STRING_DEF, InterpreterBase.INPUT_INT_DEF):
+            return InputNode(line_num, intern_token(code[1]), intern_token(tok))
+        if tok == InterpreterBase.PRINT_DEF:
+            return PrintNode(line_num, [build_expression(expr) for expr in code[1:]])
+        if tok == InterpreterBase.LET_DEF:
+            # the literal's class name is interned too, so no token (which can't be unpickled
+            # on its own) is left in a compiled artifact
+            variables = [(intern_token(var[0]), intern_token(var[1]),
+                          create_value(var[2], intern_token(var[0])))
+                         for var in code[1]]
+            return LetNode(line_num, variables, __build_block(code[2:], tail))
+    except (IndexError, TypeError, AttributeError):
+        pass  # missing or malformed parts
+    return InvalidStatementNode(line_num, intern_token(tok))
+
+
+def __build_block(statements, tail):
+    # only the last statement of a block inherits tail
+    last = len(statements) - 1
+    return [build_statement(statement, tail and i == last)
+            for i, statement in enumerate(statements)]
+
+
+def build_expression(expr):
+    """
+    Converts a parsed expression into an expression node.
+    """
+    if not isinstance(expr, list):
+        token = intern_token(expr)
+        if token == InterpreterBase.ME_DEF:
+            return MeNode()
+        if token == InterpreterBase.SUPER_DEF:
+            return SuperNode()
+        value = create_value(token)
+        if value is not None:
+            return ConstNode(token, value)
+        return NameNode(token)
+    if not expr or isinstance(expr[0], list):
+        return InvalidExpressionNode([build_expression(item) for item in expr])
+    operator = expr[0]
+    # operands past the first two (or one) are ignored, as they always have been
+    if operator in BINARY_OPERATORS and len(expr) >= 3:
+        return BinaryOpNode(intern_token(operator), build_expression(expr[1]),
+                            build_expression(expr[2]))
+    if operator in UNARY_OPERATORS and len(expr) >= 2:
+        return UnaryOpNode(intern_token(operator), build_expression(expr[1]))
+    if operator == InterpreterBase.CALL_DEF and len(expr) >= 3 and not isinstance(expr[2], list):
+        return CallNode(operator.line_num, build_expression(expr[1]), intern_token(expr[2]),
+                        [build_expression(arg) for arg in expr[3:]])
+    if operator == InterpreterBase.NEW_DEF and len(expr) == 2 and not isinstance(expr[1], list):
+        return NewNode(intern_token(expr[1]))
+    return InvalidExpressionNode([build_expression(item) for item in expr])
+
+
+def to_source(node):
+    """
+    Renders a node (or a raw parse tree) back into an s-expression string.
+    """
+    if isinstance(node, list):
+        return "(" + " ".join(to_source(item) for item in node) + ")"
+    if not isinstance(node, Node):
+        return str(node)
+    kind = node.kind
+    parts = None
+    if kind == InterpreterBase.BEGIN_DEF:
+        parts = [kind] + node.statements
+    elif kind == InterpreterBase.SET_DEF:
+        parts = [kind, node.name, node.expr]
+    elif kind == InterpreterBase.IF_DEF:
+        parts = [kind, node.condition, node.then_statement]
+        if node.else_statement is not None:
+            parts.append(node.else_statement)
+    elif kind == InterpreterBase.WHILE_DEF:
+        parts = [kind, node.condition, node.body]
+    elif kind == InterpreterBase.RETURN_DEF:
+        parts = [kind] if node.expr is None else [kind, node.expr]
+    elif kind in (InterpreterBase.INPUT_STRING_DEF, InterpreterBase.INPUT_INT_DEF):
+        parts = [kind, node.name]
+    elif kind == InterpreterBase.PRINT_DEF:
+        parts = [kind] + node.exprs
+    elif kind == InterpreterBase.LET_DEF:
+        variables = "(" + " ".join(f"({var_type} {name} {value_source(value)})"
+                                   for var_type, name, value in node.variables) + ")"
+        parts = [kind, variables] + node.statements
+    elif kind == InterpreterBase.CALL_DEF:
+        parts = [kind, node.target, node.method_name] + node.args
+    elif kind == NAME_KIND:
+        return node.name
+    elif kind == CONST_KIND:
+        return node.token
+    elif kind in (InterpreterBase.ME_DEF, InterpreterBase.SUPER_DEF):
+        return kind
+    elif kind == BINARY_KIND:
+        parts = [node.operator, node.left, node.right]
+    elif kind == UNARY_KIND:
+        parts = [node.operator, node.operand]
+    elif kind == InterpreterBase.NEW_DEF:
+        parts = [kind, node.class_name]
+    elif isinstance(node, InvalidStatementNode):
+        return str(node.keyword)
+    else:
+        parts = node.items
+    return "(" + " ".join(to_source(part) for part in parts) + ")"
+
+
+def value_source(value):
+    """
+    Renders a pre-built literal Value the way it would appear in source.
+    """
+    if value is None:
+        return "?"
+    raw = value.value()
+    if isinstance(raw, bool):
+        return InterpreterBase.TRUE_DEF if raw else InterpreterBase.FALSE_DEF
+    if isinstance(raw, str):
+        return f'"{raw}"'
+    if raw is None:
+        return InterpreterBase.NULL_DEF
+    return str(raw)
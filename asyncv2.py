@@ -0,0 +1,229 @@
+"""
+Module with the object class used by the cooperative asyncio execution mode
+(Interpreter.run_async).
+
+AsyncObjectDef is an ObjectDef whose statement execution and expression evaluation are
+coroutines, since any statement or expression can reach a print, an inputi/inputs or a method
+call that does. It differs from ObjectDef in three ways:
+    - each statement first awaits interpreter.checkpoint(), which yields to the event loop
+      every so many statements
+    - print awaits interpreter.output_async() and inputi/inputs await
+      interpreter.get_input_async(), so I/O can come from async providers
+    - method calls and method bodies are awaited all the way up to call_method
+Only the methods that await are overridden, and they do nothing but evaluate and run in order:
+every check and decision (environments, conditions, counter loops, short-circuits, call targets
+and inline caches, quotas, accessors, memos) is one of ObjectDef's protected helpers, so both
+modes behave the same. tests/test_async.py runs every test program both ways.
+"""
+
+from intbase import InterpreterBase, ErrorType
+from type_valuev2 import Type, Value
+from astv2 import NAME_KIND, CONST_KIND, BINARY_KIND, UNARY_KIND, to_source
+from objectv2 import ObjectDef, ReturnSignal
+
+
+class AsyncObjectDef(ObjectDef):
+    """
+    ObjectDef for async runs; call_method and invoke_method return coroutines.
+    """
+
+    async def call_method(self, method_name, actual_params, line_num_of_caller, original_caller):
+        if original_caller is None:
+            original_caller = self
+        depth, method_info = self.resolve_method(method_name, actual_params)
+        if not method_info:
+            self.interpreter.error(
+                ErrorType.NAME_ERROR, "unknown method " + method_name, line_num_of_caller)
+        return await self.ancestor(depth).invoke_method(
+            method_info, actual_params, original_caller, line_num_of_caller)
+
+    async def invoke_method(self, method_info, actual_params, original_caller,
+                            line_num_of_caller=None):
+        if method_info.accessor is not None:
+            result = self._inline_accessor(method_info, actual_params)
+            if result is not None:
+                return result
+        key = self._memo_key(method_info, actual_params, original_caller)
+        if key is not None:
+            memo = self.interpreter.memo
+            result = memo.get(key)
+            if result is None:
+                result = await self.__run_method(
+                    method_info, actual_params, original_caller, line_num_of_caller)
+                memo.put(key, result)
+            return result
+        return await self.__run_method(
+            method_info, actual_params, original_caller, line_num_of_caller)
+
+    async def __run_method(self, method_info, actual_params, original_caller, line_num_of_caller):
+        quota = self._enter_method(method_info, line_num_of_caller)
+        if quota is None:
+            return await self.__run_method_body(method_info, actual_params, original_caller)
+        try:
+            return await self.__run_method_body(method_info, actual_params, original_caller)
+        finally:
+            quota.call_depth -= 1
+
+    async def __run_method_body(self, method_info, actual_params, original_caller):
+        env = self._method_env(method_info, actual_params)
+        return_type = method_info.return_type
+        try:
+            return_value = await self.__execute_statement(
+                env, method_info.code, return_type, original_caller)
+        except ReturnSignal as signal:
+            return signal.value
+        if return_value is not None:
+            return return_value
+        return self._get_default_return(return_type)
+
+    async def __execute_statement(self, env, code, return_type, original_caller):
+        await self.interpreter.checkpoint()
+        if self.trace_output or self.quota is not None:
+            self._count_step(code)
+        tok = code.kind
+        if tok == InterpreterBase.BEGIN_DEF:
+            return await self.__execute_begin(env, code, return_type, original_caller)
+        if tok == InterpreterBase.SET_DEF:
+            return await self.__execute_set(env, code, original_caller)
+        if tok == InterpreterBase.IF_DEF:
+            return await self.__execute_if(env, code, return_type, original_caller)
+        if tok == InterpreterBase.CALL_DEF:
+            return await self.__execute_call(env, code, original_caller)
+        if tok == InterpreterBase.WHILE_DEF:
+            return await self.__execute_while(env, code, return_type, original_caller)
+        if tok == InterpreterBase.RETURN_DEF:
+            return await self.__execute_return(env, code, return_type, original_caller)
+        if tok == InterpreterBase.INPUT_STRING_DEF:
+            return await self.__execute_input(env, code, True, original_caller)
+        if tok == InterpreterBase.INPUT_INT_DEF:
+            return await self.__execute_input(env, code, False, original_caller)
+        if tok == InterpreterBase.PRINT_DEF:
+            return await self.__execute_print(env, code, original_caller)
+        if tok == InterpreterBase.LET_DEF:
+            return await self.__execute_let(env, code, return_type, original_caller)
+
+        self.interpreter.error(
+            ErrorType.SYNTAX_ERROR, f"unknown statement {code}", code.line_num)
+
+    async def __execute_let(self, env, code, return_type, original_caller):
+        env.append(self._let_block(code))
+        return_value = await self.__execute_begin(env, code, return_type, original_caller)
+        env.pop()
+        return return_value
+
+    async def __execute_begin(self, env, code, return_type, original_caller):
+        statements = code.statements
+        if not statements:
+            return None
+        for statement in statements[:-1]:
+            await self.__execute_statement(env, statement, return_type, original_caller)
+        return await self.__execute_statement(env, statements[-1], return_type, original_caller)
+
+    async def __execute_call(self, env, code, original_caller):
+        await self.__execute_call_aux(env, code, code.line_num, original_caller)
+
+    async def __execute_set(self, env, code, original_caller):
+        val = await self.__evaluate_expression(env, code.expr, code.line_num, original_caller)
+        self._set_variable_aux(env, code.name, val, code.line_num)
+
+    async def __execute_return(self, env, code, return_type, original_caller):
+        if code.expr is None:
+            ret_val = self._empty_return(return_type)
+        else:
+            ret_val = self._check_return(
+                await self.__evaluate_expression(env, code.expr, code.line_num, original_caller),
+                return_type, code.line_num)
+        if code.tail:
+            return ret_val
+        raise ReturnSignal(ret_val)
+
+    async def __execute_print(self, env, code, original_caller):
+        terms = [await self.__evaluate_expression(env, expr, code.line_num, original_caller)
+                 for expr in code.exprs]
+        await self.interpreter.output_async(self._print_line(code, terms))
+
+    async def __execute_input(self, env, code, get_string, _):
+        inp = await self.interpreter.get_input_async()
+        self._set_variable_aux(env, code.name, self._input_value(inp, get_string), code.line_num)
+
+    async def __execute_if(self, env, code, return_type, original_caller):
+        condition = await self.__evaluate_expression(
+            env, code.condition, code.line_num, original_caller)
+        if self._check_condition(condition, code, "if"):
+            return await self.__execute_statement(
+                env, code.then_statement, return_type, original_caller)
+        if code.else_statement is not None:
+            return await self.__execute_statement(
+                env, code.else_statement, return_type, original_caller)
+        return None
+
+    async def __execute_while(self, env, code, return_type, original_caller):
+        plan = code.plan
+        if plan is not None:
+            return await self.__execute_counter_loop(env, code, plan, return_type, original_caller)
+        while True:
+            condition = await self.__evaluate_expression(
+                env, code.condition, code.line_num, original_caller)
+            if not self._check_condition(condition, code, "while"):
+                return None
+            await self.__execute_statement(env, code.body, return_type, original_caller)
+
+    async def __execute_counter_loop(self, env, code, plan, return_type, original_caller):
+        for proceed in self._counter_loop_checks(env, plan):
+            if proceed is None:
+                condition = await self.__evaluate_expression(
+                    env, code.condition, code.line_num, original_caller)
+                proceed = self._check_condition(condition, code, "while")
+            if not proceed:
+                return None
+            await self.__execute_statement(env, code.body, return_type, original_caller)
+        return None
+
+    async def __evaluate_expression(self, env, expr, line_num_of_statement, original_caller):
+        kind = expr.kind
+        if kind == NAME_KIND:
+            val = self._lookup_variable(env, expr.name)
+            if val is not None:
+                return val
+            self.interpreter.error(ErrorType.NAME_ERROR,
+                                   "invalid field or parameter " + expr.name, line_num_of_statement)
+        if kind == CONST_KIND:
+            return expr.value
+        if kind == InterpreterBase.ME_DEF:
+            return Value(Type.CLASS, original_caller, original_caller.class_def.name)
+
+        if kind == BINARY_KIND:
+            operand1 = await self.__evaluate_expression(
+                env, expr.left, line_num_of_statement, original_caller)
+            if self.interpreter.short_circuit:
+                decided = self._short_circuit(expr.operator, operand1)
+                if decided is not None:
+                    return decided
+            operand2 = await self.__evaluate_expression(
+                env, expr.right, line_num_of_statement, original_caller)
+            return self._apply_binary_op(expr, operand1, operand2, line_num_of_statement)
+        if kind == UNARY_KIND:
+            operand = await self.__evaluate_expression(
+                env, expr.operand, line_num_of_statement, original_caller)
+            return self._apply_unary_op(expr, operand, line_num_of_statement)
+
+        if kind == InterpreterBase.CALL_DEF:
+            return await self.__execute_call_aux(env, expr, line_num_of_statement, original_caller)
+        if kind == InterpreterBase.NEW_DEF:
+            return self._execute_new_aux(env, expr, line_num_of_statement)
+        if kind == InterpreterBase.SUPER_DEF:
+            self.interpreter.error(ErrorType.NAME_ERROR,
+                                   "invalid field or parameter " + kind, line_num_of_statement)
+        self.interpreter.error(ErrorType.SYNTAX_ERROR,
+                               f"invalid expression {to_source(expr)}", line_num_of_statement)
+        return None
+
+    async def __execute_call_aux(self, env, code, line_num_of_statement, original_caller):
+        obj, caller = self._call_receiver(code.target, original_caller, line_num_of_statement)
+        if obj is None:
+            obj, caller = self._dereference(await self.__evaluate_expression(
+                env, code.target, line_num_of_statement, original_caller), line_num_of_statement)
+        actual_args = [await self.__evaluate_expression(
+            env, expr, line_num_of_statement, original_caller) for expr in code.args]
+        target, method_def = self._resolve_call(obj, code, actual_args, line_num_of_statement)
+        return await target.invoke_method(method_def, actual_args, caller, line_num_of_statement)
@@ -0,0 +1,185 @@
+"""
+Module for running many Brewin programs on a pool of worker processes.
+
+Each worker keeps a cache of the programs it has most recently loaded, keyed by a hash of
+their source, so a worker that sees the same program again skips parsing and class loading.
+Jobs are shipped to workers in batches; a program that appears in several jobs of a batch
+is only pickled once. Batches are small enough that every worker gets several of them, so
+results keep streaming back while the rest of the jobs run.
+
+Run as a script, it runs one program against many input files in a single process, loading
+the program once (see Interpreter.run_inputs):
+    python batchv2.py program.brewin test1.in test2.in ...
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# index is the position of the job in the input; output, error_type and error_line have the
+# same form as Interpreter.get_output() / get_error_type_and_line(); message is the text of the
+# exception that ended the run, if any
+JobResult = namedtuple("JobResult", ["index", "output", "error_type", "error_line", "message"])
+
+# most programs a worker keeps loaded
+PROGRAM_CACHE_SIZE = 32
+# most jobs shipped to a worker at once
+MAX_BATCH_SIZE = 8
+# batches per worker that run_many aims for when it picks the batch size
+BATCHES_PER_WORKER = 4
+
+# per-process LRU cache: (source hash, interpreter options) -> loaded Program
+__loaded_programs = OrderedDict()
+
+
+class SourceHasher:
+    """
+    Incrementally computes program_hash over lines as they are read.
+    """
+
+    def __init__(self):
+        self.__digest = hashlib.sha256()
+        self.__newlines = 0  # held back until we know they aren't trailing
+
+    def update(self, line):
+        """
+        Adds the next line of the source.
+        """
+        if not line.endswith("\n"):
+            line += "\n"
+        text = line.rstrip("\n")
+        if text:
+            self.__digest.update(("\n" * self.__newlines + text).encode("utf-8"))
+            self.__newlines = 0
+        self.__newlines += len(line) - len(text)
+
+    def hexdigest(self):
+        """
+        Returns the hash of the lines added so far.
+        """
+        return self.__digest.hexdigest()
+
+
+def program_hash(program):
+    """
+    Returns a hash identifying a program's source. Lines are hashed as if each ended in a
+    newline and trailing blank lines are ignored, so it doesn't matter how the source was split
+    into lines.
+    """
+    hasher = SourceHasher()
+    for line in program:
+        hasher.update(line)
+    return hasher.hexdigest()
+
+
+def run_job(index, source_hash, program, inp, options):
+    """
+    Runs one job in the current process, reusing the worker's cached load of its program.
+    """
+    from interpreterv2 import Interpreter  # pylint: disable=import-outside-toplevel
+
+    interpreter = Interpreter(False, list(inp or []), False, **options)
+    interpreter.read_stdin = False  # a worker has no one to read from
+    key = (source_hash, tuple(sorted(options.items())))
+    try:
+        loaded = __loaded_programs.get(key)
+        if loaded is None:
+            interpreter.load(program)
+            __loaded_programs[key] = interpreter.program
+            if len(__loaded_programs) > PROGRAM_CACHE_SIZE:
+                __loaded_programs.popitem(last=False)
+        else:
+            __loaded_programs.move_to_end(key)
+            interpreter.use_program(loaded)
+        interpreter.execute()
+    except Exception as exception:  # pylint: disable=broad-except
+        error_type, error_line = interpreter.get_error_type_and_line()
+        return JobResult(index, interpreter.get_output(), error_type, error_line, str(exception))
+    return JobResult(index, interpreter.get_output(), None, None, None)
+
+
+def run_batch(programs, batch, options):
+    """
+    Worker entry point: runs a batch of (index, source hash, input) jobs, where programs maps
+    each source hash used by the batch to its lines.
+    """
+    return [run_job(index, source_hash, programs[source_hash], inp, options)
+            for index, source_hash, inp in batch]
+
+
+def run_many(jobs, workers=None, batch_size=None, **options):
+    """
+    Runs each (program lines, input lines) job and yields the JobResults of a batch of jobs as
+    soon as the whole batch finishes, so results can arrive out of order; use JobResult.index
+    to match them up. batch_size defaults to one that gives each worker a few batches, at most
+    MAX_BATCH_SIZE jobs each; batch_size=1 yields each result as soon as its job finishes.
+    workers defaults to the number of CPUs; with workers=1 the jobs run in this process, and
+    each result is yielded as soon as its job finishes.
+    Any other keyword arguments are passed on to each job's Interpreter.
+    """
+    workers = workers or os.cpu_count() or 1
+    hashed = [(index, program_hash(program), program, inp)
+              for index, (program, inp) in enumerate(jobs)]
+    if workers == 1:
+        for index, source_hash, program, inp in hashed:
+            yield run_job(index, source_hash, program, inp, options)
+        return
+    if batch_size is None:
+        batch_size = max(1, min(MAX_BATCH_SIZE, len(hashed) // (workers * BATCHES_PER_WORKER)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for start in range(0, len(hashed), batch_size):
+            programs = {}
+            batch = []
+            for index, source_hash, program, inp in hashed[start:start + batch_size]:
+                programs[source_hash] = program
+                batch.append((index, source_hash, inp))
+            futures.append(executor.submit(run_batch, programs, batch, options))
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def main():
+    """
+    Command-line entry point: runs a .brewin file once per input file and reports each run's
+    output and error, as text or (with --json) as one JSON object per line.
+    """
+    from interpreterv2 import Interpreter  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(
+        description="Run a Brewin program once per input file, loading it only once.")
+    parser.add_argument("source", help="the .brewin file to run")
+    parser.add_argument("inputs", nargs="+", help="input files, one input line per line")
+    parser.add_argument("--json", action="store_true",
+                        help="print one JSON object per input file instead of text")
+    parser.add_argument("--codegen", action="store_true",
+                        help="run method bodies as generated Python code (see codegenv2)")
+    args = parser.parse_args()
+
+    with open(args.source, encoding="utf-8") as source_file:
+        program = source_file.readlines()
+    inputs = []
+    for path in args.inputs:
+        with open(path, encoding="utf-8") as input_file:
+            inputs.append(input_file.read().splitlines())
+    interpreter = Interpreter(False, None, False, codegen=args.codegen)
+    for result in interpreter.run_inputs(program, inputs):
+        path = args.inputs[result.index]
+        error_type = None if result.error_type is None else str(result.error_type)
+        if args.json:
+            print(json.dumps({"input": path, "output": result.output, "error_type": error_type,
+                              "error_line": result.error_line, "message": result.message}))
+            continue
+        print(f"== {path}")
+        for line in result.output:
+            print(line)
+        if result.message is not None:
+            print(f"error: {result.message}")
+
+
+if __name__ == "__main__":
+    main()
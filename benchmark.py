@@ -0,0 +1,285 @@
+"""
+Benchmarks for the interpreter; is entry-point for benchmarking.
+
+Runs a few workloads under each garbage collector mode (see Interpreter.GC_MODES) and reports
+the best wall time along with how often the cyclic garbage collector ran and for how long.
+
+With --scale, instead runs programs from generatorv2 that grow along one dimension at a time,
+checks their output, and reports how parsing, class loading, object construction and
+execution scale; a phase whose time grows faster than SUPERLINEAR_EXPONENT times the size
+is flagged with "!".
+
+With --codegen, the workloads run method bodies as generated Python code (see codegenv2).
+
+With --shard I/N, only the I-th of N hash partitions of the workloads (or scaling dimensions)
+runs, so the benchmarks can be split across machines like the tests (see tester.select_shard).
+
+Usage: python benchmark.py [--repeat N] [--gc-mode MODE ...] [--workload NAME ...] [--codegen]
+                           [--shard I/N]
+       python benchmark.py --scale DIMENSION|all [--steps N] [--shard I/N]
+"""
+
+import argparse
+import gc
+import math
+import sys
+import time
+from dataclasses import replace
+
+from bparser import BParser
+from generatorv2 import GeneratorConfig, generate_program
+from interpreterv2 import Interpreter
+from tester import parse_shard, select_shard
+
+
+LINKED_LIST = """
+(class node
+ (field int val 0)
+ (field node next null)
+ (method void init ((int v) (node n)) (begin (set val v) (set next n)))
+ (method int get_val () (return val))
+ (method node get_next () (return next))
+)
+(class main
+ (field node head null)
+ (field int sum 0)
+ (method void main ()
+  (let ((int i 0) (node n null))
+   (while (< i 20000)
+    (begin (set n (new node)) (call n init i head) (set head n) (set i (+ i 1))))
+   (while (!= head null)
+    (begin (set sum (+ sum (call head get_val))) (set head (call head get_next))))
+   (print sum)
+  )
+ )
+)
+"""
+
+TEMPORARIES = """
+(class point
+ (field int x 0)
+ (field int y 0)
+ (method void init ((int a) (int b)) (begin (set x a) (set y b)))
+ (method int dot ((point other)) (return (+ (* x (call other get_x)) (* y (call other get_y)))))
+ (method int get_x () (return x))
+ (method int get_y () (return y))
+)
+(class point3 inherits point
+ (field int z 0)
+)
+(class main
+ (method void main ()
+  (let ((int i 0) (int total 0) (point p null) (point q null))
+   (while (< i 10000)
+    (begin
+     (set p (new point3))
+     (set q (new point3))
+     (call p init i 1)
+     (call q init 2 i)
+     (set total (+ total (call p dot q)))
+     (set i (+ i 1))))
+   (print total)
+  )
+ )
+)
+"""
+
+FIB = """
+(class main
+ (method int fib ((int n))
+  (if (< n 2) (return n) (return (+ (call me fib (- n 1)) (call me fib (- n 2))))))
+ (method void main () (print (call me fib 20)))
+)
+"""
+
+
+def __many_classes(count):
+    lines = []
+    for c in range(count):
+        lines.append(f"(class c{c} (field int x 0)")
+        for m in range(10):
+            lines.append(f" (method int m{m} ((int a)) (begin (set x (+ x a))"
+                         f" (while (< a 5) (set a (+ a 1))) (return (* x a))))")
+        lines.append(")")
+    lines.append('(class main (method void main () (print (call (new c0) m0 1))))')
+    return "\n".join(lines)
+
+
+WORKLOADS = {
+    "linked_list": LINKED_LIST,
+    "temporaries": TEMPORARIES,
+    "fib": FIB,
+    "many_classes": __many_classes(300),
+}
+
+
+# starting value of each scaling dimension (doubled at every step), and the config it varies
+SCALING_DIMENSIONS = {
+    "classes": 25,
+    "inheritance_depth": 1,
+    "methods": 4,
+    "params": 2,
+    "loop_trips": 1000,
+    "recursion_depth": 25,
+    "let_depth": 4,
+    "string_size": 1000,
+}
+SCALING_BASE = GeneratorConfig(classes=32)
+SUPERLINEAR_EXPONENT = 1.3
+# phases shorter than this are too noisy to judge
+MIN_FLAGGED_TIME = 0.002
+
+
+class GCMonitor:
+    """
+    Counts garbage collections and their total pause time through gc.callbacks.
+    """
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pause = 0.0
+        self.__start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.__start = time.perf_counter()
+        elif self.__start is not None:
+            self.pause += time.perf_counter() - self.__start
+            self.collections[info["generation"]] += 1
+            self.__start = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *_):
+        gc.callbacks.remove(self)
+
+
+def run_workload(source, gc_mode, repeat, codegen=False):
+    """
+    Runs a program repeat times; returns (best wall time, GCMonitor of the best run, output).
+    """
+    program = source.split("\n")
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        interpreter = Interpreter(False, None, False, gc_mode=gc_mode, codegen=codegen)
+        with GCMonitor() as monitor:
+            start = time.perf_counter()
+            interpreter.run(program)
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, monitor, interpreter.get_output())
+    return best
+
+
+def measure_phases(program, expected):
+    """
+    Times the phases of running a program: parsing, loading its classes (not counting the
+    parse), constructing one object of every class, and executing it.
+    Returns a dict of phase name to seconds; raises a RuntimeError if the output is wrong.
+    """
+    start = time.perf_counter()
+    BParser.parse(program)
+    parse = time.perf_counter() - start
+
+    interpreter = Interpreter(False)
+    start = time.perf_counter()
+    compiled = interpreter.compile(program)
+    classes = time.perf_counter() - start - parse
+
+    interpreter.use_program(compiled)
+    start = time.perf_counter()
+    for class_name in compiled.class_index:
+        interpreter.instantiate(class_name, None)
+    objects = time.perf_counter() - start
+
+    interpreter = Interpreter(False)
+    start = time.perf_counter()
+    interpreter.run(compiled)
+    run = time.perf_counter() - start
+    if interpreter.get_output() != expected:
+        raise RuntimeError("generated program printed the wrong output")
+    return {"parse": parse, "classes": max(classes, 0.0), "objects": objects, "run": run}
+
+
+def run_scaling(dimension, steps, repeat):
+    """
+    Doubles one dimension of the generated program steps times, printing each phase's best
+    time over repeat runs and flagging superlinear growth.
+    """
+    print(f"\n{dimension}")
+    print(f"{'value':>8}" + "".join(f"{phase:>12}" for phase in ("parse", "classes", "objects", "run")))
+    previous = None
+    value = SCALING_DIMENSIONS[dimension]
+    for _ in range(steps):
+        config = replace(SCALING_BASE, **{dimension: value})
+        if dimension == "inheritance_depth":
+            config = replace(config, classes=max(config.classes, value + 1))
+        program, expected = generate_program(config)
+        runs = []
+        for _ in range(repeat):
+            gc.collect()
+            runs.append(measure_phases(program, expected))
+        times = {phase: min(run[phase] for run in runs) for phase in runs[0]}
+        row = f"{value:>8}"
+        for phase, elapsed in times.items():
+            flag = " "
+            if previous is not None and elapsed > MIN_FLAGGED_TIME and previous[1][phase] > 0:
+                exponent = math.log(elapsed / previous[1][phase]) / math.log(value / previous[0])
+                flag = "!" if exponent > SUPERLINEAR_EXPONENT else " "
+            row += f"{elapsed * 1000:>10.1f}{flag} "
+        print(row)
+        previous = (value, times)
+        value *= 2
+
+
+def main():
+    """
+    Runs the selected workloads under the selected GC modes and prints a table of results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Brewin interpreter.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per workload (best is kept)")
+    parser.add_argument("--gc-mode", action="append", choices=["none", "freeze", "defer"],
+                        help="GC mode(s) to run under (default: all)")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS),
+                        help="workload(s) to run (default: all)")
+    parser.add_argument("--codegen", action="store_true",
+                        help="run method bodies as generated Python code")
+    parser.add_argument("--scale", action="append",
+                        choices=sorted(SCALING_DIMENSIONS) + ["all"],
+                        help="run scaling benchmarks on generated programs instead")
+    parser.add_argument("--steps", type=int, default=5,
+                        help="how many times to double each scaling dimension")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="only run the I-th of N shards of the workloads or dimensions")
+    args = parser.parse_args()
+    if args.scale:
+        # deep recursion in a generated program takes several Python frames per Brewin call
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+        dimensions = list(SCALING_DIMENSIONS) if "all" in args.scale else args.scale
+        if args.shard is not None:
+            dimensions = select_shard(dimensions, args.shard)
+        print("times in ms")
+        for dimension in dimensions:
+            run_scaling(dimension, args.steps, args.repeat)
+        return
+    gc_modes = args.gc_mode or ["none", "freeze", "defer"]
+    workloads = args.workload or list(WORKLOADS)
+    if args.shard is not None:
+        workloads = select_shard(workloads, args.shard)
+
+    print(f"{'workload':<14}{'gc mode':<9}{'time (s)':>10}{'gen0':>7}{'gen1':>7}{'gen2':>7}"
+          f"{'pause (ms)':>12}")
+    for name in workloads:
+        for gc_mode in gc_modes:
+            elapsed, monitor, _ = run_workload(
+                WORKLOADS[name], None if gc_mode == "none" else gc_mode, args.repeat, args.codegen)
+            gen0, gen1, gen2 = monitor.collections
+            print(f"{name:<14}{gc_mode:<9}{elapsed:>10.3f}{gen0:>7}{gen1:>7}{gen2:>7}"
+                  f"{monitor.pause * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,22 +7,92 @@ In P1, we don't allow overloading within a class;
 two methods cannot have the same name with different parameters.
 """
 
+import threading
+
 from intbase import InterpreterBase, ErrorType
+from astv2 import build_statement, intern_token
+from analysisv2 import plan_counter_loops, find_accessor
+from foldv2 import fold_constants
 
 
 class MethodDef:
     """
     Wrapper struct for the definition of a member method.
+
+    The body is converted into AST nodes up front, or on first use if the method was loaded
+    lazily. Likewise, the return type is checked once per method by validate().
     """
 
-    def __init__(self, method_def):
-        self.return_type = method_def[1]
-        self.method_name = method_def[2]
+    # return types that aren't class names
+    BUILTIN_RETURN_TYPES = frozenset([InterpreterBase.INT_DEF, InterpreterBase.BOOL_DEF,
+                                      InterpreterBase.STRING_DEF, InterpreterBase.VOID_DEF])
+    PARAM_TYPES = frozenset([InterpreterBase.INT_DEF, InterpreterBase.BOOL_DEF,
+                             InterpreterBase.STRING_DEF])
+
+    COMPILE_LOCK = threading.Lock()
+
+    def __init__(self, method_def, lazy=False):
+        self.return_type = intern_token(method_def[1])
+        self.method_name = intern_token(method_def[2])
         self.formal_params = {}
         for item in method_def[3]:
             # parameter name to type map
-            self.formal_params[item[1]] = item[0]
-        self.code = method_def[4]
+            self.formal_params[intern_token(item[1])] = intern_token(item[0])
+        self.validated = False
+        # generated Python code (see codegenv2), made on the first call in a codegen run
+        self.python_body = None
+        # analysisv2.Accessor if the method is a trivial getter or setter
+        self.accessor = None
+        self.__body = method_def[4]
+        self.__code = None
+        if not lazy:
+            self.compile()
+
+    def __getstate__(self):
+        # a generated Python body can't be pickled; codegenv2 makes it again when needed
+        state = self.__dict__.copy()
+        state["python_body"] = None
+        return state
+
+    @property
+    def code(self):
+        """
+        The method body as AST nodes (see astv2).
+        """
+        if self.__code is None:
+            self.compile()
+        return self.__code
+
+    def compile(self):
+        """
+        Converts the parsed method body into AST nodes, folds its constants (see foldv2), plans
+        its counter loops and checks whether it's an accessor; after this the parse tree is no
+        longer referenced.
+        """
+        if self.__code is None:
+            with MethodDef.COMPILE_LOCK:  # runs sharing a Program may race to compile a method
+                if self.__code is None:
+                    self.__code = fold_constants(build_statement(self.__body, True))
+                    self.__body = None
+                    plan_counter_loops(self)
+                    self.accessor = find_accessor(self)
+
+    def validate(self, interpreter, class_index, check_params=False):
+        """
+        Reports a TYPE_ERROR if the return type (and, if check_params is set, a parameter type)
+        names neither a primitive type nor a class of class_index.
+        """
+        if self.validated and not check_params:
+            return
+        if (self.return_type not in MethodDef.BUILTIN_RETURN_TYPES
+                and self.return_type not in class_index):
+            interpreter.error(
+                ErrorType.TYPE_ERROR, f"method {self.method_name} return type does not exist")
+        self.validated = True
+        if check_params:
+            for param_type in self.formal_params.values():
+                if param_type not in MethodDef.PARAM_TYPES and param_type not in class_index:
+                    interpreter.error(ErrorType.TYPE_ERROR, "invalid type for parameter")
 
 
 class FieldDef:
@@ -31,9 +101,9 @@ class FieldDef:
     """
 
     def __init__(self, field_def):
-        self.field_type = field_def[1]
-        self.field_name = field_def[2]
-        self.default_field_value = field_def[3]
+        self.field_type = intern_token(field_def[1])
+        self.field_name = intern_token(field_def[2])
+        self.default_field_value = intern_token(field_def[3])
 
     def name(self):
         return self.field_name
@@ -51,10 +121,12 @@ class ClassDef:
     class definition: [class classname [field1 field2 ... method1 method2 ...]]
     """
 
-    def __init__(self, class_def, interpreter, parent):
+    def __init__(self, class_def, interpreter, parent, lazy=False):
         self.interpreter = interpreter
-        self.name = class_def[1]
+        self.lazy = lazy
+        self.name = intern_token(class_def[1])
         self.parent = parent    # class def object for parent class
+        self.validated = False  # whether validate() has checked all methods
         if not parent:  # no inheritance, just defining fields and/or methods
             self.__create_field_list(class_def[2:])
             self.__create_method_list(class_def[2:])
@@ -62,6 +134,24 @@ class ClassDef:
             self.__create_field_list(class_def[4:])
             self.__create_method_list(class_def[4:])
 
+    def __getstate__(self):
+        # the interpreter is only used to report errors while loading; compiled artifacts
+        # (see compilev2) must not drag it along
+        state = self.__dict__.copy()
+        state["interpreter"] = None
+        return state
+
+    def validate(self, interpreter, class_index, check_params=False):
+        """
+        Checks the return types (and optionally the parameter types) of all methods; see
+        MethodDef.validate.
+        """
+        if self.validated and not check_params:
+            return
+        for method in self.methods.values():
+            method.validate(interpreter, class_index, check_params)
+        self.validated = True
+
     def get_fields(self):
         """
         Get a list of FieldDefs for *all* fields in the class.
@@ -93,5 +183,6 @@ class ClassDef:
                 if member[2] in methods_defined_so_far:  # redefinition
                     self.interpreter.error(ErrorType.NAME_ERROR,
                                            "duplicate method " + member[2], member[0].line_num)
-                self.methods[member[2]] = MethodDef(member)
+                method = MethodDef(member, self.lazy)
+                self.methods[method.method_name] = method
                 methods_defined_so_far.add(member[2])
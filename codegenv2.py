@@ -0,0 +1,498 @@
+"""
+Module with the Python code generation backend (Interpreter(codegen=True)).
+
+The first time a method runs, its body is translated into the source of a Python function,
+which is compiled and then run in place of the tree walker in ObjectDef (CompiledObjectDef
+swaps it in). Parameters and let variables of a primitive type become Python locals holding
+the raw int, bool or string, and expressions over them become plain Python expressions.
+Objects, fields and calls go through the same ObjectDef checks, so errors and their line
+numbers don't change. A method the generator can't translate, or whose code Python can't
+compile, is left to the tree walker. Compiled code is cached per program hash (see
+batchv2.program_hash).
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from intbase import InterpreterBase, ErrorType
+from objectv2 import ObjectDef
+from type_valuev2 import Type, Value, StringRope, create_value, check_type
+from quickenv2 import SPECIALIZED_BINARY_OPS
+from astv2 import NAME_KIND, CONST_KIND, BINARY_KIND, UNARY_KIND
+
+
+# programs whose compiled code is kept around for reuse
+CODE_CACHE_SIZE = 32
+# MethodDef.python_body of a method the tree walker runs (None means not generated yet)
+WALKER = False
+# name of the generated function in each method's source
+FUNCTION_NAME = "body"
+
+PRIMITIVE_TYPES = {
+    InterpreterBase.INT_DEF: Type.INT,
+    InterpreterBase.BOOL_DEF: Type.BOOL,
+    InterpreterBase.STRING_DEF: Type.STRING,
+}
+# how an expression's Python code represents its result: one of the primitive type names
+# (raw int, bool or str/StringRope) or BOXED (a Value); None can't clash with a class name
+BOXED = None
+# operators on two raw operands of the same type, as Python format strings
+RAW_BINARY_OPS = {
+    InterpreterBase.INT_DEF: {
+        "+": ("({} + {})", InterpreterBase.INT_DEF),
+        "-": ("({} - {})", InterpreterBase.INT_DEF),
+        "*": ("({} * {})", InterpreterBase.INT_DEF),
+        "/": ("({} // {})", InterpreterBase.INT_DEF),
+        "%": ("({} % {})", InterpreterBase.INT_DEF),
+        "==": ("({} == {})", InterpreterBase.BOOL_DEF),
+        "!=": ("({} != {})", InterpreterBase.BOOL_DEF),
+        ">": ("({} > {})", InterpreterBase.BOOL_DEF),
+        "<": ("({} < {})", InterpreterBase.BOOL_DEF),
+        ">=": ("({} >= {})", InterpreterBase.BOOL_DEF),
+        "<=": ("({} <= {})", InterpreterBase.BOOL_DEF),
+    },
+    InterpreterBase.STRING_DEF: {
+        "+": ("concat({}, {})", InterpreterBase.STRING_DEF),
+        "==": ("(str({}) == str({}))", InterpreterBase.BOOL_DEF),
+        "!=": ("(str({}) != str({}))", InterpreterBase.BOOL_DEF),
+        ">": ("(str({}) > str({}))", InterpreterBase.BOOL_DEF),
+        "<": ("(str({}) < str({}))", InterpreterBase.BOOL_DEF),
+        ">=": ("(str({}) >= str({}))", InterpreterBase.BOOL_DEF),
+        "<=": ("(str({}) <= str({}))", InterpreterBase.BOOL_DEF),
+    },
+    # & and | rather than and/or: both operands are always evaluated
+    InterpreterBase.BOOL_DEF: {
+        "&": ("({} & {})", InterpreterBase.BOOL_DEF),
+        "|": ("({} | {})", InterpreterBase.BOOL_DEF),
+        "==": ("({} == {})", InterpreterBase.BOOL_DEF),
+        "!=": ("({} != {})", InterpreterBase.BOOL_DEF),
+    },
+}
+
+
+class Unsupported(Exception):
+    """
+    Raised while generating a method that has to be left to the tree walker.
+    """
+
+
+class CompiledObjectDef(ObjectDef):
+    """
+    ObjectDef that runs methods through their generated Python body when they have one.
+    """
+
+    # overrides ObjectDef.__run_method_body
+    def _ObjectDef__run_method_body(self, method_info, actual_params, original_caller):
+        body = method_info.python_body
+        if body is None:
+            body = python_body(self.class_def, method_info, self.interpreter.program)
+        if body is WALKER:
+            return ObjectDef._ObjectDef__run_method_body(
+                self, method_info, actual_params, original_caller)
+        return body(self, actual_params, original_caller)
+
+
+class MethodGenerator:
+    """
+    Generates the Python source of one method; see the module docstring.
+    """
+
+    def __init__(self, class_def, method, class_index):
+        self.method = method
+        self.class_index = class_index
+        self.fields = {field.field_name: field.field_type for field in class_def.get_fields()}
+        self.constants = []  # objects the generated code refers to as K[i]
+        self.lines = []
+        self.indent = 1
+        self.scopes = []  # innermost last; each maps a Brewin name to (Python name, type)
+        self.local_count = 0
+
+    def generate(self):
+        """
+        Returns (source, constants); raises Unsupported if the walker must run the method.
+        """
+        params = {}
+        for i, (name, param_type) in enumerate(self.method.formal_params.items()):
+            local = self.__new_local(name)
+            if param_type in PRIMITIVE_TYPES:
+                self.__emit(f"{local} = args[{i}].value()")
+            else:
+                self.__emit(f"{local} = param(args[{i}], {param_type!r})")
+            params[name] = (local, param_type)
+        self.scopes.append(params)
+        self.__statement(self.method.code)
+        self.__emit(f"return default_return(self, {self.method.return_type!r})")
+        header = f"def {FUNCTION_NAME}(self, args, original_caller):"
+        return "\n".join([header] + self.lines) + "\n", self.constants
+
+    def __emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    def __block(self, statement):
+        # an indented block holding statement
+        self.indent += 1
+        start = len(self.lines)
+        self.__statement(statement)
+        if len(self.lines) == start:
+            self.__emit("pass")
+        self.indent -= 1
+
+    def __constant(self, value):
+        self.constants.append(value)
+        return f"K[{len(self.constants) - 1}]"
+
+    def __new_local(self, name):
+        self.local_count += 1
+        return f"v{self.local_count}_{re.sub(r'[^0-9A-Za-z_]', '_', name)}"
+
+    def __lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    @staticmethod
+    def __box(code, kind):
+        if kind == BOXED:
+            return code
+        return f"Value({PRIMITIVE_TYPES[kind]}, {code})"
+
+    # statements
+
+    def __statement(self, code):
+        kind = code.kind
+        line = code.line_num
+        if kind == InterpreterBase.BEGIN_DEF:
+            for statement in code.statements:
+                self.__statement(statement)
+        elif kind == InterpreterBase.SET_DEF:
+            value, value_kind = self.__expression(code.expr, line)
+            self.__assign(code.name, value, value_kind, line)
+        elif kind == InterpreterBase.IF_DEF:
+            self.__emit(f"if {self.__condition(code, 'if')}:")
+            self.__block(code.then_statement)
+            if code.else_statement is not None:
+                self.__emit("else:")
+                self.__block(code.else_statement)
+        elif kind == InterpreterBase.WHILE_DEF:
+            self.__emit(f"while {self.__condition(code, 'while')}:")
+            self.__block(code.body)
+        elif kind == InterpreterBase.CALL_DEF:
+            self.__emit(self.__call(code, line))
+        elif kind == InterpreterBase.RETURN_DEF:
+            self.__return(code, line)
+        elif kind in (InterpreterBase.INPUT_STRING_DEF, InterpreterBase.INPUT_INT_DEF):
+            get_string = kind == InterpreterBase.INPUT_STRING_DEF
+            self.__assign(code.name, f"read_input(self, {get_string})", BOXED, line)
+        elif kind == InterpreterBase.PRINT_DEF:
+            parts = []
+            for expr in code.exprs:
+                value, value_kind = self.__expression(expr, line)
+                if value_kind == InterpreterBase.BOOL_DEF:
+                    parts.append(f"('true' if {value} else 'false')")
+                elif value_kind == BOXED:
+                    parts.append(f"show({value})")
+                else:
+                    parts.append(f"str({value})")
+            self.__emit(f"self.interpreter.output(''.join(({', '.join(parts)},)))"
+                        if parts else "self.interpreter.output('')")
+        elif kind == InterpreterBase.LET_DEF:
+            self.__let(code, line)
+        else:
+            raise Unsupported(f"statement {code}")
+
+    def __assign(self, name, value, value_kind, line):
+        binding = self.__lookup(name)
+        if binding is None:  # a field, or else a NAME_ERROR
+            field_type = self.fields.get(name)
+            if field_type in PRIMITIVE_TYPES and value_kind == field_type:
+                self.__emit(f"self.fields[{name!r}] = ({self.__box(value, value_kind)}, "
+                            f"{field_type!r})")
+            else:
+                self.__emit(f"self._set_variable_aux((), {name!r}, "
+                            f"{self.__box(value, value_kind)}, {line})")
+            return
+        local, var_type = binding
+        if var_type in PRIMITIVE_TYPES and value_kind == var_type:
+            self.__emit(f"{local} = {value}")
+        elif var_type in PRIMITIVE_TYPES:
+            self.__emit(f"{local} = assign(self, {self.__box(value, value_kind)}, "
+                        f"{var_type!r}, {name!r}, {line}).value()")
+        else:
+            self.__emit(f"{local} = assign(self, {self.__box(value, value_kind)}, "
+                        f"{var_type!r}, {name!r}, {line})")
+
+    def __condition(self, code, statement_kind):
+        value, value_kind = self.__expression(code.condition, code.line_num)
+        if value_kind == InterpreterBase.BOOL_DEF:
+            return value
+        return (f"condition(self, {self.__box(value, value_kind)}, {self.__constant(code)}, "
+                f"{statement_kind!r})")
+
+    def __return(self, code, line):
+        return_type = self.method.return_type
+        if code.expr is None:
+            if return_type == InterpreterBase.VOID_DEF:
+                self.__emit(f"return {self.__constant(create_value(InterpreterBase.NOTHING_DEF))}")
+            else:
+                self.__emit(f"return default_return(self, {return_type!r})")
+            return
+        value, value_kind = self.__expression(code.expr, line)
+        if value_kind == return_type:
+            self.__emit(f"return {self.__box(value, value_kind)}")
+        else:
+            self.__emit(f"return self._check_return("
+                        f"{self.__box(value, value_kind)}, {return_type!r}, {line})")
+
+    def __let(self, code, line):
+        block = {}
+        for var_type, var_name, var_val in code.variables:
+            if var_name in block:
+                self.__emit(f"fail(self, ErrorType.{ErrorType.NAME_ERROR.name}, "
+                            f"{'already have a variable assigned to ' + var_name!r}, {line})")
+                return  # the rest of the let never runs
+            if var_val is None:
+                raise Unsupported(f"let literal in {code}")
+            local = self.__new_local(var_name)
+            if var_val.type() == Type.CLASS:
+                checked = (f"let_object(self, {self.__constant(var_val)}, {var_type!r}, "
+                           f"{var_name!r}, {line})")
+                if var_type in PRIMITIVE_TYPES:
+                    checked += ".value()"  # never gets here; reports a TYPE_ERROR
+                self.__emit(f"{local} = {checked}")
+            elif check_type(var_val.type(), var_type):
+                self.__emit(f"{local} = {var_val.value()!r}")
+            else:
+                self.__emit(f"fail(self, ErrorType.{ErrorType.TYPE_ERROR.name}, "
+                            f"{'setting variable ' + var_name + ' to wrong type'!r}, {line})")
+                return
+            block[var_name] = (local, var_type)
+        self.scopes.append(block)
+        for statement in code.statements:
+            self.__statement(statement)
+        self.scopes.pop()
+
+    # expressions; each returns (Python code, kind of result)
+
+    def __expression(self, expr, line):
+        kind = expr.kind
+        if kind == NAME_KIND:
+            return self.__name(expr.name, line)
+        if kind == CONST_KIND:
+            value = expr.value
+            if value.type() == Type.INT:
+                return repr(value.value()), InterpreterBase.INT_DEF
+            if value.type() == Type.BOOL:
+                return repr(value.value()), InterpreterBase.BOOL_DEF
+            if value.type() == Type.STRING:
+                return repr(value.value()), InterpreterBase.STRING_DEF
+            return self.__constant(value), BOXED
+        if kind == InterpreterBase.ME_DEF:
+            return "Value(CLASS, original_caller, original_caller.class_def.name)", BOXED
+        if kind == BINARY_KIND:
+            left, left_kind = self.__expression(expr.left, line)
+            right, right_kind = self.__expression(expr.right, line)
+            if left_kind == right_kind and expr.operator in RAW_BINARY_OPS.get(left_kind, {}):
+                template, result_kind = RAW_BINARY_OPS[left_kind][expr.operator]
+                return template.format(left, right), result_kind
+            return (f"binary(self, {expr.operator!r}, {self.__box(left, left_kind)}, "
+                    f"{self.__box(right, right_kind)}, {line})"), BOXED
+        if kind == UNARY_KIND:
+            operand, operand_kind = self.__expression(expr.operand, line)
+            if operand_kind != InterpreterBase.BOOL_DEF:
+                raise Unsupported(f"unary operand {expr}")
+            return f"(not {operand})", InterpreterBase.BOOL_DEF
+        if kind == InterpreterBase.CALL_DEF:
+            return self.__call(expr, line), BOXED
+        if kind == InterpreterBase.NEW_DEF:
+            return (f"Value(CLASS, self.interpreter.instantiate({expr.class_name!r}, {line}), "
+                    f"{expr.class_name!r})"), BOXED
+        if kind == InterpreterBase.SUPER_DEF:
+            return f"name_error(self, {InterpreterBase.SUPER_DEF!r}, {line})", BOXED
+        raise Unsupported(f"expression {expr}")
+
+    def __name(self, name, line):
+        binding = self.__lookup(name)
+        if binding is not None:
+            local, var_type = binding
+            return local, var_type if var_type in PRIMITIVE_TYPES else BOXED
+        field_type = self.fields.get(name)
+        if field_type is None:
+            return f"name_error(self, {name!r}, {line})", BOXED
+        if field_type in PRIMITIVE_TYPES:
+            return f"self.fields[{name!r}][0].value()", field_type
+        return f"self.fields[{name!r}][0]", BOXED
+
+    def __call(self, code, line):
+        target = code.target
+        caller = "None"  # the object called
+        if target.kind == InterpreterBase.ME_DEF:
+            obj = "original_caller"
+        elif target.kind == InterpreterBase.SUPER_DEF:
+            obj = f"super_object(self, {line})"
+            caller = "original_caller"
+        else:
+            value, value_kind = self.__expression(target, line)
+            if value_kind != BOXED:
+                raise Unsupported(f"call on a primitive in {code}")
+            obj = f"dereference(self, {value}.value(), {line})"
+        args = "".join(f"{self.__box(*self.__expression(arg, line))}, " for arg in code.args)
+        return f"call(self, {self.__constant(code)}, {obj}, [{args}], {caller}, {line})"
+
+
+# run-time support for the generated code
+
+
+def __param(actual, formal_type):
+    if actual.value() is None and actual.class_name() is None:
+        return Value(Type.CLASS, None, formal_type)
+    return actual
+
+
+def __fail(obj, error_type, description, line_num):
+    obj.interpreter.error(error_type, description, line_num)
+
+
+def __name_error(obj, name, line_num):
+    obj.interpreter.error(ErrorType.NAME_ERROR, "invalid field or parameter " + name, line_num)
+
+
+def __default_return(obj, return_type):
+    return obj._get_default_return(return_type)  # pylint: disable=protected-access
+
+
+def __assign(obj, value, var_type, var_name, line_num):
+    # a set of a parameter or let variable; see ObjectDef._set_variable_aux
+    if value.type() == Type.NOTHING:
+        obj.interpreter.error(ErrorType.TYPE_ERROR, "can't assign to nothing " + var_name, line_num)
+    return obj._check_assignment(  # pylint: disable=protected-access
+        value, var_type, var_name, line_num)
+
+
+def __let_object(obj, value, var_type, var_name, line_num):
+    if obj._polymorphic(var_type, value.class_name()):  # pylint: disable=protected-access
+        return value
+    obj.interpreter.error(
+        ErrorType.TYPE_ERROR, f"setting variable {var_name} to wrong type", line_num)
+    return None
+
+
+def __condition(obj, condition, code, statement_kind):
+    return obj._check_condition(condition, code, statement_kind)  # pylint: disable=protected-access
+
+
+def __binary(obj, operator, operand1, operand2, line_num):
+    operand_type = operand1.type()
+    if operand_type is operand2.type():
+        fast_path = SPECIALIZED_BINARY_OPS.get(operand_type, {}).get(operator)
+        if fast_path is not None:
+            return fast_path(operand1.value(), operand2.value())
+    return obj._evaluate_binary_op(  # pylint: disable=protected-access
+        operator, operand1, operand2, line_num)
+
+
+def __show(value):
+    if value.type() == Type.BOOL:
+        return "true" if value.value() else "false"
+    return str(value.value())
+
+
+def __read_input(obj, get_string):
+    inp = obj.interpreter.get_input()
+    if get_string:
+        return Value(Type.STRING, inp)
+    return Value(Type.INT, int(inp))
+
+
+def __super_object(obj, line_num):
+    if not obj.parent:
+        obj.interpreter.error(
+            ErrorType.TYPE_ERROR, "Called super on an object that's not inherited", line_num)
+    return obj.parent
+
+
+def __dereference(obj, target, line_num):
+    if target is None:
+        obj.interpreter.error(ErrorType.FAULT_ERROR, "null dereference", line_num)
+    return target
+
+
+def __call(obj, code, target, actual_args, caller, line_num):
+    # see ObjectDef.__execute_call_aux; the target and arguments are already evaluated
+    if caller is None:
+        caller = target
+    target, method_def = obj._resolve_call(  # pylint: disable=protected-access
+        target, code, actual_args, line_num)
+    return target.invoke_method(method_def, actual_args, caller, line_num)
+
+
+RUNTIME = {
+    "Value": Value,
+    "Type": Type,
+    "ErrorType": ErrorType,
+    "CLASS": Type.CLASS,
+    "concat": StringRope.concat,
+    "param": __param,
+    "fail": __fail,
+    "name_error": __name_error,
+    "default_return": __default_return,
+    "assign": __assign,
+    "let_object": __let_object,
+    "condition": __condition,
+    "binary": __binary,
+    "show": __show,
+    "read_input": __read_input,
+    "super_object": __super_object,
+    "dereference": __dereference,
+    "call": __call,
+}
+
+__code_cache = OrderedDict()  # program hash -> {(class name, method name): code or None}
+__lock = threading.Lock()
+
+
+def generate_source(class_def, method, class_index):
+    """
+    Returns (source, constants) for a method, or None if the tree walker has to run it.
+    """
+    try:
+        return MethodGenerator(class_def, method, class_index).generate()
+    except (Unsupported, RecursionError):
+        return None
+
+
+def python_body(class_def, method, program):
+    """
+    Returns the generated Python body of a method of class_def in a Program, or WALKER if the
+    tree walker has to run it, generating it if need be (see MethodDef.python_body).
+    """
+    with __lock:
+        if method.python_body is None:
+            method.python_body = __make_body(class_def, method, program)
+        return method.python_body
+
+
+def __make_body(class_def, method, program):
+    generated = generate_source(class_def, method, program.class_index)
+    if generated is None:
+        return WALKER
+    source, constants = generated
+    codes = __code_cache.get(program.source_hash)
+    if codes is None:
+        codes = __code_cache[program.source_hash] = {}
+        if len(__code_cache) > CODE_CACHE_SIZE:
+            __code_cache.popitem(last=False)
+    else:
+        __code_cache.move_to_end(program.source_hash)
+    key = (class_def.name, method.method_name)
+    if key not in codes:
+        try:
+            codes[key] = compile(source, f"<brewin {class_def.name}.{method.method_name}>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):  # e.g., too deeply nested for Python
+            codes[key] = None
+    if codes[key] is None:
+        return WALKER
+    namespace = dict(RUNTIME, K=constants)
+    exec(codes[key], namespace)  # pylint: disable=exec-used
+    return namespace[FUNCTION_NAME]
@@ -0,0 +1,104 @@
+"""
+Module for ahead-of-time compilation of Brewin programs into artifacts that load quickly.
+
+An artifact is a pickled, already validated program: its ClassDefs (with the resolved class
+hierarchy and method tables), the method bodies as AST nodes with their pre-built literals,
+and the results of the load-time analyses. Loading one skips parsing and class loading
+entirely. Each artifact is stamped with ARTIFACT_VERSION and the hash of its source so stale
+or incompatible artifacts are rejected instead of run.
+
+Artifacts are pickles, so only load artifacts you compiled yourself.
+
+Usage: python compilev2.py program.brewin [-o program.brewinc]
+"""
+
+import argparse
+import gc
+import pickle
+import sys
+
+from batchv2 import program_hash
+
+
+# bump whenever Program, ClassDef, MethodDef, FieldDef or the AST nodes change shape
+ARTIFACT_VERSION = 6
+ARTIFACT_MAGIC = "brewin-artifact"
+ARTIFACT_SUFFIX = ".brewinc"
+
+
+def compile_program(program):
+    """
+    Parses, loads and validates a program (a list of source lines), returning its artifact
+    as bytes. Validation is strict (see Interpreter), so type errors in method signatures are
+    reported here even for classes the program never instantiates.
+    """
+    from interpreterv2 import Interpreter  # pylint: disable=import-outside-toplevel
+
+    interpreter = Interpreter(False, strict=True)
+    interpreter.load(program)
+    # cheap to do, and lets a memoizing interpreter use the artifact too
+    interpreter.program.analyze()
+    artifact = {
+        "magic": ARTIFACT_MAGIC,
+        "version": ARTIFACT_VERSION,
+        "python": sys.version_info[:2],
+        "source_hash": interpreter.program.source_hash,
+        "program": interpreter.program,
+    }
+    return pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_artifact(path, program=None):
+    """
+    Reads an artifact file, returning its contents as a dict, or None if the file is missing,
+    isn't an artifact, was built by a different ARTIFACT_VERSION or Python version, or (when
+    the program's source lines are given) was compiled from a different source.
+    """
+    # unpickling creates a lot of objects and nothing garbage; don't let the cyclic GC rescan them
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as artifact_file:
+            artifact = pickle.load(artifact_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if not isinstance(artifact, dict) or artifact.get("magic") != ARTIFACT_MAGIC:
+        return None
+    if artifact["version"] != ARTIFACT_VERSION or artifact["python"] != sys.version_info[:2]:
+        return None
+    if program is not None and artifact["source_hash"] != program_hash(program):
+        return None
+    return artifact
+
+
+def main():
+    """
+    Command-line entry point: compiles a .brewin file into an artifact next to it.
+    """
+    parser = argparse.ArgumentParser(description="Compile a Brewin program into an artifact.")
+    parser.add_argument("source", help="the .brewin file to compile")
+    parser.add_argument("-o", "--output",
+                        help=f"where to write the artifact (default: source with {ARTIFACT_SUFFIX})")
+    args = parser.parse_args()
+    output = args.output
+    if output is None:
+        stem = args.source[:-len(".brewin")] if args.source.endswith(".brewin") else args.source
+        output = stem + ARTIFACT_SUFFIX
+
+    with open(args.source, encoding="utf-8") as source_file:
+        program = source_file.readlines()
+    try:
+        artifact = compile_program(program)
+    except Exception as exception:  # pylint: disable=broad-except
+        print(f"{args.source}: {exception}", file=sys.stderr)
+        sys.exit(1)
+    with open(output, "wb") as artifact_file:
+        artifact_file.write(artifact)
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Module with the constant folding and dead code elimination pass run on each method body once
+it has been converted into AST nodes (see MethodDef.compile).
+
+The pass rewrites the tree in place, bottom up:
+    - an operator applied to literals, e.g., (+ 1 2) or (== "a" "a"), becomes a literal,
+    - an if whose condition is the literal true or false is replaced by the branch it takes,
+    - statements after a statement that always returns are dropped from begins and lets,
+    - a begin holding a single statement is replaced by that statement.
+
+An operation is only folded if evaluating it succeeds, using the same operator tables as
+ObjectDef; anything that would report an error, e.g., (+ 1 "a") or (if 5 ...), is left for
+ObjectDef to report when (and if) it runs, with the line of its statement as before. Folded
+code is also what trace output shows and what step quotas count.
+"""
+
+from intbase import InterpreterBase
+from type_valuev2 import Type, Value
+from astv2 import BINARY_KIND, CONST_KIND, UNARY_KIND, BeginNode, ConstNode, value_source
+from objectv2 import BINARY_OPS, UNARY_OPS
+
+
+# literal types that operators can be folded on; objects (i.e., null) are compared by identity
+FOLDABLE_TYPES = frozenset([Type.INT, Type.STRING, Type.BOOL])
+
+
+def fold_constants(code):
+    """
+    Folds the body of a method (a statement node); returns the statement to run instead.
+    """
+    return __fold_statement(code, True)
+
+
+def __fold_statement(code, tail):
+    # tail is set if the method ends right after code, as in astv2.build_statement
+    kind = code.kind
+    if kind in (InterpreterBase.BEGIN_DEF, InterpreterBase.LET_DEF):
+        code.statements = __fold_block(code.statements, tail)
+        if kind == InterpreterBase.BEGIN_DEF and len(code.statements) == 1:
+            return code.statements[0]
+        return code
+    if kind == InterpreterBase.IF_DEF:
+        code.condition = fold_expression(code.condition)
+        code.then_statement = __fold_statement(code.then_statement, tail)
+        if code.else_statement is not None:
+            code.else_statement = __fold_statement(code.else_statement, tail)
+        condition = code.condition
+        if condition.kind != CONST_KIND or condition.value.type() != Type.BOOL:
+            return code
+        if condition.value.value():
+            return code.then_statement
+        if code.else_statement is not None:
+            return code.else_statement
+        return BeginNode(code.line_num, [])
+    if kind == InterpreterBase.WHILE_DEF:
+        code.condition = fold_expression(code.condition)
+        code.body = __fold_statement(code.body, False)
+        return code
+    if kind == InterpreterBase.SET_DEF:
+        code.expr = fold_expression(code.expr)
+    elif kind == InterpreterBase.RETURN_DEF:
+        if code.expr is not None:
+            code.expr = fold_expression(code.expr)
+        code.tail = code.tail or tail
+    elif kind == InterpreterBase.PRINT_DEF:
+        code.exprs = [fold_expression(expr) for expr in code.exprs]
+    elif kind == InterpreterBase.CALL_DEF:
+        fold_expression(code)
+    return code
+
+
+def __fold_block(statements, tail):
+    last = len(statements) - 1
+    folded = []
+    for i, statement in enumerate(statements):
+        folded.append(__fold_statement(statement, tail and i == last))
+        if i < last and always_returns(folded[-1]):
+            # nothing after it can run, so it's now the last statement; refolding it is
+            # harmless and marks its returns as tail returns where they now are
+            folded[-1] = __fold_statement(folded[-1], tail)
+            break
+    return folded
+
+
+def always_returns(code):
+    """
+    Returns whether running a statement node always ends in a return (or an error).
+    """
+    kind = code.kind
+    if kind == InterpreterBase.RETURN_DEF:
+        return True
+    if kind in (InterpreterBase.BEGIN_DEF, InterpreterBase.LET_DEF):
+        return any(always_returns(statement) for statement in code.statements)
+    if kind == InterpreterBase.IF_DEF:
+        return (code.else_statement is not None and always_returns(code.then_statement)
+                and always_returns(code.else_statement))
+    return False
+
+
+def fold_expression(expr):
+    """
+    Folds the operands of an expression node, then the expression itself if all of them are
+    literals; returns the expression to evaluate instead.
+    """
+    kind = expr.kind
+    if kind == BINARY_KIND:
+        expr.left = fold_expression(expr.left)
+        expr.right = fold_expression(expr.right)
+        if expr.left.kind == CONST_KIND and expr.right.kind == CONST_KIND:
+            left, right = expr.left.value, expr.right.value
+            if left.type() == right.type():
+                return __fold(expr, BINARY_OPS.get(left.type(), {}), expr.operator, left, right)
+    elif kind == UNARY_KIND:
+        expr.operand = fold_expression(expr.operand)
+        if expr.operand.kind == CONST_KIND:
+            operand = expr.operand.value
+            return __fold(expr, UNARY_OPS.get(operand.type(), {}), expr.operator, operand)
+    elif kind == InterpreterBase.CALL_DEF:
+        expr.args = [fold_expression(arg) for arg in expr.args]
+    return expr
+
+
+def __fold(expr, operations, operator, *operands):
+    # the literal for operator applied to operands, or expr itself if that's an error
+    if operator not in operations or operands[0].type() not in FOLDABLE_TYPES:
+        return expr
+    try:
+        value = operations[operator](*operands)
+    except ArithmeticError:  # e.g., (/ 1 0)
+        return expr
+    if value.type() == Type.STRING:
+        value = Value(Type.STRING, str(value.value()))  # no StringRope in a shared literal
+    return ConstNode(value_source(value), value)
@@ -0,0 +1,124 @@
+"""
+Module that generates synthetic Brewin programs, along with their expected output, for
+benchmarks.
+
+Each knob of GeneratorConfig scales one dimension of the program:
+    - classes, inheritance_depth: how many classes there are, and how long their inheritance
+      chains get (class k inherits from class k - 1 unless k is a multiple of
+      inheritance_depth + 1)
+    - methods, params: methods defined per class and parameters per method; main calls every
+      method of each class's chain through an object of that class, so deeper chains mean
+      longer method lookups
+    - loop_trips: trip count of a while loop
+    - recursion_depth: depth of a recursive method
+    - let_depth: how deeply let blocks are nested
+    - string_size: length of a string built one character at a time
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    """Parameters for generate_program; see the module docstring."""
+
+    classes: int = 10
+    inheritance_depth: int = 2
+    methods: int = 4
+    params: int = 2
+    loop_trips: int = 100
+    recursion_depth: int = 20
+    let_depth: int = 3
+    string_size: int = 16
+
+
+def generate_program(config=GeneratorConfig()):
+    """
+    Returns (program, expected_output): the program as a list of source lines, and the lines
+    it prints when run.
+    """
+    lines = []
+    expected = []
+    calls = []
+    for k in range(config.classes):
+        chain_start = k - k % (config.inheritance_depth + 1)
+        if k == chain_start:
+            lines.append(f"(class c{k}")
+        else:
+            lines.append(f"(class c{k} inherits c{k - 1}")
+        lines.append(" (field int f 0)")
+        for j in range(config.methods):
+            lines.append(f" (method int {__method_name(k, j)} ({__params(config.params)})")
+            lines.append(f"  (return {__sum_expr([f'p{i}' for i in range(config.params)] + [str(__constant(k, j))])}))")
+        lines.append(")")
+        # every method of the chain, called through an object of class k
+        args = " ".join(str(i + 1) for i in range(config.params))
+        for ancestor in range(chain_start, k + 1):
+            for j in range(config.methods):
+                calls.append(f"   (print (call o{k} {__method_name(ancestor, j)} {args}))".rstrip())
+                expected.append(str(sum(range(1, config.params + 1)) + __constant(ancestor, j)))
+
+    lines.append("(class main")
+    lines.extend(__helper_methods())
+    lines.append(" (method void main ()")
+    objects = " ".join(f"(c{k} o{k} null)" for k in range(config.classes))
+    lines.append(f"  (let ({objects})" if objects else "  (begin")
+    lines.extend(f"   (set o{k} (new c{k}))" for k in range(config.classes))
+    lines.extend(calls)
+    lines.append(f"   (print (call me loop {config.loop_trips}))")
+    expected.append(str(sum(range(config.loop_trips))))
+    lines.append(f"   (print (call me down {config.recursion_depth}))")
+    expected.append(str(config.recursion_depth))
+    lines.append(f'   (print (call me rep "x" {config.string_size}))')
+    expected.append("x" * config.string_size)
+    lines.extend(__nested_lets(config.let_depth))
+    expected.append(str(sum(range(1, config.let_depth + 1))))
+    lines.append("  )")
+    lines.append(" )")
+    lines.append(")")
+    return lines, expected
+
+
+def __method_name(class_num, method_num):
+    return f"m{class_num}_{method_num}"
+
+
+def __constant(class_num, method_num):
+    return class_num * 100 + method_num
+
+
+def __params(count):
+    return " ".join(f"(int p{i})" for i in range(count))
+
+
+def __sum_expr(terms):
+    # (+ (+ a b) c) ...; + only takes two operands
+    expr = terms[0]
+    for term in terms[1:]:
+        expr = f"(+ {expr} {term})"
+    return expr
+
+
+def __helper_methods():
+    return [
+        " (method int loop ((int n))",
+        "  (let ((int i 0) (int acc 0))",
+        "   (while (< i n) (begin (set acc (+ acc i)) (set i (+ i 1))))",
+        "   (return acc)))",
+        " (method int down ((int n))",
+        "  (if (== n 0) (return 0) (return (+ 1 (call me down (- n 1))))))",
+        " (method string rep ((string s) (int n))",
+        "  (let ((string out \"\"))",
+        "   (while (> n 0) (begin (set out (+ out s)) (set n (- n 1))))",
+        "   (return out)))",
+    ]
+
+
+def __nested_lets(depth):
+    # (let ((int v1 1)) (let ((int v2 2)) ... (print (+ v1 v2 ...))))
+    if depth == 0:
+        return ["   (print 0)"]
+    lines = [f"   {' ' * i}(let ((int v{i + 1} {i + 1}))" for i in range(depth)]
+    total = __sum_expr([f"v{i + 1}" for i in range(depth)])
+    lines.append(f"   {' ' * depth}(print {total})" + ")" * depth)
+    return lines
@@ -0,0 +1,196 @@
+"""
+Module with the heap and allocation profiler used by Interpreter(heap_profile=True).
+
+Like statsv2, profiling is compiled out when it's off: a profiled run uses a subclass of its
+object class, built by heap_object_def, that registers every object (including the hidden
+parent objects that hold the base class parts of an object) along with its approximate size,
+and counts the environment frames pushed for method calls and let blocks. Values are
+observed through statsv2.observing_values while the run executes, so only the run's own
+Values are counted. Frees are noticed through weak reference callbacks on the objects and
+Values the run created; nothing is added to the classes of other runs.
+
+A snapshot holds, per Brewin class, per Value type and for environment frames, how many are
+live, how many were ever created and roughly how many bytes the live ones take (according to
+sys.getsizeof; payloads shared between Values are counted for each of them, objects referred
+to by a Value aren't). Snapshots are taken at the end of a run and each time the live total
+first exceeds threshold, 2 * threshold, 4 * threshold and so on. With a dump path, each
+snapshot is also appended to that file as a line of JSON as soon as it's taken, so it
+survives a run that then dies of running out of memory.
+"""
+
+import functools
+import inspect
+import json
+import sys
+import time
+import weakref
+
+from asyncv2 import AsyncObjectDef
+from env_v2 import EnvironmentManager
+from type_valuev2 import Type
+
+
+# approximate size of one frame: the EnvironmentManager and its (small) dict of variables
+FRAME_BYTES = sys.getsizeof(EnvironmentManager(None)) + sys.getsizeof({})
+
+
+class HeapCounts:
+    """
+    Live and total counts, and approximate live bytes, of one kind of allocation.
+    """
+
+    __slots__ = ("live", "total", "bytes", "peak", "parents")
+
+    def __init__(self):
+        self.live = 0
+        self.total = 0
+        self.bytes = 0
+        self.peak = 0  # most live at once
+        self.parents = 0  # live objects that are the base class part of another object
+
+    def as_dict(self, objects=False):
+        """
+        Returns the counts as a JSON-friendly dict; parents is only included for objects.
+        """
+        counts = {"live": self.live, "total": self.total, "bytes": self.bytes, "peak": self.peak}
+        if objects:
+            counts["parents"] = self.parents
+        return counts
+
+
+class HeapProfiler:
+    """
+    Heap counters and snapshots for one run; see the module docstring.
+    """
+
+    def __init__(self, threshold=None, dump=None):
+        self.objects = {}  # class name -> HeapCounts
+        self.values = {value_type: HeapCounts() for value_type in Type}
+        self.frames = HeapCounts()
+        self.bytes = 0  # live total
+        self.next_threshold = threshold
+        self.dump = dump
+        self.snapshots = []
+        self.constructing = 0  # nesting of ObjectDef constructors; > 0 while making parents
+        self.__started = time.perf_counter()
+        # id of a weak reference -> (the reference, HeapCounts, size, whether it's a parent
+        # object) for each live object and Value created during the run
+        self.__live = {}
+
+    def object_created(self, obj, is_parent):
+        """
+        Registers a newly constructed object.
+        """
+        size = (sys.getsizeof(obj) + sys.getsizeof(obj.fields)
+                + sum(sys.getsizeof(field) for field in obj.fields.values()))
+        counts = self.objects.get(obj.class_def.name)
+        if counts is None:
+            counts = self.objects[obj.class_def.name] = HeapCounts()
+        counts.parents += is_parent
+        self.__track(obj, counts, size, is_parent)
+
+    def value_created(self, value):
+        """
+        Called by statsv2.observing_values for each Value allocated.
+        """
+        size = sys.getsizeof(value)
+        if value.type() in (Type.INT, Type.STRING):
+            size += sys.getsizeof(value.value())
+        self.__track(value, self.values[value.type()], size, False)
+
+    def frame_pushed(self):
+        """
+        Counts an environment frame pushed for a method call or let block.
+        """
+        self.__allocated(self.frames, FRAME_BYTES)
+
+    def frame_popped(self):
+        """
+        Counts an environment frame popped.
+        """
+        self.__freed(self.frames, FRAME_BYTES)
+
+    def snapshot(self, reason):
+        """
+        Takes a snapshot (a JSON-friendly dict) and adds it to self.snapshots.
+        """
+        snapshot = {
+            "reason": reason,
+            "time": time.perf_counter() - self.__started,
+            "bytes": self.bytes,
+            "objects": {name: counts.as_dict(True) for name, counts in self.objects.items()},
+            "values": {value_type.name.lower(): counts.as_dict()
+                       for value_type, counts in self.values.items()},
+            "frames": self.frames.as_dict(),
+        }
+        self.snapshots.append(snapshot)
+        if self.dump is not None:
+            with open(self.dump, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(snapshot) + "\n")
+        return snapshot
+
+    def __track(self, allocation, counts, size, is_parent):
+        ref = weakref.ref(allocation, self.__released)
+        self.__live[id(ref)] = (ref, counts, size, is_parent)
+        self.__allocated(counts, size)
+
+    def __released(self, ref):
+        _, counts, size, is_parent = self.__live.pop(id(ref))
+        counts.parents -= is_parent
+        self.__freed(counts, size)
+
+    def __allocated(self, counts, size):
+        counts.live += 1
+        counts.total += 1
+        counts.bytes += size
+        counts.peak = max(counts.peak, counts.live)
+        self.bytes += size
+        if self.next_threshold is not None and self.bytes > self.next_threshold:
+            self.next_threshold *= 2
+            self.snapshot("threshold")
+
+    def __freed(self, counts, size):
+        counts.live -= 1
+        counts.bytes -= size
+        self.bytes -= size
+
+
+@functools.cache
+def heap_object_def(base):
+    """
+    Returns a subclass of base (an ObjectDef class) that records its objects and frames in
+    interpreter.heap.
+    """
+    mangled = "_AsyncObjectDef" if issubclass(base, AsyncObjectDef) else "_ObjectDef"
+    overrides = {}
+
+    for name in (mangled + "__run_method_body", mangled + "__execute_let"):
+        original = getattr(base, name)
+        if inspect.iscoroutinefunction(original):
+            async def framed(self, *args, original=original):
+                self.heap.frame_pushed()
+                try:
+                    return await original(self, *args)
+                finally:
+                    self.heap.frame_popped()
+        else:
+            def framed(self, *args, original=original):
+                self.heap.frame_pushed()
+                try:
+                    return original(self, *args)
+                finally:
+                    self.heap.frame_popped()
+        overrides[name] = framed
+
+    def __init__(self, interpreter, class_def, trace_output):
+        heap = self.heap = interpreter.heap
+        is_parent = heap.constructing > 0
+        heap.constructing += 1
+        try:
+            base.__init__(self, interpreter, class_def, trace_output)
+        finally:
+            heap.constructing -= 1
+        heap.object_created(self, is_parent)
+
+    overrides["__init__"] = __init__
+    return type(f"Heap{base.__name__}", (base,), overrides)
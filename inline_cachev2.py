@@ -0,0 +1,45 @@
+"""
+Module with the inline caches attached to call sites, e.g., (call obj methodname p1 p2).
+
+A call site remembers which method definition it resolved to for the receiver classes
+(and argument types) it has seen, so repeated calls can skip the full method lookup
+through the class hierarchy.
+"""
+
+
+class InlineCache:
+    """
+    Polymorphic inline cache for a single call site.
+
+    Maps a key of (receiver class def, argument type tags) to (depth, MethodDef), where
+    depth is the number of parent links between the receiver and the object that defines
+    the method. Once a site has seen more than MEGAMORPHIC_LIMIT distinct keys it is marked
+    megamorphic and always falls back to a full lookup.
+    """
+
+    MEGAMORPHIC_LIMIT = 4
+
+    __slots__ = ("entries", "megamorphic")
+
+    def __init__(self):
+        self.entries = {}
+        self.megamorphic = False
+
+    def lookup(self, key):
+        """
+        Returns the cached (depth, MethodDef) for key, or None on a miss.
+        """
+        return self.entries.get(key)
+
+    def record(self, key, depth, method_def):
+        """
+        Remembers the result of a full lookup for key.
+        """
+        if self.megamorphic:
+            return
+        if len(self.entries) >= InlineCache.MEGAMORPHIC_LIMIT:
+            # too many receiver shapes at this site; stop caching
+            self.megamorphic = True
+            self.entries.clear()
+            return
+        self.entries[key] = (depth, method_def)
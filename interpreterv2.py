@@ -3,10 +3,27 @@ The module that brings it all together! We intentionally keep this as small as p
 delegating functionality to various modules.
 """
 
-from classv2 import ClassDef
+import asyncio
+import contextlib
+import gc
+import weakref
+
 from intbase import InterpreterBase, ErrorType
-from bparser import BParser
 from objectv2 import ObjectDef
+from programv2 import Program
+from asyncv2 import AsyncObjectDef
+from statsv2 import RunStats, counting_object_def, observing_values
+from heapv2 import HeapProfiler, heap_object_def
+from codegenv2 import CompiledObjectDef
+from analysisv2 import find_short_circuit_hazards
+from memov2 import MethodMemo
+from batchv2 import JobResult, run_many
+from quotav2 import Quota, QuotaType, QuotaExceededError
+from compilev2 import read_artifact
+
+
+CountingObjectDef = counting_object_def(ObjectDef)
+CountingAsyncObjectDef = counting_object_def(AsyncObjectDef)
 
 
 class Interpreter(InterpreterBase):
@@ -14,33 +31,336 @@ class Interpreter(InterpreterBase):
     Main interpreter class that subclasses InterpreterBase.
     """
 
-    def __init__(self, console_output=True, inp=None, trace_output=False):
+    # gc_mode values:
+    #   None: leave the garbage collector alone
+    #   "freeze": collect once after loading a program and move everything alive then (classes,
+    #     method bodies) out of the collector's reach for good with gc.freeze(); runs then
+    #     collect the young generation less often
+    #   "defer": no cyclic collection at all until the program ends
+    # The collector is process-wide; its settings are restored when execute() returns. What a
+    # load froze stays frozen, since gc.unfreeze() would also thaw everything the host froze.
+    GC_MODES = (None, "freeze", "defer")
+    # young generation threshold in "freeze" mode (Python's default is 700)
+    FREEZE_GC_THRESHOLD = 10000
+
+    def __init__(self, console_output=True, inp=None, trace_output=False, short_circuit=False,
+                 memoize=False, memo_size=1024, lazy=False, strict=False, streaming=False,
+                 gc_mode=None, stats=False, codegen=False,
+                 heap_profile=False, heap_threshold=None, heap_dump=None,
+                 max_steps=None, max_call_depth=None, max_objects=None, max_output=None):
         super().__init__(console_output, inp)
+        if gc_mode not in Interpreter.GC_MODES:
+            raise ValueError(f"gc_mode must be one of {Interpreter.GC_MODES}")
+        quotas = (max_steps, max_call_depth, max_objects, max_output)
+        if codegen and (trace_output or short_circuit or stats or heap_profile
+                        or any(limit is not None for limit in quotas)):
+            raise ValueError("codegen can't be combined with trace_output, short_circuit, "
+                             "stats, heap_profile or quotas")
+        # classes, objects and environments refer back to the interpreter through this weak
+        # proxy, so the interpreter and the object graph it owns don't form reference cycles
+        self.__proxy = weakref.proxy(self)
         self.trace_output = trace_output
-        self.main_object = None
+        # if set, & and | skip their right operand once the left one decides the result
+        self.short_circuit = short_circuit
+        # if set, results of pure methods called on primitive arguments are cached
+        self.memoize = memoize
+        self.memo_size = memo_size
+        self.memo = None
+        # if set, method bodies are compiled and their return types checked on first call, so
+        # startup only pays for the methods a run actually uses
+        self.lazy = lazy
+        # if set, every method is compiled and its return and parameter types checked at load
+        # time, instead of when its class is first instantiated or the method first called
+        self.strict = strict
+        # if set, programs are parsed as a stream (see stream_parserv2) and each class is loaded
+        # as soon as it has been read; a program can then be any iterable of lines, e.g., a file
+        self.streaming = streaming
+        # if set, execution is counted (see statsv2 and get_stats)
+        self.stats_enabled = stats
+        self.stats = None
+        # if set, live and total objects, Values and frames are tracked (see heapv2 and
+        # get_heap_snapshots), with a snapshot whenever the live heap's approximate size
+        # crosses heap_threshold bytes (then twice that, and so on); snapshots are also
+        # appended to the heap_dump file, if given, as they are taken
+        self.heap_profile = heap_profile
+        self.heap_threshold = heap_threshold
+        self.heap_dump = heap_dump
+        self.heap = None
+        # if set, execute() runs method bodies as generated Python code (see codegenv2)
+        self.codegen = codegen
+        # how the cyclic garbage collector runs during execute(); see GC_MODES
+        self.gc_mode = gc_mode
+        # limits on executed statements, call depth, objects created and output size (see quotav2)
+        self.quota = None
+        if any(limit is not None for limit in quotas):
+            self.quota = Quota(*quotas)
+        # whether get_input() may read stdin once there's no input list, or it's empty; batch
+        # runs (run_inputs, batchv2's workers) turn this off
+        self.read_stdin = True
+        # the Program being run, and its class table and pure methods
+        self.program = None
         self.class_index = {}
+        self.pure_methods = frozenset()
+        self.main_object = None
+        # the class of the objects created by the current run; see execute() and execute_async()
+        self.__object_def = ObjectDef
+        # state of the current execute_async() run
+        self.yield_every = None
+        self.async_countdown = None
+        self.input_provider = None
+        self.output_provider = None
 
     def run(self, program):
         """
-        Run a program (an array of strings, where each item is a line of source code).
+        Run a program (an array of strings, where each item is a line of source code), or a
+        Program that has already been loaded.
         Delegates parsing to the provided BParser class in bparser.py.
         """
-        status, parsed_program = BParser.parse(program)
-        if not status:
-            super().error(
-                ErrorType.SYNTAX_ERROR, f"Parse error on program: {parsed_program}")
-        self.__map_class_names_to_class_defs(parsed_program)
+        if isinstance(program, Program):
+            self.use_program(program)
+        else:
+            self.load(program)
+        self.execute()
 
-        # instantiate main class
-        invalid_line_num_of_caller = None
-        self.main_object = self.instantiate(
-            InterpreterBase.MAIN_CLASS_DEF, invalid_line_num_of_caller)
+    def compile(self, program):
+        """
+        Parse and load a program (an array of strings) into a Program, without running it.
+        Errors are reported by this interpreter. The Program can then be run by any number of
+        interpreters, including concurrently from several threads.
+        """
+        if self.gc_mode is None:
+            return Program(program, self, self.lazy, self.strict, self.streaming)
+        # loading allocates a lot of long-lived objects and no garbage; don't collect meanwhile
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            loaded = Program(program, self, self.lazy, self.strict, self.streaming)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        if self.gc_mode == "freeze":
+            gc.collect()
+            gc.freeze()
+        return loaded
 
-        # call main function in main class; return value is ignored from main
-        self.main_object.call_method(
-            InterpreterBase.MAIN_FUNC_DEF, [], invalid_line_num_of_caller, None)
+    def load(self, program):
+        """
+        Parse a program and build its classes, without running it.
+        """
+        self.use_program(self.compile(program))
 
-        # program terminates!
+    def use_program(self, program):
+        """
+        Make a loaded Program the one that execute() runs.
+        """
+        self.program = program
+        self.class_index = program.class_index
+        self.pure_methods = program.pure_methods if self.memoize else frozenset()
+
+    def load_from(self, other):
+        """
+        Reuse the program another interpreter already loaded, instead of parsing and loading
+        it again.
+        """
+        self.use_program(other.program)
+
+    def load_artifact(self, path, program=None):
+        """
+        Load a program compiled ahead of time by compilev2, skipping parsing and class loading.
+        If the program's source lines are given, the artifact is only used if it was compiled
+        from that source. Returns False (loading nothing) if the artifact is missing, stale or
+        was built by an incompatible version.
+        """
+        artifact = read_artifact(path, program)
+        if artifact is None:
+            return False
+        self.use_program(artifact["program"])
+        return True
+
+    def execute(self):
+        """
+        Run the loaded program: instantiate the main class and call its main method.
+        """
+        self.__start_run()
+        if self.stats is not None:
+            self.__use_object_def(CountingObjectDef)
+        elif self.codegen:
+            self.__use_object_def(CompiledObjectDef)
+        else:
+            self.__use_object_def(ObjectDef)
+        try:
+            with self.__collector_mode(), self.__observing_values():
+                self.__run_main()
+        finally:
+            self.__end_run()
+
+    async def run_async(self, program, yield_every=1000, input_provider=None,
+                        output_provider=None):
+        """
+        Like run(), but as a coroutine that yields to the event loop every yield_every executed
+        statements, so many programs can share one event loop; see execute_async.
+        """
+        if isinstance(program, Program):
+            self.use_program(program)
+        else:
+            self.load(program)
+        await self.execute_async(yield_every, input_provider, output_provider)
+
+    async def execute_async(self, yield_every=1000, input_provider=None, output_provider=None):
+        """
+        Run the loaded program cooperatively (see asyncv2). input_provider is an async callable
+        returning the next input line for inputi/inputs (or None at the end of input);
+        output_provider is an async callable awaited with each printed line, which is also
+        logged as usual. Without providers, input and output work as in run().
+        gc_mode is ignored here: the collector is process-wide and async runs interleave. So
+        is codegen: generated code doesn't yield to the event loop.
+        """
+        self.__start_run()
+        self.yield_every = self.async_countdown = yield_every
+        self.input_provider = input_provider
+        self.output_provider = output_provider
+        self.__use_object_def(AsyncObjectDef if self.stats is None else CountingAsyncObjectDef)
+        try:
+            invalid_line_num_of_caller = None
+            with self.__observing_values():
+                self.main_object = self.instantiate(
+                    InterpreterBase.MAIN_CLASS_DEF, invalid_line_num_of_caller)
+                await self.main_object.call_method(
+                    InterpreterBase.MAIN_FUNC_DEF, [], invalid_line_num_of_caller, None)
+        finally:
+            self.__end_run()
+
+    async def checkpoint(self):
+        """
+        Called by AsyncObjectDef before each statement; yields to the event loop every
+        yield_every statements.
+        """
+        self.async_countdown -= 1
+        if self.async_countdown <= 0:
+            self.async_countdown = self.yield_every
+            await asyncio.sleep(0)
+
+    def get_input(self):
+        """
+        InterpreterBase.get_input(), except that with read_stdin off the input list, even an
+        empty one, is all the input there is: past its end, there's None, never stdin.
+        """
+        if not self.read_stdin and not self.inp:
+            return None
+        return super().get_input()
+
+    async def get_input_async(self):
+        """
+        get_input() for async runs: awaits the input provider if there is one.
+        """
+        if self.input_provider is None:
+            return self.get_input()
+        return await self.input_provider()
+
+    async def output_async(self, val):
+        """
+        output() for async runs: logs the line, then awaits the output provider if there is one.
+        """
+        self.output(val)
+        if self.output_provider is not None:
+            await self.output_provider(val)
+
+    def run_inputs(self, program, inputs):
+        """
+        Run a program (an array of strings, or a loaded Program) once per input set (a list of
+        input lines), parsing and loading it only once. Yields a batchv2.JobResult per input
+        set, in order. Before each run, the output log, input position and error state are
+        reset; each run starts from a new main object, and the previous run's objects are
+        dropped. Input comes from the input set alone, never from stdin. If the program fails
+        to load, every input set gets that error.
+        """
+        try:
+            if isinstance(program, Program):
+                self.use_program(program)
+            else:
+                self.load(program)
+        except Exception as exception:  # pylint: disable=broad-except
+            error_type, error_line = self.get_error_type_and_line()
+            for index, _ in enumerate(inputs):
+                yield JobResult(index, [], error_type, error_line, str(exception))
+            return
+        read_stdin = self.read_stdin
+        self.read_stdin = False
+        try:
+            for index, inp in enumerate(inputs):
+                self.reset()
+                self.inp = list(inp)
+                try:
+                    self.execute()
+                except Exception as exception:  # pylint: disable=broad-except
+                    error_type, error_line = self.get_error_type_and_line()
+                    yield JobResult(index, self.get_output(), error_type, error_line,
+                                    str(exception))
+                else:
+                    yield JobResult(index, self.get_output(), None, None, None)
+                finally:
+                    self.main_object = None
+        finally:
+            self.read_stdin = read_stdin
+
+    @staticmethod
+    def run_many(jobs, workers=None, **options):
+        """
+        Run many (program, input) jobs on a pool of worker processes; see batchv2.run_many.
+        Yields a JobResult per job as soon as the batch of jobs it was shipped in finishes.
+        """
+        return run_many(jobs, workers, **options)
+
+    def find_short_circuit_hazards(self, program):
+        """
+        Statically checks a program for & and | expressions whose result could differ between
+        eager and short-circuit evaluation (see analysisv2). Returns (line_num, description) tuples.
+        """
+        self.load(program)
+        return find_short_circuit_hazards(self.class_index)
+
+    def get_stats(self):
+        """
+        Returns the counters gathered during the last run (see statsv2.RunStats), or None if
+        stats are off: statements executed by kind, expressions evaluated, method calls, full
+        method lookups and the parent links they followed, objects created per class, let
+        frames created and Values allocated.
+        """
+        if self.stats is None:
+            return None
+        return self.stats.as_dict()
+
+    def get_heap_snapshots(self):
+        """
+        Returns the heap snapshots (see heapv2.HeapProfiler.snapshot) of the last run, the one
+        taken at its end last, or None if heap_profile is off.
+        """
+        if self.heap is None:
+            return None
+        return self.heap.snapshots
+
+    def get_memo_stats(self):
+        """
+        Returns hit/miss/eviction counters for the pure method memo, or None if memoize is off.
+        """
+        if self.memo is None:
+            return None
+        return self.memo.get_stats()
+
+    def quota_exceeded(self, quota_type, line_num=None):
+        """
+        Logs and raises a QuotaExceededError for the given QuotaType; like error(), the type and
+        line are then available from get_error_type_and_line().
+        """
+        self.error_type = quota_type
+        self.error_line = line_num
+        limits = {
+            QuotaType.STEPS: self.quota.max_steps,
+            QuotaType.CALL_DEPTH: self.quota.max_call_depth,
+            QuotaType.OBJECTS: self.quota.max_objects,
+            QuotaType.OUTPUT: self.quota.max_output,
+        }
+        raise QuotaExceededError(quota_type, limits[quota_type], line_num)
 
     def instantiate(self, class_name, line_num_of_statement):
         """
@@ -54,26 +374,68 @@ class Interpreter(InterpreterBase):
                 f"No class named {class_name} found",
                 line_num_of_statement)
         class_def = self.class_index[class_name]
-        obj = ObjectDef(
-            self, class_def, self.trace_output)  # Create an object based on this class definition
+        quota = self.quota
+        if quota is not None:
+            if quota.objects >= quota.max_objects:
+                self.quota_exceeded(QuotaType.OBJECTS, line_num_of_statement)
+            quota.objects += 1
+        obj = self.__object_def(
+            self.__proxy, class_def, self.trace_output)  # Create an object based on this class definition
         return obj
 
-    def __map_class_names_to_class_defs(self, program):
-        self.class_index = {}
-        for item in program:
-            if item[0] == InterpreterBase.CLASS_DEF:
-                if item[1] in self.class_index:
-                    super().error(ErrorType.TYPE_ERROR,
-                                  f"Duplicate class name {item[1]}", item[0].line_num)
-                # no inheritance
-                if isinstance(item[2], list) and item[2] != InterpreterBase.INHERITS_DEF:
-                    self.class_index[item[1]] = ClassDef(item, self, None)
-                elif item[2] == InterpreterBase.INHERITS_DEF:
-                    if item[3] not in self.class_index:
-                        # inheriting from a class that doesn't exist
-                        super().error(ErrorType.NAME_ERROR,
-                                      f"Base class {item[3]} does not exist", item[0].line_num)
-                    else:
-                        parent = self.class_index[item[3]]
-                        self.class_index[item[1]] = ClassDef(
-                            item, self, parent)
+    def __start_run(self):
+        # per-run state that execute() and execute_async() both reset
+        if self.stats_enabled:
+            self.stats = RunStats()
+        if self.heap_profile:
+            self.heap = HeapProfiler(self.heap_threshold, self.heap_dump)
+        if self.memoize:
+            self.memo = MethodMemo(self.memo_size)
+        if self.quota is not None:
+            self.quota.reset()
+
+    def __use_object_def(self, object_def):
+        if self.heap is not None:
+            object_def = heap_object_def(object_def)
+        self.__object_def = object_def
+
+    def __end_run(self):
+        self.__object_def = ObjectDef
+        if self.heap is not None:
+            self.heap.snapshot("end")
+
+    def __observing_values(self):
+        return observing_values(
+            observer for observer in (self.stats, self.heap) if observer is not None)
+
+    @contextlib.contextmanager
+    def __collector_mode(self):
+        # applies gc_mode for the duration of a run and restores the collector's settings after
+        if self.gc_mode is None:
+            yield
+            return
+        gc_was_enabled = gc.isenabled()
+        threshold = gc.get_threshold()
+        if self.gc_mode == "freeze":
+            # the program itself was frozen when it was loaded (see compile)
+            gc.set_threshold(Interpreter.FREEZE_GC_THRESHOLD, *threshold[1:])
+        else:
+            gc.disable()
+        try:
+            yield
+        finally:
+            gc.set_threshold(*threshold)
+            if gc_was_enabled:
+                gc.enable()
+
+    def __run_main(self):
+        # instantiate main class
+        invalid_line_num_of_caller = None
+        self.main_object = self.instantiate(
+            InterpreterBase.MAIN_CLASS_DEF, invalid_line_num_of_caller)
+
+        # call main function in main class; return value is ignored from main
+        self.main_object.call_method(
+            InterpreterBase.MAIN_FUNC_DEF, [], invalid_line_num_of_caller, None)
+
+        # program terminates!
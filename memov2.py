@@ -0,0 +1,71 @@
+"""
+Module with the memoization layer for pure Brewin methods (see analysisv2.find_pure_methods).
+"""
+
+from collections import OrderedDict
+
+from type_valuev2 import Type
+
+
+class MethodMemo:
+    """
+    Bounded LRU cache of method results.
+
+    Keys are (MethodDef, class def of the original caller, argument values). The original caller
+    is part of the key because (call me ...) inside the method dispatches on its class.
+    Only calls whose arguments are all primitive values are cached.
+    """
+
+    PRIMITIVE_TYPES = (Type.INT, Type.BOOL, Type.STRING)
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(method_def, original_caller, actual_params):
+        """
+        Returns the cache key for a call, or None if an argument isn't a primitive value.
+        """
+        args = []
+        for param in actual_params:
+            if param.type() not in MethodMemo.PRIMITIVE_TYPES:
+                return None
+            args.append((param.type(), param.value()))
+        return method_def, original_caller.class_def, tuple(args)
+
+    def get(self, key):
+        """
+        Returns the cached result Value for key (marking it most recently used), or None.
+        """
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """
+        Caches a result, evicting the least recently used entry if the memo is full.
+        """
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+    def get_stats(self):
+        """
+        Returns the hit/miss/eviction counters and the current size of the memo.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.results),
+            "max_size": self.max_size,
+        }
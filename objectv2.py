@@ -6,14 +6,72 @@ of the code to execute various instructions.
 from env_v2 import EnvironmentManager
 from intbase import InterpreterBase, ErrorType
 from type_valuev2 import create_value, check_type
-from type_valuev2 import Type, Value
+from type_valuev2 import Type, Value, StringRope
+from quickenv2 import specialize, DEOPTIMIZED
+from inline_cachev2 import InlineCache
+from astv2 import NAME_KIND, CONST_KIND, BINARY_KIND, UNARY_KIND, to_source
+from quotav2 import QuotaType
+
+
+# maps to facilitate binary and unary operations, e.g., (+ 5 6); shared by all objects
+BINARY_OPS = {}
+BINARY_OPS[Type.INT] = {
+    "+": lambda a, b: Value(Type.INT, a.value() + b.value()),
+    "-": lambda a, b: Value(Type.INT, a.value() - b.value()),
+    "*": lambda a, b: Value(Type.INT, a.value() * b.value()),
+    "/": lambda a, b: Value(
+        Type.INT, a.value() // b.value()
+    ),  # // for integer ops
+    "%": lambda a, b: Value(Type.INT, a.value() % b.value()),
+    "==": lambda a, b: Value(Type.BOOL, a.value() == b.value()),
+    "!=": lambda a, b: Value(Type.BOOL, a.value() != b.value()),
+    ">": lambda a, b: Value(Type.BOOL, a.value() > b.value()),
+    "<": lambda a, b: Value(Type.BOOL, a.value() < b.value()),
+    ">=": lambda a, b: Value(Type.BOOL, a.value() >= b.value()),
+    "<=": lambda a, b: Value(Type.BOOL, a.value() <= b.value()),
+}
+# string payloads may be StringRopes; str() flattens them for comparisons
+BINARY_OPS[Type.STRING] = {
+    "+": lambda a, b: Value(Type.STRING, StringRope.concat(a.value(), b.value())),
+    "==": lambda a, b: Value(Type.BOOL, str(a.value()) == str(b.value())),
+    "!=": lambda a, b: Value(Type.BOOL, str(a.value()) != str(b.value())),
+    ">": lambda a, b: Value(Type.BOOL, str(a.value()) > str(b.value())),
+    "<": lambda a, b: Value(Type.BOOL, str(a.value()) < str(b.value())),
+    ">=": lambda a, b: Value(Type.BOOL, str(a.value()) >= str(b.value())),
+    "<=": lambda a, b: Value(Type.BOOL, str(a.value()) <= str(b.value())),
+}
+BINARY_OPS[Type.BOOL] = {
+    "&": lambda a, b: Value(Type.BOOL, a.value() and b.value()),
+    "|": lambda a, b: Value(Type.BOOL, a.value() or b.value()),
+    "==": lambda a, b: Value(Type.BOOL, a.value() == b.value()),
+    "!=": lambda a, b: Value(Type.BOOL, a.value() != b.value()),
+}
+BINARY_OPS[Type.CLASS] = {
+    "==": lambda a, b: Value(Type.BOOL, a.value() is b.value()),
+    "!=": lambda a, b: Value(Type.BOOL, a.value() is not b.value()),
+}
+
+UNARY_OPS = {}
+UNARY_OPS[Type.BOOL] = {
+    "!": lambda a: Value(Type.BOOL, not a.value()),
+}
+
+
+class ReturnSignal(Exception):
+    """
+    Raised by a (return ...) that isn't a tail return (see astv2.build_statement) to unwind the
+    statements it is nested in; caught where the method was called. Statements otherwise
+    return None, so running a statement normally costs nothing for the sake of returns.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
 
 
 class ObjectDef:
-    STATUS_PROCEED = 0
-    STATUS_RETURN = 1
-    STATUS_NAME_ERROR = 2
-    STATUS_TYPE_ERROR = 3
     primitives = set([InterpreterBase.STRING_DEF,
                      InterpreterBase.BOOL_DEF, InterpreterBase.INT_DEF])
 
@@ -23,15 +81,15 @@ class ObjectDef:
         # take class body from 3rd+ list elements, e.g., ["class",classname", [classbody]]
         self.class_def = class_def
         if self.class_def.parent:
-            self.parent = ObjectDef(
+            # same class as self, so subclasses (e.g., statsv2's) also apply to base class parts
+            self.parent = self.__class__(
                 self.interpreter, self.interpreter.class_index[self.class_def.parent.name], self.interpreter.trace_output)
         else:
             self.parent = None
         self.trace_output = trace_output
+        self.quota = interpreter.quota
         self.__map_fields_to_values()
         self.__map_method_names_to_method_definitions()
-        # sets up maps to facilitate binary and unary operations, e.g., (+ 5 6)
-        self.__create_map_of_operations_to_lambdas()
 
     def call_method(self, method_name, actual_params, line_num_of_caller, original_caller):
         """
@@ -42,18 +100,122 @@ class ObjectDef:
         """
         if original_caller is None:
             original_caller = self
-        print(f"OG {original_caller.class_def.name} for {method_name}")
-        method_info = None
-        if method_name in self.methods:
-            method_def = self.methods[method_name]
-            if self.__check_method_def(method_def, actual_params):
-                method_info = method_def
-        if self.parent and method_info is None:  # haven't found the method that matches yet
-            return self.parent.call_method(method_name, actual_params, line_num_of_caller, original_caller)
+        depth, method_info = self.resolve_method(method_name, actual_params)
         if not method_info:  # throw this error when you've gone through all the parents and the method has not been found
             self.interpreter.error(
                 ErrorType.NAME_ERROR, "unknown method " + method_name, line_num_of_caller)
-        env = []
+        return self.ancestor(depth).invoke_method(
+            method_info, actual_params, original_caller, line_num_of_caller)
+
+    def resolve_method(self, method_name, actual_params):
+        """
+        Full method lookup: finds the first object in the parent chain (starting with this one)
+        that defines a method matching the name and the actual parameters.
+        Returns (depth, MethodDef), where depth counts the parent links followed, or (None, None)
+        if no matching method exists.
+        """
+        obj = self
+        depth = 0
+        while obj:
+            if method_name in obj.methods:
+                method_def = obj.methods[method_name]
+                if obj.__check_method_def(method_def, actual_params):
+                    return depth, method_def
+            obj = obj.parent    # haven't found the method that matches yet
+            depth += 1
+        return None, None
+
+    def ancestor(self, depth):
+        """
+        Returns the parent object depth levels up the inheritance chain (0 is this object).
+        """
+        obj = self
+        for _ in range(depth):
+            obj = obj.parent
+        return obj
+
+    def invoke_method(self, method_info, actual_params, original_caller, line_num_of_caller=None):
+        """
+        Runs an already resolved method defined by this object's class on the actual parameters.
+        line_num_of_caller is where errors about the call itself (e.g., too deep) are reported.
+        """
+        if method_info.accessor is not None:
+            result = self._inline_accessor(method_info, actual_params)
+            if result is not None:
+                return result
+        key = self._memo_key(method_info, actual_params, original_caller)
+        if key is not None:
+            memo = self.interpreter.memo
+            result = memo.get(key)
+            if result is None:
+                result = self.__run_method(method_info, actual_params, original_caller, line_num_of_caller)
+                memo.put(key, result)
+            return result
+        return self.__run_method(method_info, actual_params, original_caller, line_num_of_caller)
+
+    # returns the key a call's result is memoized under (see memov2), or None if it isn't
+    def _memo_key(self, method_info, actual_params, original_caller):
+        memo = self.interpreter.memo
+        if memo is None or method_info not in self.interpreter.pure_methods:
+            return None
+        return memo.make_key(method_info, original_caller, actual_params)
+
+    # runs a trivial getter or setter (see analysisv2.Accessor) by accessing the field directly;
+    # returns None if that could skip a check, some steps or statements, or a first-call
+    # validation, and the method must really be run
+    def _inline_accessor(self, method_info, actual_params):
+        if self.quota is not None or self.trace_output or not method_info.validated:
+            return None
+        accessor = method_info.accessor
+        field = self.fields.get(accessor.field_name)
+        if field is None or field[1] != accessor.field_type:
+            return None
+        if accessor.param_name is None:
+            return field[0]
+        self.fields[accessor.field_name] = (actual_params[0], field[1])
+        return Value(Type.NOTHING)
+
+    def __run_method(self, method_info, actual_params, original_caller, line_num_of_caller):
+        quota = self._enter_method(method_info, line_num_of_caller)
+        if quota is None:
+            return self.__run_method_body(method_info, actual_params, original_caller)
+        try:
+            return self.__run_method_body(method_info, actual_params, original_caller)
+        finally:
+            quota.call_depth -= 1
+
+    # validates a method on its first call and counts the call, made on line_num_of_caller,
+    # against the call depth quota; returns the quota, if any, whose call_depth must be
+    # decremented once the method returns
+    def _enter_method(self, method_info, line_num_of_caller):
+        if not method_info.validated:
+            method_info.validate(self.interpreter, self.interpreter.class_index)
+        quota = self.quota
+        if quota is not None:
+            if quota.call_depth >= quota.max_call_depth:
+                self.interpreter.quota_exceeded(QuotaType.CALL_DEPTH, line_num_of_caller)
+            quota.call_depth += 1
+        return quota
+
+    def __run_method_body(self, method_info, actual_params, original_caller):
+        env = self._method_env(method_info, actual_params)
+        return_type = method_info.return_type
+        # since each method has a single top-level statement, execute it.
+        try:
+            return_value = self.__execute_statement(
+                env, method_info.code, return_type, original_caller)
+        except ReturnSignal as signal:
+            return signal.value
+        # if the method explicitly used the (return expression) statement to return a value, then return that
+        # value back to the caller; only a tail return produces a value here
+        if return_value is not None:
+            return return_value
+        # The method didn't explicitly return a value, so return the default value of the function's return type
+        ret_val = self._get_default_return(return_type)
+        return ret_val
+
+    # the environment a method starts with: its parameters bound to the actual parameters
+    def _method_env(self, method_info, actual_params):
         args = (
             EnvironmentManager(self.interpreter)
         )  # maintains lexical environment for function; just params for now
@@ -61,30 +223,17 @@ class ObjectDef:
             if actual.value() is None and actual.class_name() is None:
                 actual = Value(Type.CLASS, actual.value(), formal_type)
             args.set(formal_var, actual, formal_type)
-        env.append(args)
-        return_type = method_info.return_type
-        # since each method has a single top-level statement, execute it.
-        status, return_value = self.__execute_statement(
-            env, method_info.code, return_type, original_caller)
-        # if the method explicitly used the (return expression) statement to return a value, then return that
-        # value back to the caller
-        if status == ObjectDef.STATUS_RETURN:
-            return return_value
-        # The method didn't explicitly return a value, so return the default value of the function's return type
-        ret_val = self.__get_default_return(return_type)
-        return ret_val
+        return [args]
 
     def __execute_statement(self, env, code, return_type, original_caller):
         """
-        returns (status_code, return_value) where:
-        - status_code indicates if the next statement includes a return
-            - if so, the current method should terminate
-            - otherwise, the next statement in the method should run normally
-        - return_value is a Value containing the returned value from the function
+        returns None, except for a tail return (see astv2.build_statement), which returns the
+        Value returned from the function. Any other return raises a ReturnSignal, so that the
+        statements it is nested in don't need to check for it.
         """
-        if self.trace_output:
-            print(f"{code[0].line_num}: {code}")
-        tok = code[0]
+        if self.trace_output or self.quota is not None:
+            self._count_step(code)
+        tok = code.kind
         if tok == InterpreterBase.BEGIN_DEF:
             return self.__execute_begin(env, code, return_type, original_caller)
         if tok == InterpreterBase.SET_DEF:
@@ -107,116 +256,143 @@ class ObjectDef:
             return self.__execute_let(env, code, return_type, original_caller)
 
         self.interpreter.error(
-            ErrorType.SYNTAX_ERROR, "unknown statement " + tok, tok.line_num)
+            ErrorType.SYNTAX_ERROR, f"unknown statement {code}", code.line_num)
+
+    # traces a statement about to run, and counts it against the step quota
+    def _count_step(self, code):
+        if self.trace_output:
+            print(f"{code.line_num}: {code}")
+        quota = self.quota
+        if quota is not None:
+            quota.steps += 1
+            if quota.steps > quota.max_steps:
+                self.interpreter.quota_exceeded(QuotaType.STEPS, code.line_num)
 
     def __execute_let(self, env, code, return_type, original_caller):
+        env.append(self._let_block(code))
+        return_value = self.__execute_begin(
+            env, code, return_type, original_caller)
+        env.pop()  # not needed when a ReturnSignal unwinds the method, whose env goes away
+        return return_value
+
+    # the environment holding a let's variables, bound to their initial values
+    def _let_block(self, code):
         block = EnvironmentManager(self.interpreter)
-        # var: [type name value]
-        for var in code[1]:
-            var_type = var[0]
-            var_name = var[1]
-            var_val = create_value(var[2], var_type)
+        # var: (type, name, value)
+        for var_type, var_name, var_val in code.variables:
             test = block.get(var_name)
             if test is not None:    # if variable with same name has been declared in this let block
                 self.interpreter.error(
-                    ErrorType.NAME_ERROR, f"already have a variable assigned to {var_name}", code[0].line_num)
+                    ErrorType.NAME_ERROR, f"already have a variable assigned to {var_name}", code.line_num)
             if var_val.type() == Type.CLASS:
-                if self.__polymorphic(var_type, var_val.class_name()):
+                if self._polymorphic(var_type, var_val.class_name()):
                     block.set(var_name, var_val, var_type)
                 else:
                     self.interpreter.error(
-                        ErrorType.TYPE_ERROR, f"setting variable {var_name} to wrong type", code[0].line_num)
+                        ErrorType.TYPE_ERROR, f"setting variable {var_name} to wrong type", code.line_num)
             elif check_type(var_val.type(), var_type):
                 block.set(var_name, var_val, var_type)
             else:
                 self.interpreter.error(
-                    ErrorType.TYPE_ERROR, f"setting variable {var_name} to wrong type", code[0].line_num)
-        env.append(block)
-        status, return_value = self.__execute_begin(
-            env, code[1:], return_type, original_caller)
-        env.pop()
-        return status, return_value
+                    ErrorType.TYPE_ERROR, f"setting variable {var_name} to wrong type", code.line_num)
+        return block
 
     # (begin (statement1) (statement2) ... (statementn))
     def __execute_begin(self, env, code, return_type, original_caller):
-        for statement in code[1:]:
-            status, return_value = self.__execute_statement(
-                env, statement, return_type, original_caller)
-            if status == ObjectDef.STATUS_RETURN:
-                return (
-                    status,
-                    return_value,
-                )  # could be a valid return of a value or an error
-        # if we run thru the entire block without a return, then just return proceed
-        # we don't want the calling block to exit with a return
-        return ObjectDef.STATUS_PROCEED, None
+        statements = code.statements
+        if not statements:
+            return None
+        for statement in statements[:-1]:
+            self.__execute_statement(env, statement, return_type, original_caller)
+        # only the last statement can hold a tail return
+        return self.__execute_statement(env, statements[-1], return_type, original_caller)
 
     # (call object_ref/me methodname param1 param2 param3)
     # where params are expressions, and expresion could be a value, or a (+ ...)
     # statement version of a method call; there's also an expression version of a method call below
     def __execute_call(self, env, code, original_caller):
-        return ObjectDef.STATUS_PROCEED, self.__execute_call_aux(
-            env, code, code[0].line_num, original_caller)
+        self.__execute_call_aux(env, code, code.line_num, original_caller)
 
     # (set varname expression), where expresion could be a value, or a (+ ...)
     def __execute_set(self, env, code, original_caller):
         val = self.__evaluate_expression(
-            env, code[2], code[0].line_num, original_caller)
-        self.__set_variable_aux(env, code[1], val, code[0].line_num)
-        return ObjectDef.STATUS_PROCEED, None
+            env, code.expr, code.line_num, original_caller)
+        self._set_variable_aux(env, code.name, val, code.line_num)
 
     # (return expression) where expresion could be a value, or a (+ ...)
+    # a tail return returns the value; any other return raises it in a ReturnSignal
     def __execute_return(self, env, code, return_type, original_caller):
-        if len(code) == 1 and return_type == InterpreterBase.VOID_DEF:
-            # [return] with no return expression
-            return ObjectDef.STATUS_RETURN, create_value(InterpreterBase.NOTHING_DEF)
-        elif len(code) == 1:    # if we return but function's return type isn't void
-            return ObjectDef.STATUS_RETURN, self.__get_default_return(return_type)
-        else:
-            ret_val = self.__evaluate_expression(
-                env, code[1], code[0].line_num, original_caller)
-            # print(ret_val.value().class_def.name)
-            if ret_val.type() == Type.CLASS and return_type in self.interpreter.class_index:
-                if ret_val.value() is None and ret_val.class_name() is None:    # return null literal
-                    ret_val = Value(Type.CLASS, None, return_type)
-                if self.__polymorphic(return_type, ret_val.class_name()):
-                    return ObjectDef.STATUS_RETURN, ret_val
-            elif check_type(ret_val.type(), return_type):
-                return ObjectDef.STATUS_RETURN, ret_val
+        ret_val = self.__return_value(env, code, return_type, original_caller)
+        if code.tail:
+            return ret_val
+        raise ReturnSignal(ret_val)
+
+    def __return_value(self, env, code, return_type, original_caller):
+        if code.expr is None:
+            return self._empty_return(return_type)
+        ret_val = self.__evaluate_expression(
+            env, code.expr, code.line_num, original_caller)
+        return self._check_return(ret_val, return_type, code.line_num)
+
+    # the value a [return] with no return expression returns
+    def _empty_return(self, return_type):
+        if return_type == InterpreterBase.VOID_DEF:
+            return create_value(InterpreterBase.NOTHING_DEF)
+        return self._get_default_return(return_type)  # the function's return type isn't void
+
+    # returns the value a method returns for ret_val, or reports a TYPE_ERROR if it doesn't fit
+    # the return type
+    def _check_return(self, ret_val, return_type, line_num):
+        if ret_val.type() == Type.CLASS and return_type in self.interpreter.class_index:
+            if ret_val.value() is None and ret_val.class_name() is None:    # return null literal
+                ret_val = Value(Type.CLASS, None, return_type)
+            if self._polymorphic(return_type, ret_val.class_name()):
+                return ret_val
+        elif check_type(ret_val.type(), return_type):
+            return ret_val
 
         self.interpreter.error(ErrorType.TYPE_ERROR,
-                               "Function returns wrong type", code[0].line_num)
+                               "Function returns wrong type", line_num)
 
     # (print expression1 expression2 ...) where expresion could be a variable, value, or a (+ ...)
     def __execute_print(self, env, code, original_caller):
-        output = ""
-        for expr in code[1:]:
+        terms = [self.__evaluate_expression(env, expr, code.line_num, original_caller)
+                 for expr in code.exprs]
+        self.interpreter.output(self._print_line(code, terms))
+
+    # the line a print statement outputs for its evaluated terms
+    def _print_line(self, code, terms):
+        output = []
+        for term in terms:
             # TESTING NOTE: Will not test printing of object references
-            term = self.__evaluate_expression(
-                env, expr, code[0].line_num, original_caller)
             val = term.value()
             typ = term.type()
             if typ == Type.BOOL:
                 val = "true" if val else "false"
             # document - will never print out an object ref
-            output += str(val)
-        self.interpreter.output(output)
-        return ObjectDef.STATUS_PROCEED, None
+            output.append(str(val))
+        line = "".join(output)
+        quota = self.quota
+        if quota is not None:
+            quota.output_size += len(line) + 1
+            if quota.output_size > quota.max_output:
+                self.interpreter.quota_exceeded(QuotaType.OUTPUT, code.line_num)
+        return line
 
     # (inputs target_variable) or (inputi target_variable) sets target_variable to input string/int
     def __execute_input(self, env, code, get_string, _):
         inp = self.interpreter.get_input()
-        if get_string:
-            val = Value(Type.STRING, inp)
-        else:
-            val = Value(Type.INT, int(inp))
+        self._set_variable_aux(env, code.name, self._input_value(inp, get_string), code.line_num)
 
-        self.__set_variable_aux(env, code[1], val, code[0].line_num)
-        return ObjectDef.STATUS_PROCEED, None
+    @staticmethod
+    def _input_value(inp, get_string):
+        if get_string:
+            return Value(Type.STRING, inp)
+        return Value(Type.INT, int(inp))
 
     # helper method used to set either parameter variables or member fields; parameters currently shadow
     # member fields
-    def __set_variable_aux(self, env, var_name, value, line_num):
+    def _set_variable_aux(self, env, var_name, value, line_num):
         # parameter shadows fields
         if value.type() == Type.NOTHING:
             self.interpreter.error(
@@ -229,188 +405,288 @@ class ObjectDef:
                 current = i
                 break
         if param_val is not None:   # the variable is a parameter to the function
-            if value.type() == Type.CLASS:
-                if value.value() is None and value.class_name() is None:  # setting variable to null literal
-                    value = Value(Type.CLASS, value.value(), var_type)
-                if self.__polymorphic(var_type, value.class_name()):
-                    env[current].set(var_name, value, var_type)
-                else:
-                    self.interpreter.error(
-                        ErrorType.TYPE_ERROR, f"assigning {var_name} to a class variable of the wrong type", line_num)
-            elif check_type(value.type(), var_type):
-                env[current].set(var_name, value, var_type)
-            else:
-                self.interpreter.error(
-                    ErrorType.TYPE_ERROR, f"assigning {var_name} to a value of the wrong type", line_num)
+            value = self._check_assignment(value, var_type, var_name, line_num)
+            env[current].set(var_name, value, var_type)
             return
 
         if var_name not in self.fields:
             self.interpreter.error(
                 ErrorType.NAME_ERROR, "unknown variable " + var_name, line_num)
         field_type = self.fields[var_name][1]
+        value = self._check_assignment(value, field_type, var_name, line_num)
+        self.fields[var_name] = (value, field_type)
+
+    # returns the value to store when assigning value to a variable of var_type, or reports a
+    # TYPE_ERROR if it doesn't fit
+    def _check_assignment(self, value, var_type, var_name, line_num):
         if value.type() == Type.CLASS:
             if value.value() is None and value.class_name() is None:  # setting variable to null literal
-                value = Value(Type.CLASS, value.value(), field_type)
-            if self.__polymorphic(field_type, value.class_name()):
-                self.fields[var_name] = (value, field_type)
-            else:
-                self.interpreter.error(
-                    ErrorType.TYPE_ERROR, f"assigning {var_name} to a class variable of the wrong type", line_num)
-        elif check_type(value.type(), field_type):
-            self.fields[var_name] = (value, field_type)
-        else:
+                value = Value(Type.CLASS, value.value(), var_type)
+            if self._polymorphic(var_type, value.class_name()):
+                return value
             self.interpreter.error(
-                ErrorType.TYPE_ERROR, f"assigning {var_name} to a value of the wrong type", line_num)
+                ErrorType.TYPE_ERROR, f"assigning {var_name} to a class variable of the wrong type", line_num)
+        elif check_type(value.type(), var_type):
+            return value
+        self.interpreter.error(
+            ErrorType.TYPE_ERROR, f"assigning {var_name} to a value of the wrong type", line_num)
 
     # (if expression (statement) (statement) ) where expresion could be a boolean constant (e.g., true), member
     # variable without ()s, or a boolean expression in parens, like (> 5 a)
     def __execute_if(self, env, code, return_type, original_caller):
         condition = self.__evaluate_expression(
-            env, code[1], code[0].line_num, original_caller)
-        if condition.type() != Type.BOOL:
-            self.interpreter.error(ErrorType.TYPE_ERROR,
-                                   "non-boolean if condition " + ' '.join(x for x in code[1]), code[0].line_num)
-        if condition.value():
-            status, return_value = self.__execute_statement(
-                env, code[2], return_type, original_caller)  # if condition was true
-            return status, return_value
-        if len(code) == 4:
-            status, return_value = self.__execute_statement(
-                env, code[3], return_type, original_caller)  # if condition was false, do else
-            return status, return_value
-        return ObjectDef.STATUS_PROCEED, None
+            env, code.condition, code.line_num, original_caller)
+        if self._check_condition(condition, code, "if"):
+            return self.__execute_statement(
+                env, code.then_statement, return_type, original_caller)  # if condition was true
+        if code.else_statement is not None:
+            return self.__execute_statement(
+                env, code.else_statement, return_type, original_caller)  # if condition was false, do else
+        return None
 
     # (while expression (statement) ) where expresion could be a boolean value, boolean member variable,
     # or a boolean expression in parens, like (> 5 a)
     def __execute_while(self, env, code, return_type, original_caller):
+        plan = code.plan
+        if plan is not None:
+            return self.__execute_counter_loop(env, code, plan, return_type, original_caller)
         while True:
             condition = self.__evaluate_expression(
-                env, code[1], code[0].line_num, original_caller)
-            if condition.type() != Type.BOOL:
-                self.interpreter.error(ErrorType.TYPE_ERROR,
-                                       "non-boolean while condition " + ' '.join(x for x in code[1]), code[0].line_num)
-            if not condition.value():  # condition is false, exit loop immediately
-                return ObjectDef.STATUS_PROCEED, None
-            # condition is true, run body of while loop
-            status, return_value = self.__execute_statement(
-                env, code[2], return_type, original_caller)
-            if status == ObjectDef.STATUS_RETURN:
-                # could be a valid return of a value or an error
-                return (status, return_value)
+                env, code.condition, code.line_num, original_caller)
+            if not self._check_condition(condition, code, "while"):  # exit loop immediately
+                return None
+            # condition is true, run body of while loop; a return in it raises a ReturnSignal
+            self.__execute_statement(env, code.body, return_type, original_caller)
+
+    # counter-style loop recognized at load time (see analysisv2.CounterLoop)
+    def __execute_counter_loop(self, env, code, plan, return_type, original_caller):
+        for proceed in self._counter_loop_checks(env, plan):
+            if proceed is None:
+                condition = self.__evaluate_expression(
+                    env, code.condition, code.line_num, original_caller)
+                proceed = self._check_condition(condition, code, "while")
+            if not proceed:
+                return None
+            self.__execute_statement(env, code.body, return_type, original_caller)
+        return None
+
+    # returns the truth value of an if or while condition, which must be a bool
+    def _check_condition(self, condition, code, statement_kind):
+        if condition.type() != Type.BOOL:
+            self.interpreter.error(ErrorType.TYPE_ERROR,
+                                   f"non-boolean {statement_kind} condition {code.condition}", code.line_num)
+        return condition.value()
+
+    # yields, before each trip of a counter loop, whether to run the body, compared on raw ints;
+    # yields None when the counter or bound isn't an int, and the condition must be evaluated
+    def _counter_loop_checks(self, env, plan):
+        bound = plan.bound_literal
+        if bound is None and plan.invariant_bound:
+            bound = self._int_variable(env, plan.bound_name)
+        while True:
+            if not plan.invariant_bound:
+                bound = self._int_variable(env, plan.bound_name)
+            counter = self._int_variable(env, plan.counter)
+            if counter is not None and bound is not None:
+                yield plan.compare(counter, bound)
+            else:
+                yield None
+
+    # returns the Value of a parameter, local variable or field, or None if there's no such variable
+    def _lookup_variable(self, env, name):
+        # locals shadow member variables
+        # loop through the stack of environments looking for the nearest definition of the variable
+        for i in range(len(env)-1, -1, -1):
+            val = env[i].get(name)
+            if val:
+                return val
+        if name in self.fields:  # if it's a field
+            return self.fields[name][0]
+        return None
+
+    # returns the Python int held by an int variable, or None if it isn't one
+    def _int_variable(self, env, name):
+        val = self._lookup_variable(env, name)
+        if val is None or val.type() != Type.INT:
+            return None
+        return val.value()
 
     # given an expression, return a Value object with the expression's evaluated result
     # expressions could be: constants (true, 5, "blah"), variables (e.g., x), arithmetic/string/logical expressions
     # like (+ 5 6), (+ "abc" "def"), (> a 5), method calls (e.g., (call me foo)), or instantiations (e.g., new dog_class)
     def __evaluate_expression(self, env, expr, line_num_of_statement, original_caller):
-        print(f"EVALUATING {expr}")
-        if not isinstance(expr, list):
+        kind = expr.kind
+        if kind == NAME_KIND:
             # locals shadow member variables
-            val = None
-            # loop through the stack of environments looking for the nearest definition of the variable
-            for i in range(len(env)-1, -1, -1):
-                val = env[i].get(expr)
-                if val:
-                    break
-            if val is not None:  # if found in env stack -> parameter/arg or local var
+            val = self._lookup_variable(env, expr.name)
+            if val is not None:  # parameter/arg, local var or field
                 return val
-            if expr in self.fields:  # if it's a field
-                return self.fields[expr][0]
-            # need to check for variable name and get its value too
-            # if it's hard to differentiate between primitives and null check this out
-            if expr == InterpreterBase.ME_DEF:
-                print(f"EVALING {original_caller.class_def.name}")
-                return Value(Type.CLASS, original_caller, original_caller.class_def.name)
-            value = create_value(expr)  # expression is a constant/literal
-            if value is not None:
-                return value
             self.interpreter.error(ErrorType.NAME_ERROR,
-                                   "invalid field or parameter " + expr, line_num_of_statement)
-
-        operator = expr[0]
-        if operator in self.binary_op_list:
+                                   "invalid field or parameter " + expr.name, line_num_of_statement)
+        if kind == CONST_KIND:  # expression is a constant/literal
+            return expr.value
+        if kind == InterpreterBase.ME_DEF:
+            return Value(Type.CLASS, original_caller, original_caller.class_def.name)
+
+        if kind == BINARY_KIND:
+            operator = expr.operator
             operand1 = self.__evaluate_expression(
-                env, expr[1], line_num_of_statement, original_caller)
+                env, expr.left, line_num_of_statement, original_caller)
+            if self.interpreter.short_circuit:
+                decided = self._short_circuit(operator, operand1)
+                if decided is not None:
+                    return decided
             operand2 = self.__evaluate_expression(
-                env, expr[2], line_num_of_statement, original_caller)
-            if operand1.type() == operand2.type() and operand1.type() == Type.INT:
-                if operator not in self.binary_ops[Type.INT]:
-                    self.interpreter.error(ErrorType.TYPE_ERROR,
-                                           "invalid operator applied to ints", line_num_of_statement)
-                return self.binary_ops[Type.INT][operator](operand1, operand2)
-            if operand1.type() == operand2.type() and operand1.type() == Type.STRING:
-                if operator not in self.binary_ops[Type.STRING]:
-                    self.interpreter.error(ErrorType.TYPE_ERROR,
-                                           "invalid operator applied to strings", line_num_of_statement)
-                return self.binary_ops[Type.STRING][operator](operand1, operand2)
-            if operand1.type() == operand2.type() and operand1.type() == Type.BOOL:
-                if operator not in self.binary_ops[Type.BOOL]:
-                    self.interpreter.error(
-                        ErrorType.TYPE_ERROR, "invalid operator applied to bool", line_num_of_statement)
-                return self.binary_ops[Type.BOOL][operator](operand1, operand2)
-            if operand1.type() == operand2.type() and operand1.type() == Type.CLASS:
-                if operator not in self.binary_ops[Type.CLASS]:
-                    self.interpreter.error(ErrorType.TYPE_ERROR,
-                                           "invalid operator applied to class", line_num_of_statement,)
-                if self.comp_obj(operand1, operand2):
-                    # if either operand is null or both of of the same type (CHANGE THIS TO INCLUDE POLYMORPHISM)
-                    return self.binary_ops[Type.CLASS][operator](operand1, operand2)
-            # error what about an obj reference and null
-            self.interpreter.error(ErrorType.TYPE_ERROR,
-                                   f"operator {operator} applied to two incompatible types", line_num_of_statement)
-        if operator in self.unary_op_list:
+                env, expr.right, line_num_of_statement, original_caller)
+            return self._apply_binary_op(expr, operand1, operand2, line_num_of_statement)
+        if kind == UNARY_KIND:
             operand = self.__evaluate_expression(
-                env, expr[1], line_num_of_statement, original_caller)
-            if operand.type() == Type.BOOL:
-                if operator not in self.unary_ops[Type.BOOL]:
-                    self.interpreter.error(ErrorType.TYPE_ERROR,
-                                           "invalid unary operator applied to bool", line_num_of_statement)
-                return self.unary_ops[Type.BOOL][operator](operand)
+                env, expr.operand, line_num_of_statement, original_caller)
+            return self._apply_unary_op(expr, operand, line_num_of_statement)
 
         # handle call expression: (call objref methodname p1 p2 p3)
-        if operator == InterpreterBase.CALL_DEF:
+        if kind == InterpreterBase.CALL_DEF:
             return self.__execute_call_aux(env, expr, line_num_of_statement, original_caller)
         # handle new expression: (new classname)
-        if operator == InterpreterBase.NEW_DEF:
-            return self.__execute_new_aux(env, expr, line_num_of_statement)
+        if kind == InterpreterBase.NEW_DEF:
+            return self._execute_new_aux(env, expr, line_num_of_statement)
+        if kind == InterpreterBase.SUPER_DEF:
+            self.interpreter.error(ErrorType.NAME_ERROR,
+                                   "invalid field or parameter " + kind, line_num_of_statement)
+        self.interpreter.error(ErrorType.SYNTAX_ERROR,
+                               f"invalid expression {to_source(expr)}", line_num_of_statement)
+        return None
+
+    # opt-in short-circuit mode: a false left operand decides &, a true one decides |; returns
+    # the result they decide, or None if the right operand must be evaluated
+    @staticmethod
+    def _short_circuit(operator, operand1):
+        if operand1.type() == Type.BOOL:
+            if operator == "&" and not operand1.value():
+                return Value(Type.BOOL, False)
+            if operator == "|" and operand1.value():
+                return Value(Type.BOOL, True)
+        return None
+
+    # applies a binary expression's operator to its evaluated operands, through the quickened
+    # fast path while the operands keep the types it was specialized for
+    def _apply_binary_op(self, expr, operand1, operand2, line_num_of_statement):
+        operator = expr.operator
+        quickened = expr.quickened
+        if quickened is not None:
+            operand_type, fast_path = quickened
+            if operand1.type() is operand_type and operand2.type() is operand_type:
+                return fast_path(operand1.value(), operand2.value())
+            if fast_path is not None:
+                # operand types changed; fall back to the generic path from now on
+                expr.quickened = DEOPTIMIZED
+            return self._evaluate_binary_op(operator, operand1, operand2, line_num_of_statement)
+        result = self._evaluate_binary_op(
+            operator, operand1, operand2, line_num_of_statement)
+        if operand1.type() is operand2.type():
+            expr.quickened = specialize(operator, operand1.type())
+        return result
+
+    def _apply_unary_op(self, expr, operand, line_num_of_statement):
+        operator = expr.operator
+        if operand.type() == Type.BOOL:
+            if operator not in UNARY_OPS[Type.BOOL]:
+                self.interpreter.error(ErrorType.TYPE_ERROR,
+                                       "invalid unary operator applied to bool", line_num_of_statement)
+            return UNARY_OPS[Type.BOOL][operator](operand)
+        return None
+
+    # generic evaluation of a binary operation on two already evaluated operands
+    def _evaluate_binary_op(self, operator, operand1, operand2, line_num_of_statement):
+        if operand1.type() == operand2.type() and operand1.type() == Type.INT:
+            if operator not in BINARY_OPS[Type.INT]:
+                self.interpreter.error(ErrorType.TYPE_ERROR,
+                                       "invalid operator applied to ints", line_num_of_statement)
+            return BINARY_OPS[Type.INT][operator](operand1, operand2)
+        if operand1.type() == operand2.type() and operand1.type() == Type.STRING:
+            if operator not in BINARY_OPS[Type.STRING]:
+                self.interpreter.error(ErrorType.TYPE_ERROR,
+                                       "invalid operator applied to strings", line_num_of_statement)
+            return BINARY_OPS[Type.STRING][operator](operand1, operand2)
+        if operand1.type() == operand2.type() and operand1.type() == Type.BOOL:
+            if operator not in BINARY_OPS[Type.BOOL]:
+                self.interpreter.error(
+                    ErrorType.TYPE_ERROR, "invalid operator applied to bool", line_num_of_statement)
+            return BINARY_OPS[Type.BOOL][operator](operand1, operand2)
+        if operand1.type() == operand2.type() and operand1.type() == Type.CLASS:
+            if operator not in BINARY_OPS[Type.CLASS]:
+                self.interpreter.error(ErrorType.TYPE_ERROR,
+                                       "invalid operator applied to class", line_num_of_statement,)
+            if self.comp_obj(operand1, operand2):
+                # if either operand is null or both of of the same type (CHANGE THIS TO INCLUDE POLYMORPHISM)
+                return BINARY_OPS[Type.CLASS][operator](operand1, operand2)
+        # error what about an obj reference and null
+        self.interpreter.error(ErrorType.TYPE_ERROR,
+                               f"operator {operator} applied to two incompatible types", line_num_of_statement)
 
     # (new classname)
-    def __execute_new_aux(self, _, code, line_num_of_statement):
-        obj = self.interpreter.instantiate(code[1], line_num_of_statement)
-        return Value(Type.CLASS, obj, code[1])
+    def _execute_new_aux(self, _, code, line_num_of_statement):
+        obj = self.interpreter.instantiate(code.class_name, line_num_of_statement)
+        return Value(Type.CLASS, obj, code.class_name)
 
     # this method is a helper used by call statements and call expressions
     # (call object_ref/me methodname p1 p2 p3)
     def __execute_call_aux(self, env, code, line_num_of_statement, original_caller):
         # determine which object we want to call the method on
-        obj_name = code[1]
-        caller = None
-        if obj_name == InterpreterBase.ME_DEF:
-            obj = original_caller
-        elif obj_name == InterpreterBase.SUPER_DEF:
+        obj, caller = self._call_receiver(code.target, original_caller, line_num_of_statement)
+        if obj is None:
+            obj, caller = self._dereference(self.__evaluate_expression(
+                env, code.target, line_num_of_statement, original_caller), line_num_of_statement)
+        # prepare the actual arguments for passing
+        actual_args = [self.__evaluate_expression(env, expr, line_num_of_statement, original_caller)
+                       for expr in code.args]
+        target, method_def = self._resolve_call(obj, code, actual_args, line_num_of_statement)
+        return target.invoke_method(method_def, actual_args, caller, line_num_of_statement)
+
+    # returns the object a (call me ...) or (call super ...) is made on, and the original caller
+    # to run the method for; returns (None, None) for any other target, which must be evaluated
+    def _call_receiver(self, target, original_caller, line_num_of_statement):
+        if target.kind == InterpreterBase.ME_DEF:
+            return original_caller, original_caller
+        if target.kind == InterpreterBase.SUPER_DEF:
             if not self.parent:
                 self.interpreter.error(
                     ErrorType.TYPE_ERROR, "Called super on an object that's not inherited", line_num_of_statement)
-            obj = self.parent
-            caller = original_caller
-        else:
-            obj = self.__evaluate_expression(
-                env, obj_name, line_num_of_statement, original_caller).value()
-        # prepare the actual arguments for passing
+            return self.parent, original_caller
+        return None, None
+
+    # returns _call_receiver's pair for a call target evaluated to target: the object it refers
+    # to, twice, since the method runs for that object
+    def _dereference(self, target, line_num_of_statement):
+        obj = target.value()
         if obj is None:
             self.interpreter.error(
-                ErrorType.FAULT_ERROR, "null dereference", line_num_of_statement
-            )
-        actual_args = []
-        for expr in code[3:]:
-            actual_args.append(
-                self.__evaluate_expression(env, expr, line_num_of_statement, original_caller))
-        if caller:
-            print(f"CALL AUX {caller.class_def.name}")
+                ErrorType.FAULT_ERROR, "null dereference", line_num_of_statement)
+        return obj, obj
+
+    # returns the object in obj's parent chain that defines the method a call resolves to, and
+    # the method's MethodDef; consults the call site's inline cache before doing a full lookup
+    def _resolve_call(self, obj, code, actual_args, line_num_of_statement):
+        cache = code.cache
+        if cache is None:
+            cache = code.cache = InlineCache()
+        key = None
+        entry = None
+        if not cache.megamorphic:
+            key = (obj.class_def, tuple((arg.type(), arg.class_name()) for arg in actual_args))
+            entry = cache.lookup(key)
+        if entry is None:
+            depth, method_def = obj.resolve_method(code.method_name, actual_args)
+            if not method_def:
+                self.interpreter.error(
+                    ErrorType.NAME_ERROR, "unknown method " + code.method_name, line_num_of_statement)
+            if key is not None:
+                cache.record(key, depth, method_def)
         else:
-            print(f"CALL AUX {caller}")
-        return obj.call_method(code[2], actual_args, line_num_of_statement, caller)
+            depth, method_def = entry
+        return obj.ancestor(depth), method_def
 
-    def __get_default_return(self, return_type):
+    def _get_default_return(self, return_type):
         # returns a default value object of the function's return type
         if return_type == InterpreterBase.INT_DEF:
             return Value(Type.INT, 0)
@@ -438,7 +714,7 @@ class ObjectDef:
                 # assigning object of invalid class to this class type parameter
                 if param_val.value() is None and param_val.class_name() is None:  # if param_val is a null literal
                     continue    # we can assign a null literal to any class variable
-                if not self.__polymorphic(param_type, param_val.class_name()):
+                if not self._polymorphic(param_type, param_val.class_name()):
                     return False
             elif not check_type(param_val.type(), param_type):
                 return False
@@ -453,7 +729,7 @@ class ObjectDef:
 
         return True
 
-    def __polymorphic(self, base_name, derived_name):
+    def _polymorphic(self, base_name, derived_name):
         """
         Checks to see if base_name is an ancestor of derived_name to enable potential polymorphism
         """
@@ -472,10 +748,9 @@ class ObjectDef:
 
     def __map_method_names_to_method_definitions(self):
         self.methods = self.class_def.get_methods()
-        for method in self.methods.values():
-            if method.return_type not in ObjectDef.primitives and method.return_type not in self.interpreter.class_index and method.return_type != InterpreterBase.VOID_DEF:
-                self.interpreter.error(
-                    ErrorType.TYPE_ERROR, f"method {method.method_name} return type does not exist")
+        # return types are checked once per class; lazily loaded methods are checked on first call
+        if not self.class_def.validated and not self.interpreter.program.lazy:
+            self.class_def.validate(self.interpreter, self.interpreter.class_index)
 
     def __map_fields_to_values(self):
         self.fields = {}
@@ -493,72 +768,14 @@ class ObjectDef:
                 self.interpreter.error(
                     ErrorType.TYPE_ERROR, f"invalid type/type mismatch with field {field.field_name}")
 
-    def __create_map_of_operations_to_lambdas(self):
-        self.binary_op_list = [
-            "+",
-            "-",
-            "*",
-            "/",
-            "%",
-            "==",
-            "!=",
-            "<",
-            "<=",
-            ">",
-            ">=",
-            "&",
-            "|",
-        ]
-        self.unary_op_list = ["!"]
-        self.binary_ops = {}
-        self.binary_ops[Type.INT] = {
-            "+": lambda a, b: Value(Type.INT, a.value() + b.value()),
-            "-": lambda a, b: Value(Type.INT, a.value() - b.value()),
-            "*": lambda a, b: Value(Type.INT, a.value() * b.value()),
-            "/": lambda a, b: Value(
-                Type.INT, a.value() // b.value()
-            ),  # // for integer ops
-            "%": lambda a, b: Value(Type.INT, a.value() % b.value()),
-            "==": lambda a, b: Value(Type.BOOL, a.value() == b.value()),
-            "!=": lambda a, b: Value(Type.BOOL, a.value() != b.value()),
-            ">": lambda a, b: Value(Type.BOOL, a.value() > b.value()),
-            "<": lambda a, b: Value(Type.BOOL, a.value() < b.value()),
-            ">=": lambda a, b: Value(Type.BOOL, a.value() >= b.value()),
-            "<=": lambda a, b: Value(Type.BOOL, a.value() <= b.value()),
-        }
-        self.binary_ops[Type.STRING] = {
-            "+": lambda a, b: Value(Type.STRING, a.value() + b.value()),
-            "==": lambda a, b: Value(Type.BOOL, a.value() == b.value()),
-            "!=": lambda a, b: Value(Type.BOOL, a.value() != b.value()),
-            ">": lambda a, b: Value(Type.BOOL, a.value() > b.value()),
-            "<": lambda a, b: Value(Type.BOOL, a.value() < b.value()),
-            ">=": lambda a, b: Value(Type.BOOL, a.value() >= b.value()),
-            "<=": lambda a, b: Value(Type.BOOL, a.value() <= b.value()),
-        }
-        self.binary_ops[Type.BOOL] = {
-            "&": lambda a, b: Value(Type.BOOL, a.value() and b.value()),
-            "|": lambda a, b: Value(Type.BOOL, a.value() or b.value()),
-            "==": lambda a, b: Value(Type.BOOL, a.value() == b.value()),
-            "!=": lambda a, b: Value(Type.BOOL, a.value() != b.value()),
-        }
-        self.binary_ops[Type.CLASS] = {
-            "==": lambda a, b: Value(Type.BOOL, a.value() is b.value()),
-            "!=": lambda a, b: Value(Type.BOOL, a.value() is not b.value()),
-        }
-
-        self.unary_ops = {}
-        self.unary_ops[Type.BOOL] = {
-            "!": lambda a: Value(Type.BOOL, not a.value()),
-        }
-
     def comp_obj(self, obj1, obj2):
         """
         Determines if 2 objects should be comparable or not
         """
         if obj1.class_name() is None or obj2.class_name() is None:
             return True
-        if self.__polymorphic(obj1.class_name(), obj2.class_name()):
+        if self._polymorphic(obj1.class_name(), obj2.class_name()):
             return True
-        if self.__polymorphic(obj2.class_name(), obj1.class_name()):
+        if self._polymorphic(obj2.class_name(), obj1.class_name()):
             return True
         return False
@@ -0,0 +1,148 @@
+"""
+Module with the Program class: a loaded Brewin program that can be run many times, from any
+number of threads at once.
+
+A Program holds everything derived from the source (the class table, the method tables and
+bodies, and the results of the load-time analyses). Everything that belongs to one run
+(objects, I/O, error state, quotas, the memo, stats and heap profiles) lives in the
+Interpreter running it. Runs do write to the following parts of a Program, which they share:
+    - CallNode.cache: a call site's InlineCache, created on its first call; entries are added
+      and the cache may turn megamorphic (see inline_cachev2)
+    - BinaryOpNode.quickened: set to a quickenv2 fast path on the first evaluation, and to
+      DEOPTIMIZED when the operand types change
+    - MethodDef.validated and ClassDef.validated: set once the return types (and for
+      ClassDef, all methods) have been checked
+    - with lazy loading, a method's AST (MethodDef.code), the plans of its counter loops
+      (WhileNode.plan) and MethodDef.accessor: built on its first call, under
+      MethodDef.COMPILE_LOCK
+    - MethodDef.python_body: the method's generated code in codegen runs, made under a lock in
+      codegenv2.python_body
+    - the pure methods (see Program.analyze), found on first use under the Program's lock
+Racing writes to these are safe without locking, since each write is a single attribute or
+dict assignment (atomic in CPython) and every state a reader can see gives the same result:
+    - an inline cache entry for a key is the method the full lookup finds for that key, so a
+      cache lost to a racing write or cleared when turning megamorphic only costs a full
+      lookup
+    - a quickened fast path is only taken when both operand types match the ones it was
+      specialized for, and otherwise falls back to the generic path, so it doesn't matter
+      which run's specialization or deoptimization was written last
+    - validated is only set after the checks passed, and they pass for every run alike
+    - a run that sees a lazily compiled body before its loop plans or accessor runs the loops
+      the generic way and calls the method normally, which behave the same
+tests/test_shared_program.py runs one Program from many threads at once.
+"""
+
+import threading
+from types import MappingProxyType
+
+from intbase import InterpreterBase, ErrorType
+from bparser import BParser
+from classv2 import ClassDef
+from analysisv2 import find_pure_methods
+from batchv2 import SourceHasher, program_hash
+from stream_parserv2 import ParseError, parse_stream
+
+
+class Program:
+    """
+    A parsed and loaded program. Errors found while loading are reported through reporter
+    (an InterpreterBase, normally the Interpreter that loads the program), which is not kept
+    once loading is done.
+
+    lazy, strict and streaming have the same meaning as the Interpreter options of the same
+    name. source can be any iterable of lines, such as an open file.
+    """
+
+    def __init__(self, source, reporter, lazy=False, strict=False, streaming=False):
+        self.lazy = lazy
+        self.__classes = {}
+        self.__pure_methods = None
+        self.__lock = threading.Lock()
+        if streaming:
+            self.__load_stream(source, reporter)
+        else:
+            source = list(source)
+            self.source_hash = program_hash(source)
+            status, parsed_program = BParser.parse(source)
+            if not status:
+                reporter.error(
+                    ErrorType.SYNTAX_ERROR, f"Parse error on program: {parsed_program}")
+            for item in parsed_program:
+                self.__register(item, reporter)
+        if strict:
+            for class_def in self.__classes.values():
+                class_def.validate(reporter, self.__classes, True)
+                for method in class_def.get_methods().values():
+                    method.compile()
+        for class_def in self.__classes.values():
+            class_def.interpreter = None  # only needed to report errors while loading
+        self.class_index = MappingProxyType(self.__classes)
+
+    def __getstate__(self):
+        # the lock and the read-only view can't be pickled; see __setstate__
+        state = self.__dict__.copy()
+        del state["_Program__lock"]
+        del state["class_index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+        self.class_index = MappingProxyType(self.__classes)
+
+    @property
+    def pure_methods(self):
+        """
+        The set of pure methods (see analysisv2.find_pure_methods), found on first use since
+        only memoizing runs need it; this compiles any lazily loaded methods.
+        """
+        self.analyze()
+        return self.__pure_methods
+
+    def analyze(self):
+        """
+        Runs the analyses that are otherwise only done on first use (for now, finding the pure
+        methods), so a program that is about to be saved as an artifact or shared doesn't have
+        to do them later.
+        """
+        if self.__pure_methods is None:
+            with self.__lock:
+                if self.__pure_methods is None:
+                    self.__pure_methods = frozenset(find_pure_methods(self.__classes))
+
+    def __load_stream(self, source, reporter):
+        # registers each class as soon as the streaming parser completes it; load errors in a
+        # class are therefore reported even if the source turns out to be malformed further on
+        hasher = SourceHasher()
+
+        def hashed_lines():
+            for line in source:
+                hasher.update(line)
+                yield line
+
+        try:
+            for item in parse_stream(hashed_lines()):
+                self.__register(item, reporter)
+        except ParseError as error:
+            reporter.error(ErrorType.SYNTAX_ERROR, f"Parse error on program: {error}")
+        self.source_hash = hasher.hexdigest()
+
+    def __register(self, item, reporter):
+        # adds a top-level item of the parsed program to the class table if it's a class
+        if item[0] == InterpreterBase.CLASS_DEF:
+            if item[1] in self.__classes:
+                reporter.error(ErrorType.TYPE_ERROR,
+                               f"Duplicate class name {item[1]}", item[0].line_num)
+            # no inheritance
+            if isinstance(item[2], list) and item[2] != InterpreterBase.INHERITS_DEF:
+                class_def = ClassDef(item, reporter, None, self.lazy)
+                self.__classes[class_def.name] = class_def
+            elif item[2] == InterpreterBase.INHERITS_DEF:
+                if item[3] not in self.__classes:
+                    # inheriting from a class that doesn't exist
+                    reporter.error(ErrorType.NAME_ERROR,
+                                   f"Base class {item[3]} does not exist", item[0].line_num)
+                else:
+                    parent = self.__classes[item[3]]
+                    class_def = ClassDef(item, reporter, parent, self.lazy)
+                    self.__classes[class_def.name] = class_def
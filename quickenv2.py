@@ -0,0 +1,59 @@
+"""
+Module with the type-specialized ("quickened") fast paths for binary operations.
+
+A binary expression such as (+ x 1) starts out on the generic path in ObjectDef, which
+dispatches on the operand types and the operator every time it runs. After a successful
+generic evaluation on two operands of the same primitive type, the expression site is
+rewritten to the matching fast path below. The fast path only guards on the operand types;
+if it ever sees different types the site is deoptimized back to the generic path for good,
+so any TYPE_ERROR is reported exactly as before.
+"""
+
+from type_valuev2 import Type, Value, StringRope
+
+
+# marks a site that saw changing operand types; it stays on the generic path
+DEOPTIMIZED = (None, None)
+
+# fast paths on the raw Python payloads of two operands of the same type
+SPECIALIZED_BINARY_OPS = {
+    Type.INT: {
+        "+": lambda a, b: Value(Type.INT, a + b),
+        "-": lambda a, b: Value(Type.INT, a - b),
+        "*": lambda a, b: Value(Type.INT, a * b),
+        "/": lambda a, b: Value(Type.INT, a // b),
+        "%": lambda a, b: Value(Type.INT, a % b),
+        "==": lambda a, b: Value(Type.BOOL, a == b),
+        "!=": lambda a, b: Value(Type.BOOL, a != b),
+        ">": lambda a, b: Value(Type.BOOL, a > b),
+        "<": lambda a, b: Value(Type.BOOL, a < b),
+        ">=": lambda a, b: Value(Type.BOOL, a >= b),
+        "<=": lambda a, b: Value(Type.BOOL, a <= b),
+    },
+    Type.STRING: {
+        "+": lambda a, b: Value(Type.STRING, StringRope.concat(a, b)),
+        "==": lambda a, b: Value(Type.BOOL, str(a) == str(b)),
+        "!=": lambda a, b: Value(Type.BOOL, str(a) != str(b)),
+        ">": lambda a, b: Value(Type.BOOL, str(a) > str(b)),
+        "<": lambda a, b: Value(Type.BOOL, str(a) < str(b)),
+        ">=": lambda a, b: Value(Type.BOOL, str(a) >= str(b)),
+        "<=": lambda a, b: Value(Type.BOOL, str(a) <= str(b)),
+    },
+    Type.BOOL: {
+        "&": lambda a, b: Value(Type.BOOL, a and b),
+        "|": lambda a, b: Value(Type.BOOL, a or b),
+        "==": lambda a, b: Value(Type.BOOL, a == b),
+        "!=": lambda a, b: Value(Type.BOOL, a != b),
+    },
+}
+
+
+def specialize(operator, operand_type):
+    """
+    Returns the (operand_type, fast_path) entry for an expression site that just evaluated
+    operator on two operands of operand_type, or DEOPTIMIZED if there is no fast path for it.
+    """
+    fast_path = SPECIALIZED_BINARY_OPS.get(operand_type, {}).get(operator)
+    if fast_path is None:
+        return DEOPTIMIZED
+    return operand_type, fast_path
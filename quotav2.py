@@ -0,0 +1,64 @@
+"""
+Module for deterministic resource quotas on a run of a Brewin program.
+
+Unlike a wall-clock timeout, a quota trips at the same point of a program on every machine:
+after a fixed number of executed statements, at a fixed call depth, object count or amount of
+output. Exceeding one ends the run with a QuotaExceededError whose error type (as returned by
+Interpreter.get_error_type_and_line) is the QuotaType that tripped.
+"""
+
+import sys
+from enum import Enum
+
+
+class QuotaType(Enum):
+    """Enum for the resources a run can be limited on."""
+
+    STEPS = 1
+    CALL_DEPTH = 2
+    OBJECTS = 3
+    OUTPUT = 4
+
+
+class QuotaExceededError(RuntimeError):
+    """
+    Raised when a run exceeds one of its quotas.
+    """
+
+    def __init__(self, quota_type, limit, line_num=None):
+        location = f" on line {line_num}" if line_num else ""
+        super().__init__(f"{quota_type}{location}: exceeded the limit of {limit}")
+        self.quota_type = quota_type
+        self.limit = limit
+        self.line_num = line_num
+
+
+class Quota:
+    """
+    Limits and usage counters for a run. Unset limits are sys.maxsize, so every check is a
+    single comparison whether or not that particular limit is in use.
+
+    steps counts executed statements, call_depth the methods currently running, objects the
+    objects created by new (and main) during the run, freed or not, and output_size the
+    characters printed, counting one for each line break. Counting allocations rather than
+    live objects keeps the objects quota independent of when the garbage collector runs.
+    """
+
+    __slots__ = ("max_steps", "max_call_depth", "max_objects", "max_output",
+                 "steps", "call_depth", "objects", "output_size")
+
+    def __init__(self, max_steps=None, max_call_depth=None, max_objects=None, max_output=None):
+        self.max_steps = sys.maxsize if max_steps is None else max_steps
+        self.max_call_depth = sys.maxsize if max_call_depth is None else max_call_depth
+        self.max_objects = sys.maxsize if max_objects is None else max_objects
+        self.max_output = sys.maxsize if max_output is None else max_output
+        self.reset()
+
+    def reset(self):
+        """
+        Zeroes the usage counters for another run.
+        """
+        self.steps = 0
+        self.call_depth = 0
+        self.objects = 0
+        self.output_size = 0
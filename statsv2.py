@@ -0,0 +1,148 @@
+"""
+Module with the run-time statistics gathered by Interpreter(stats=True).
+
+Counting is compiled out when stats are off: ObjectDef itself contains no counting code.
+A stats-enabled run instead uses a subclass built by counting_object_def, which overrides the
+statement handlers, expression evaluation and method lookup with wrappers that count and then
+call the original. Value allocations are counted through observing_values, which only sees
+the Values allocated by the run itself.
+"""
+
+import contextlib
+import inspect
+from collections import Counter
+
+from type_valuev2 import VALUE_OBSERVERS, observed_values
+
+
+# ObjectDef statement handlers and the statement kind each one counts
+STATEMENT_HANDLERS = {
+    "__execute_begin": "begin",
+    "__execute_call": "call",
+    "__execute_set": "set",
+    "__execute_if": "if",
+    "__execute_while": "while",
+    "__execute_return": "return",
+    "__execute_print": "print",
+    "__execute_input": "input",
+    "__execute_let": "let",
+}
+
+
+class RunStats:
+    """
+    Counters for one run of a program.
+    """
+
+    def __init__(self):
+        self.statements = Counter()  # by statement kind
+        self.expressions = 0
+        self.method_calls = 0
+        self.method_lookups = 0  # full lookups, i.e., not answered by an inline cache
+        self.parent_links = 0  # parent links followed by full lookups
+        self.objects = Counter()  # by class, counting the objects created for base classes
+        self.let_frames = 0
+        self.values = 0
+
+    def as_dict(self):
+        """
+        Returns the counters as a JSON-friendly dict.
+        """
+        return {
+            "statements": dict(self.statements),
+            "expressions": self.expressions,
+            "method_calls": self.method_calls,
+            "method_lookups": self.method_lookups,
+            "parent_links": self.parent_links,
+            "objects": dict(self.objects),
+            "let_frames": self.let_frames,
+            "values": self.values,
+        }
+
+    def value_created(self, _):
+        """
+        Called by observing_values for each Value allocated.
+        """
+        self.values += 1
+
+
+def counting_object_def(base):
+    """
+    Returns a subclass of base (ObjectDef or asyncv2.AsyncObjectDef) that records what it does
+    in self.interpreter.stats.
+    """
+    mangled = f"_{base.__name__.lstrip('_')}"
+    overrides = {}
+
+    def wrap(name, count):
+        original = getattr(base, name)
+        if inspect.iscoroutinefunction(original):
+            async def counted(self, *args):
+                count(self.stats, self, args)
+                return await original(self, *args)
+        else:
+            def counted(self, *args):
+                count(self.stats, self, args)
+                return original(self, *args)
+        overrides[name] = counted
+
+    def count_statement(kind):
+        def count(stats, _, __):
+            stats.statements[kind] += 1
+            if kind == "let":
+                stats.let_frames += 1
+        return count
+
+    for handler, kind in STATEMENT_HANDLERS.items():
+        wrap(mangled + handler, count_statement(kind))
+    wrap(mangled + "__evaluate_expression", __count_expression)
+    wrap("invoke_method", __count_call)
+
+    def resolve_method(self, method_name, actual_params):
+        depth, method_def = base.resolve_method(self, method_name, actual_params)
+        self.stats.method_lookups += 1
+        if method_def is None:  # walked the whole chain
+            depth = 0
+            obj = self
+            while obj.parent:
+                obj = obj.parent
+                depth += 1
+        self.stats.parent_links += depth
+        return depth, method_def
+
+    def __init__(self, interpreter, class_def, trace_output):
+        self.stats = interpreter.stats
+        self.stats.objects[class_def.name] += 1
+        base.__init__(self, interpreter, class_def, trace_output)
+
+    overrides["resolve_method"] = resolve_method
+    overrides["__init__"] = __init__
+    return type(f"Counting{base.__name__}", (base,), overrides)
+
+
+def __count_expression(stats, _, __):
+    stats.expressions += 1
+
+
+def __count_call(stats, _, __):
+    stats.method_calls += 1
+
+
+@contextlib.contextmanager
+def observing_values(observers):
+    """
+    While the block runs, calls observer.value_created(value) for every Value allocated by the
+    current thread or asyncio task (see type_valuev2.VALUE_OBSERVERS); runs elsewhere in the
+    process aren't observed. Value creation only checks for observers while some run is
+    observed (see type_valuev2.observed_values).
+    """
+    observers = tuple(observers)
+    if not observers:
+        yield
+        return
+    token = VALUE_OBSERVERS.set(observers)
+    try:
+        with observed_values():
+            yield
+    finally:
+        VALUE_OBSERVERS.reset(token)
@@ -0,0 +1,100 @@
+"""
+Module with a streaming version of BParser.parse.
+
+BParser.parse needs every line up front and returns the whole program at once. parse_stream
+reads lines from any iterable (e.g., an open file) and yields each top-level form, such as a
+(class ...), as soon as its closing parenthesis is read, so the caller can load classes while
+the rest of the source is still being read. The tokens, line numbers and error messages are
+exactly those of BParser.parse (bparser.py is provided and can't be changed, so its logic is
+mirrored here).
+"""
+
+from bparser import BParser, StringWithLineNumber
+
+
+class ParseError(Exception):
+    """
+    Raised by parse_stream with the message BParser.parse would have returned.
+    """
+
+
+def parse_stream(lines):
+    """
+    Yields the top-level items of a program (nested lists of StringWithLineNumber, or a bare
+    token) as they complete. Raises a ParseError once the source turns out to be malformed;
+    the items yielded before that are the ones BParser.parse would have produced for them.
+    """
+    cur_token = ""
+    in_quote = False
+    output_stack = [None]  # the top level isn't kept; its items are yielded instead
+    for line_no, line in enumerate(lines):
+        line = __remove_comment(line)
+        for char in line:
+            if char == BParser.QUOTE_CHAR:
+                if not in_quote:
+                    if cur_token:
+                        token = StringWithLineNumber(cur_token, line_no)
+                        if len(output_stack) == 1:
+                            yield token
+                        else:
+                            output_stack[-1].append(token)
+                    cur_token = BParser.QUOTE_CHAR
+                    in_quote = True
+                else:
+                    cur_token += BParser.QUOTE_CHAR
+                    token = StringWithLineNumber(cur_token, line_no)
+                    if len(output_stack) == 1:
+                        yield token
+                    else:
+                        output_stack[-1].append(token)
+                    cur_token = ""
+                    in_quote = False
+                continue
+            if in_quote:
+                cur_token += char
+                continue
+
+            if char in BParser.DELIMETER_CHARS:
+                if cur_token:
+                    token = StringWithLineNumber(cur_token, line_no)
+                    if len(output_stack) == 1:
+                        yield token
+                    else:
+                        output_stack[-1].append(token)
+                    cur_token = ""
+            if char == BParser.OPEN_PAREN_CHAR:
+                nested = []
+                if len(output_stack) > 1:
+                    output_stack[-1].append(nested)
+                output_stack.append(nested)
+            elif char == BParser.CLOSE_PAREN_CHAR:
+                if len(output_stack) < 2:
+                    raise ParseError("Extra closing parenthesis")
+                completed = output_stack.pop()
+                if len(output_stack) == 1:
+                    yield completed
+            elif char not in BParser.WHITESPACE_CHARS:
+                cur_token += char
+        if in_quote:
+            raise ParseError("Unclosed string")
+        if cur_token:
+            token = StringWithLineNumber(cur_token, line_no)
+            if len(output_stack) == 1:
+                yield token
+            else:
+                output_stack[-1].append(token)
+            cur_token = ""
+    if len(output_stack) > 1:
+        raise ParseError("Unclosed parenthesis")
+
+
+def __remove_comment(line):
+    in_string = False
+    stripped_line = ""
+    for char in line:
+        if char == BParser.COMMENT_CHAR and not in_string:
+            return stripped_line
+        if char == BParser.QUOTE_CHAR:
+            in_string = not in_string
+        stripped_line += char
+    return stripped_line
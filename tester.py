@@ -2,11 +2,17 @@
 Implements all CS 131-related test logic; is entry-point for testing framework.
 """
 
+import argparse
 import asyncio
+import hashlib
 import importlib
+import json
+import math
 from os import environ
 import sys
+import time
 import traceback
+import tracemalloc
 from operator import itemgetter
 
 from harness import (
@@ -17,11 +23,31 @@ from harness import (
 )
 
 
+# how many of the slowest tests the timing summary lists
+SLOWEST_SHOWN = 5
+# tests faster than this (in seconds) are too noisy to be flagged as slower
+MIN_SLOWDOWN_TIME = 0.005
+# historical wall time of each test, by name: balances --shard runs, and is refreshed by
+# --timings runs and --merge
+TIMINGS_FILE = "test_timings.json"
+
+
 class TestScaffold(AbstractTestScaffold):
     """Implement scaffold for Brewin' interpreter; load file, validate syntax, run testcase."""
 
-    def __init__(self, interpreter_lib):
+    def __init__(self, interpreter_lib, stats=False, codegen=False, timings=False, memory=False):
         self.interpreter_lib = interpreter_lib
+        # with stats, the run-time statistics of each test (see statsv2), by test name
+        self.stats = {} if stats else None
+        # with timings, each test's wall time, CPU time and (with memory) peak memory, by test name
+        self.timings = {} if timings or memory else None
+        self.memory = memory
+        # keyword options for each Interpreter
+        self.options = {}
+        if stats:
+            self.options["stats"] = True
+        if codegen:
+            self.options["codegen"] = True
 
     def setup(self, test_case):
         inputfile, expfile, srcfile = itemgetter("inputfile", "expfile", "srcfile")(
@@ -51,7 +77,38 @@ class TestScaffold(AbstractTestScaffold):
         stdin, expected, program = itemgetter("stdin", "expected", "program")(
             environment
         )
-        interpreter = self.interpreter_lib.Interpreter(False, stdin, False)
+        interpreter = self.interpreter_lib.Interpreter(False, stdin, False, **self.options)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return self.__run_and_check(interpreter, program, expect_failure, expected)
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = time.thread_time() - cpu_start
+            if self.stats is not None:
+                self.stats[test_case["name"]] = interpreter.get_stats()
+            if self.timings is not None:
+                timings = {"wall_time": wall_time, "cpu_time": cpu_time}
+                if self.memory:
+                    timings["peak_memory"] = self.__peak_memory(program, stdin)
+                self.timings[test_case["name"]] = timings
+
+    def __peak_memory(self, program, stdin):
+        # runs the test a second time under tracemalloc, which would skew the timings of the
+        # scored run
+        interpreter = self.interpreter_lib.Interpreter(False, stdin, False, **self.options)
+        tracemalloc.start()
+        try:
+            interpreter.run(program)
+        except Exception:  # pylint: disable=broad-except
+            pass  # already reported by the scored run
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return peak
+
+    @staticmethod
+    def __run_and_check(interpreter, program, expect_failure, expected):
         try:
             interpreter.validate_program(program)
             interpreter.run(program)
@@ -118,6 +175,128 @@ def __generate_test_suite(version, successes, failures):
     )
 
 
+def percentile(values, fraction):
+    """nearest-rank percentile of a non-empty list of numbers, e.g., fraction=0.9 for p90"""
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(fraction * len(ordered))))
+    return ordered[rank - 1]
+
+
+def print_timing_summary(results):
+    """prints the slowest tests and wall time percentiles of results that carry timings"""
+    timed = [result for result in results if "wall_time" in result]
+    if not timed:
+        return
+    print("Slowest tests:")
+    for result in sorted(timed, key=lambda result: result["wall_time"], reverse=True)[:SLOWEST_SHOWN]:
+        memory = ""
+        if "peak_memory" in result:
+            memory = f" {result['peak_memory'] / 1024:10.1f} KiB"
+        print(f"  {result['wall_time']:8.3f}s wall {result['cpu_time']:8.3f}s cpu"
+              f"{memory}  {result['name']}")
+    wall_times = [result["wall_time"] for result in timed]
+    print("Wall time percentiles: " + "  ".join(
+        f"p{int(fraction * 100)} {percentile(wall_times, fraction):.3f}s"
+        for fraction in (0.5, 0.9, 0.99)))
+
+
+def find_slowdowns(previous, results, factor):
+    """
+    Compares the wall times of results with those of a previous results.json (as loaded by
+    json.load); returns (name, previous wall time, wall time) for each test that got more than
+    factor times slower, ignoring tests too fast to time reliably.
+    """
+    previous_times = {result["name"]: result["wall_time"]
+                      for result in previous.get("tests", []) if "wall_time" in result}
+    slowdowns = []
+    for result in results:
+        before = previous_times.get(result["name"])
+        after = result.get("wall_time")
+        if before is None or after is None or after < MIN_SLOWDOWN_TIME:
+            continue
+        if after > before * factor:
+            slowdowns.append((result["name"], before, after))
+    return slowdowns
+
+
+def parse_shard(text):
+    """parses a --shard argument, "i/n" for the i-th of n shards (counting from 1), into (i, n)"""
+    try:
+        index, count = map(int, text.split("/"))
+    except ValueError as exception:
+        raise argparse.ArgumentTypeError(f"expected i/n, got {text!r}") from exception
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {text!r} out of range")
+    return index, count
+
+
+def select_shard(names, shard, timings=None):
+    """
+    Returns the names (of tests or benchmarks) that belong to shard, an (i, n) pair from
+    parse_shard, in their original order. Names are dealt to shards longest first, each going
+    to the shard with the least total time so far, using the wall times in timings (a dict by
+    name, as in TIMINGS_FILE); names without history count as the average of those with it.
+    Without any history, names are partitioned by a hash instead. Either way the result only
+    depends on the names and timings, so every machine of a split run must use the same
+    timings file.
+    """
+    index, count = shard
+    known = [timings[name] for name in names if name in timings] if timings else []
+    if not known:
+        return [name for name in names if __hash_shard(name, count) == index - 1]
+    default = sum(known) / len(known)
+    loads = [0.0] * count
+    assigned = {}
+    for name in sorted(names, key=lambda name: (-timings.get(name, default), name)):
+        target = min(range(count), key=lambda i: (loads[i], i))
+        loads[target] += timings.get(name, default)
+        assigned[name] = target
+    return [name for name in names if assigned[name] == index - 1]
+
+
+def __hash_shard(name, count):
+    # a stable hash: str hashes are salted per process
+    return int(hashlib.sha256(name.encode("utf-8")).hexdigest(), 16) % count
+
+
+def load_timings(path):
+    """reads a timings file (see TIMINGS_FILE), or returns {} if there is none"""
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+
+
+def update_timings(path, results):
+    """records the wall times of results that carry timings in a timings file"""
+    timings = load_timings(path)
+    timed = {result["name"]: result["wall_time"] for result in results if "wall_time" in result}
+    if not timed:
+        return
+    timings.update(timed)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(dict(sorted(timings.items())), handle, indent=4)
+
+
+def merge_results(paths):
+    """
+    Combines the tests of several results.json files, e.g., one per shard, in order; a test
+    that appears in more than one of them means the shards overlapped and is an error.
+    """
+    results = []
+    seen = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            tests = json.load(handle).get("tests", [])
+        for result in tests:
+            if result["name"] in seen:
+                raise ValueError(f"{result['name']} is in both {seen[result['name']]} and {path}")
+            seen[result["name"]] = path
+            results.append(result)
+    return results
+
+
 def generate_test_suite_v1():
     """wrapper for generate_test_suite for v1"""
     tests = [
@@ -212,7 +391,14 @@ def generate_test_suite_v2():
             "test_cmpwr552",
             "test_super_me",
             "test_more_me",
-            "test_real_while"
+            "test_real_while",
+            "test_call_site_poly",
+            "test_string_build",
+            "test_deopt_types",
+            "test_counter_loop",
+            "test_constant_fold",
+            "test_accessors",
+            "test_extra_operands",
         ],
         [
             "test_incompat_return1",
@@ -237,6 +423,11 @@ def generate_test_suite_v2():
             "test_base_super",
             "test_cmpwr445",
             "test_cmpwr450",
+            "test_deopt_types",
+            "test_counter_loop",
+            "test_constant_fold",
+            "test_accessors",
+            "test_missing_operand",
         ],
     )
 
@@ -248,13 +439,53 @@ def generate_test_suite_v3():
 
 async def main():
     """main entrypoint: argparses, delegates to test scaffold, suite generator, gradescope output"""
-    if not sys.argv:
-        raise ValueError("Error: Missing version number argument")
-    version = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Run the Brewin test suite.")
+    parser.add_argument("version", nargs="?", help="interpreter version to test: 1, 2 or 3")
+    parser.add_argument("--stats", action="store_true",
+                        help="record each test's run-time statistics in results.json")
+    parser.add_argument("--codegen", action="store_true",
+                        help="run method bodies as generated Python code (see codegenv2)")
+    parser.add_argument("--timings", action="store_true",
+                        help="record each test's wall time and CPU time in results.json and "
+                             "summarize them")
+    parser.add_argument("--memory", action="store_true",
+                        help="also record each test's peak memory (implies --timings); it is "
+                             "measured by running each test a second time, under tracemalloc, "
+                             "so the timings of the scored run aren't skewed")
+    parser.add_argument("--compare", metavar="RESULTS_JSON",
+                        help="flag tests that got slower than in a previous results.json "
+                             "written with --timings (implies --timings)")
+    parser.add_argument("--slowdown", type=float, default=1.5,
+                        help="how many times slower a test must get to be flagged (default 1.5)")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="only run the I-th of N shards of the suite (see select_shard)")
+    parser.add_argument("--timings-file", default=TIMINGS_FILE,
+                        help=f"per-test wall time history (default {TIMINGS_FILE})")
+    parser.add_argument("--merge", nargs="+", metavar="RESULTS_JSON",
+                        help="instead of testing, combine the results.json files of shards")
+    args = parser.parse_args()
+    if args.merge:
+        try:
+            results = merge_results(args.merge)
+        except ValueError as exception:
+            sys.exit(f"can't merge: {exception}")
+        print(f"{get_score(results)}/{len(results)} tests passed.")
+        update_timings(args.timings_file, results)
+        write_gradescope_output(results, environ.get("PROD", False))
+        return
+    if args.version is None:
+        parser.error("the version is required unless merging")
+    previous = None
+    if args.compare:
+        # read first: it may well be the results.json this run overwrites
+        with open(args.compare, encoding="utf-8") as handle:
+            previous = json.load(handle)
+    version = args.version
     module_name = f"interpreterv{version}"
     interpreter = importlib.import_module(module_name)
 
-    scaffold = TestScaffold(interpreter)
+    scaffold = TestScaffold(interpreter, args.stats, args.codegen,
+                            args.timings or previous is not None, args.memory)
 
     match version:
         case "1":
@@ -265,14 +496,38 @@ async def main():
             tests = generate_test_suite_v3()
         case _:
             raise ValueError("Unsupported version; expect one of 1,2,3")
+    if args.shard is not None:
+        names = select_shard([test["name"] for test in tests], args.shard,
+                             load_timings(args.timings_file))
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(names)} of {len(tests)} tests")
+        names = set(names)
+        tests = [test for test in tests if test["name"] in names]
 
     results = await run_all_tests(scaffold, tests)
-    total_score = get_score(results) / len(results) * 100.0
+    total_score = get_score(results) / len(results) * 100.0 if results else 100.0
     print(f"Total Score: {total_score:9.2f}%")
+    if scaffold.stats is not None:
+        for result in results:
+            result["stats"] = scaffold.stats.get(result["name"])
+    if scaffold.timings is not None:
+        for result in results:
+            # a test that timed out has no timings
+            result.update(scaffold.timings.get(result["name"], {}))
+        print_timing_summary(results)
+        if args.shard is None:
+            # shards must all see the same history; --merge records theirs
+            update_timings(args.timings_file, results)
 
     # flag that toggles write path for results.json
     write_gradescope_output(results, environ.get("PROD", False))
 
+    if previous is not None:
+        slowdowns = find_slowdowns(previous, results, args.slowdown)
+        for name, before, after in slowdowns:
+            print(f"SLOWER: {name}: {before:.3f}s -> {after:.3f}s ({after / before:.1f}x)")
+        if slowdowns:
+            sys.exit(1)
+
 
 if __name__ == "__main__":
     asyncio.run(main())
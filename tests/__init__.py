@@ -0,0 +1,5 @@
+"""
+Unit tests for the interpreter's Python APIs; the Brewin test programs are run by tester.py.
+
+Run from the repository root with: python -m unittest discover tests
+"""
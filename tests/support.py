@@ -0,0 +1,33 @@
+"""
+Helpers shared by the unit tests.
+"""
+
+import os
+import sys
+
+# the interpreter modules live at the root of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from interpreterv2 import Interpreter  # pylint: disable=wrong-import-position
+
+
+def lines(source):
+    """
+    Splits a Brewin program written as a Python string into its lines.
+    """
+    return source.strip("\n").splitlines()
+
+
+def run_program(source, inp=None, **options):
+    """
+    Runs a Brewin program given as a string and returns its interpreter; an error ends the run
+    quietly, so the test can inspect get_error_type_and_line() and get_output().
+    """
+    interpreter = Interpreter(False, inp, False, **options)
+    try:
+        interpreter.run(lines(source))
+    except Exception:  # pylint: disable=broad-except
+        pass
+    return interpreter
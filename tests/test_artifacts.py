@@ -0,0 +1,139 @@
+"""
+Tests for ahead-of-time compiled artifacts (see compilev2).
+"""
+
+import glob
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+import compilev2
+from tests.support import ROOT, Interpreter, lines
+
+
+PROGRAM = lines("""
+(class main
+ (field int n 0)
+ (method int square ((int x)) (return (* x x)))
+ (method void main ()
+  (begin
+   (inputi n)
+   (print (call me square n))
+  )
+ )
+)
+""")
+
+# type error in a method main never calls
+UNUSED_ERROR = lines("""
+(class main
+ (method int broken () (return "no"))
+ (method void main () (print 1))
+)
+(class other
+ (method void f ((nosuchtype x)) (print x))
+)
+""")
+
+
+class ArtifactTest(unittest.TestCase):
+    """Artifacts run like their source, and stale or foreign ones are rejected."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=compilev2.ARTIFACT_SUFFIX)
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, data):
+        with open(self.path, "wb") as artifact_file:
+            artifact_file.write(data)
+
+    def rewrite(self, **changes):
+        with open(self.path, "rb") as artifact_file:
+            artifact = pickle.load(artifact_file)
+        artifact.update(changes)
+        self.write(pickle.dumps(artifact))
+
+    def test_runs_like_source(self):
+        self.write(compilev2.compile_program(PROGRAM))
+        interpreter = Interpreter(False, ["7"])
+        self.assertTrue(interpreter.load_artifact(self.path, PROGRAM))
+        interpreter.execute()
+        self.assertEqual(interpreter.get_output(), ["49"])
+
+    def test_test_programs(self):
+        # e.g., test_poly's methods return and take objects, and test_accessors has let
+        # variables of class types
+        for path in sorted(glob.glob(os.path.join(ROOT, "v2", "tests", "*.brewin"))):
+            stem = path[:-len(".brewin")]
+            with self.subTest(name=os.path.basename(stem)):
+                with open(path, encoding="utf-8") as source_file:
+                    program = source_file.readlines()
+                with open(stem + ".exp", encoding="utf-8") as expected_file:
+                    expected = expected_file.read().splitlines()
+                inp = None
+                if os.path.exists(stem + ".in"):
+                    with open(stem + ".in", encoding="utf-8") as input_file:
+                        inp = input_file.read().splitlines()
+                self.write(compilev2.compile_program(program))
+                interpreter = Interpreter(False, inp)
+                self.assertTrue(interpreter.load_artifact(self.path, program))
+                interpreter.execute()
+                self.assertEqual(interpreter.get_output(), expected)
+
+    def test_analyzed(self):
+        self.write(compilev2.compile_program(PROGRAM))
+        program = compilev2.read_artifact(self.path)["program"]
+        # found when compiling, not on first use
+        self.assertIsNotNone(program._Program__pure_methods)  # pylint: disable=protected-access
+        self.assertEqual({method.method_name for method in program.pure_methods}, {"square"})
+        interpreter = Interpreter(False, ["3"], memoize=True)
+        interpreter.use_program(program)
+        interpreter.execute()
+        self.assertEqual(interpreter.get_output(), ["9"])
+
+    def test_source_mismatch(self):
+        self.write(compilev2.compile_program(PROGRAM))
+        changed = PROGRAM[:-1] + [" ", ")"]
+        self.assertIsNotNone(compilev2.read_artifact(self.path, PROGRAM + ["", ""]))
+        interpreter = Interpreter(False)
+        self.assertFalse(interpreter.load_artifact(self.path, changed))
+        self.assertIsNone(interpreter.program)
+
+    def test_version_mismatch(self):
+        self.write(compilev2.compile_program(PROGRAM))
+        self.rewrite(version=compilev2.ARTIFACT_VERSION - 1)
+        self.assertIsNone(compilev2.read_artifact(self.path))
+        self.rewrite(version=compilev2.ARTIFACT_VERSION, python=(2, 7))
+        self.assertIsNone(compilev2.read_artifact(self.path))
+        self.rewrite(python=sys.version_info[:2])
+        self.assertIsNotNone(compilev2.read_artifact(self.path))
+
+    def test_not_an_artifact(self):
+        self.write(b"(class main)")
+        self.assertIsNone(compilev2.read_artifact(self.path))
+        self.write(pickle.dumps({"magic": "something else"}))
+        self.assertIsNone(compilev2.read_artifact(self.path))
+        self.write(b"")
+        self.assertIsNone(compilev2.read_artifact(self.path))
+        self.assertIsNone(compilev2.read_artifact(self.path + ".missing"))
+
+    def test_compile_is_strict(self):
+        with self.assertRaises(Exception):
+            compilev2.compile_program(UNUSED_ERROR)
+        interpreter = Interpreter(False)
+        interpreter.run(UNUSED_ERROR)  # not strict: the bad signature is never used
+        self.assertEqual(interpreter.get_output(), ["1"])
+
+    def test_compile_reports_syntax_errors(self):
+        with self.assertRaises(Exception) as raised:
+            compilev2.compile_program(["(class main"])
+        self.assertIn("Parse error", str(raised.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
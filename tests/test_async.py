@@ -0,0 +1,161 @@
+"""
+Tests for the cooperative asyncio execution mode (see asyncv2).
+"""
+
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import unittest
+
+from asyncv2 import AsyncObjectDef
+from intbase import ErrorType
+from objectv2 import ObjectDef
+from quotav2 import QuotaExceededError, QuotaType
+from tests.support import ROOT, Interpreter, lines
+
+
+COUNTER = """
+(class main
+ (field int i 0)
+ (method void main ()
+  (while (< i 3)
+   (begin
+    (print name i)
+    (set i (+ i 1))
+   )
+  )
+ )
+ (field string name "{name}")
+)
+"""
+
+ECHO = """
+(class main
+ (field int n 0)
+ (field string s "")
+ (method void main ()
+  (begin
+   (inputi n)
+   (inputs s)
+   (print s (* n 2))
+  )
+ )
+)
+"""
+
+FAILS = """
+(class main
+ (method int half ((int x))
+  (return (/ x 2))
+ )
+ (method void main ()
+  (begin
+   (print (call me half 4))
+   (print (call me half "four"))
+  )
+ )
+)
+"""
+
+
+def run_both(source, inp=None, **options):
+    """
+    Runs a program with run() and with run_async(); returns (output, error) for each.
+    """
+    results = []
+    for use_async in (False, True):
+        interpreter = Interpreter(False, inp, False, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                if use_async:
+                    asyncio.run(interpreter.run_async(source))
+                else:
+                    interpreter.run(source)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        results.append((interpreter.get_output(), interpreter.get_error_type_and_line()))
+    return results
+
+
+class AsyncTest(unittest.TestCase):
+    """Async runs behave like sync runs, and yield to the event loop."""
+
+    def test_real_subclass(self):
+        self.assertTrue(issubclass(AsyncObjectDef, ObjectDef))
+        self.assertEqual(AsyncObjectDef.__module__, "asyncv2")
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncObjectDef.call_method))
+        self.assertTrue(asyncio.iscoroutinefunction(AsyncObjectDef.invoke_method))
+
+    def test_matches_sync_on_test_programs(self):
+        programs = sorted(glob.glob(os.path.join(ROOT, "v2", "*", "*.brewin")))
+        self.assertTrue(programs)
+        for path in programs:
+            with open(path, encoding="utf-8") as file:
+                source = file.read().splitlines()
+            inp = None
+            if os.path.exists(path[:-len(".brewin")] + ".in"):
+                with open(path[:-len(".brewin")] + ".in", encoding="utf-8") as file:
+                    inp = file.read().splitlines()
+            with self.subTest(path=os.path.relpath(path, ROOT)):
+                sync, asynchronous = run_both(source, inp)
+                self.assertEqual(sync, asynchronous)
+
+    def test_errors_keep_type_and_line(self):
+        sync, asynchronous = run_both(lines(FAILS))
+        self.assertEqual(sync, asynchronous)
+        self.assertEqual(asynchronous, (["2"], (ErrorType.NAME_ERROR, 7)))  # no half for a string
+
+    def test_interleaves(self):
+        shared = []
+
+        async def run(name):
+            async def output(line):
+                shared.append(line)
+            await Interpreter(False).run_async(
+                lines(COUNTER.format(name=name)), yield_every=1, output_provider=output)
+
+        async def both():
+            await asyncio.gather(run("a"), run("b"))
+
+        asyncio.run(both())
+        self.assertEqual(sorted(shared), ["a0", "a1", "a2", "b0", "b1", "b2"])
+        self.assertNotEqual(shared, ["a0", "a1", "a2", "b0", "b1", "b2"])
+
+    def test_providers(self):
+        pending = ["21", "x"]
+        printed = []
+
+        async def read():
+            await asyncio.sleep(0)
+            return pending.pop(0)
+
+        async def write(line):
+            printed.append(line)
+
+        interpreter = Interpreter(False)
+        asyncio.run(interpreter.run_async(lines(ECHO), input_provider=read, output_provider=write))
+        self.assertEqual(printed, ["x42"])
+        self.assertEqual(interpreter.get_output(), ["x42"])
+
+    def test_quota(self):
+        interpreter = Interpreter(False, max_steps=5)
+        with self.assertRaises(QuotaExceededError):
+            asyncio.run(interpreter.run_async(lines(COUNTER.format(name="a"))))
+        self.assertEqual(interpreter.get_error_type_and_line()[0], QuotaType.STEPS)
+
+    def test_stats_and_heap(self):
+        source = lines(COUNTER.format(name="a"))
+        sync = Interpreter(False, stats=True, heap_profile=True)
+        sync.run(source)
+        asynchronous = Interpreter(False, stats=True, heap_profile=True)
+        asyncio.run(asynchronous.run_async(source))
+        self.assertEqual(asynchronous.get_output(), ["a0", "a1", "a2"])
+        self.assertEqual(asynchronous.get_stats(), sync.get_stats())
+        self.assertEqual(asynchronous.get_heap_snapshots()[-1]["objects"],
+                         sync.get_heap_snapshots()[-1]["objects"])
+
+
+if __name__ == "__main__":
+    unittest.main()
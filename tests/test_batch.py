@@ -0,0 +1,102 @@
+"""
+Tests for running many programs at once (see batchv2).
+"""
+
+import unittest
+
+import batchv2
+from intbase import ErrorType
+from tests.support import Interpreter, lines
+
+
+DOUBLE = lines("""
+(class main
+ (field int n 0)
+ (method void main ()
+  (begin
+   (inputi n)
+   (print (* n 2))
+  )
+ )
+)
+""")
+
+GREET = lines("""
+(class main
+ (method void main () (print "hi"))
+)
+""")
+
+# loads, then fails when run
+UNKNOWN = lines("""
+(class main
+ (method void main () (call me nothing))
+)
+""")
+
+# fails to load
+DUPLICATE = lines("""
+(class main
+ (method void main () (print 1))
+)
+(class main
+ (method void main () (print 2))
+)
+""")
+
+
+def sorted_results(results):
+    return sorted(results, key=lambda result: result.index)
+
+
+class RunManyTest(unittest.TestCase):
+    """run_many gives each job the result a run of its own would have."""
+
+    JOBS = [(DOUBLE, ["1"]), (GREET, None), (UNKNOWN, None), (DOUBLE, ["21"]),
+            (DUPLICATE, None), (DOUBLE, ["x"])]
+
+    def check(self, results):
+        results = sorted_results(results)
+        self.assertEqual([result.index for result in results], list(range(len(self.JOBS))))
+        self.assertEqual(results[0], batchv2.JobResult(0, ["2"], None, None, None))
+        self.assertEqual(results[1].output, ["hi"])
+        self.assertEqual(results[3].output, ["42"])
+        self.assertEqual((results[2].error_type, results[2].error_line), (ErrorType.NAME_ERROR, 1))
+        self.assertIsNotNone(results[2].message)
+        self.assertEqual(results[4].error_type, ErrorType.TYPE_ERROR)
+        self.assertEqual(results[4].output, [])
+        self.assertIsNotNone(results[5].message)  # "x" isn't an int
+
+    def test_in_process(self):
+        self.check(list(batchv2.run_many(self.JOBS, workers=1)))
+
+    def test_workers(self):
+        self.check(list(Interpreter.run_many(self.JOBS, workers=2)))
+        self.check(list(batchv2.run_many(self.JOBS, workers=2, batch_size=4)))
+
+    def test_options(self):
+        results = list(batchv2.run_many([(DOUBLE, ["1"])] * 3, workers=2, max_steps=1))
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.message is not None for result in results))
+
+    def test_program_cache_is_bounded(self):
+        loaded = vars(batchv2)["__loaded_programs"]
+        loaded.clear()
+        programs = [lines(f'(class main (method void main () (print {i})))')
+                    for i in range(batchv2.PROGRAM_CACHE_SIZE + 5)]
+        for i, program in enumerate(programs):
+            result = batchv2.run_job(i, batchv2.program_hash(program), program, None, {})
+            self.assertEqual(result.output, [str(i)])
+        self.assertEqual(len(loaded), batchv2.PROGRAM_CACHE_SIZE)
+        # the oldest programs were dropped, the newest kept
+        self.assertNotIn((batchv2.program_hash(programs[0]), ()), loaded)
+        self.assertIn((batchv2.program_hash(programs[-1]), ()), loaded)
+        loaded.clear()
+
+    def test_program_hash(self):
+        self.assertEqual(batchv2.program_hash(["a", "b"]), batchv2.program_hash(["a\n", "b\n", "\n"]))
+        self.assertNotEqual(batchv2.program_hash(["a", "b"]), batchv2.program_hash(["b", "a"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
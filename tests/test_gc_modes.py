@@ -0,0 +1,150 @@
+"""
+Tests for the garbage collector modes (see Interpreter.GC_MODES) and the cycle-free object
+graph.
+"""
+
+import gc
+import unittest
+import weakref
+from unittest import mock
+
+from intbase import ErrorType
+from tests.support import Interpreter, lines
+
+
+# builds a 50 node linked list and sums it
+PROGRAM = lines("""
+(class node
+ (field int val 0)
+ (field node next null)
+ (method void init ((int v) (node n)) (begin (set val v) (set next n)))
+ (method int sum () (if (== next null) (return val) (return (+ val (call next sum)))))
+)
+(class main
+ (field int i 0)
+ (field node head null)
+ (method node push ((int v) (node rest))
+  (let ((node n null))
+   (set n (new node))
+   (call n init v rest)
+   (return n)
+  )
+ )
+ (method void main ()
+  (begin
+   (while (< i 50)
+    (begin
+     (set head (call me push i head))
+     (set i (+ i 1))
+    )
+   )
+   (print (call head sum))
+  )
+ )
+)
+""")
+
+FAILS = lines("""
+(class main
+ (method void main () (begin (print "x") (print (+ 1 "a"))))
+)
+""")
+
+
+class RecordingInterpreter(Interpreter):
+    """Records the collector's settings whenever the program prints."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.collector = []
+
+    def output(self, val):
+        self.collector.append((gc.isenabled(), gc.get_threshold()[0]))
+        super().output(val)
+
+
+class GcModeTest(unittest.TestCase):
+    """Each mode runs programs alike and restores the collector when the run ends."""
+
+    def setUp(self):
+        self.settings = (gc.isenabled(), gc.get_threshold())
+
+    def tearDown(self):
+        self.assertEqual((gc.isenabled(), gc.get_threshold()), self.settings)
+
+    def run_mode(self, gc_mode, program=PROGRAM):
+        interpreter = RecordingInterpreter(False, gc_mode=gc_mode)
+        try:
+            interpreter.run(program)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        return interpreter
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            Interpreter(False, gc_mode="sometimes")
+
+    def test_same_output(self):
+        for gc_mode in Interpreter.GC_MODES:
+            with self.subTest(gc_mode=gc_mode):
+                self.assertEqual(self.run_mode(gc_mode).get_output(), [str(sum(range(50)))])
+
+    def test_collector_during_run(self):
+        enabled, threshold = self.settings
+        self.assertEqual(self.run_mode(None).collector, [(enabled, threshold[0])])
+        self.assertEqual(self.run_mode("freeze").collector,
+                         [(enabled, Interpreter.FREEZE_GC_THRESHOLD)])
+        self.assertEqual(self.run_mode("defer").collector, [(False, threshold[0])])
+
+    def test_freezes_once_per_load(self):
+        interpreter = Interpreter(False, gc_mode="freeze")
+        with mock.patch.object(gc, "freeze", wraps=gc.freeze) as freeze:
+            program = interpreter.compile(PROGRAM)
+        self.assertEqual(freeze.call_count, 1)
+        self.assertGreater(gc.get_freeze_count(), 0)
+        with mock.patch.object(gc, "collect") as collect, \
+                mock.patch.object(gc, "freeze") as freeze, \
+                mock.patch.object(gc, "unfreeze") as unfreeze:
+            for _ in range(3):
+                interpreter.run(program)
+        self.assertEqual(interpreter.get_output()[-1], str(sum(range(50))))
+        self.assertEqual((collect.call_count, freeze.call_count, unfreeze.call_count), (0, 0, 0))
+
+    def test_keeps_host_frozen_objects(self):
+        # whatever the host froze before a run is still frozen after it
+        gc.freeze()
+        frozen = gc.get_freeze_count()
+        for gc_mode in Interpreter.GC_MODES:
+            with self.subTest(gc_mode=gc_mode):
+                self.run_mode(gc_mode)
+                self.assertGreaterEqual(gc.get_freeze_count(), frozen)
+
+    def test_restored_after_error(self):
+        for gc_mode in Interpreter.GC_MODES:
+            with self.subTest(gc_mode=gc_mode):
+                interpreter = self.run_mode(gc_mode, FAILS)
+                self.assertEqual(interpreter.get_output(), ["x"])
+                self.assertEqual(interpreter.get_error_type_and_line(), (ErrorType.TYPE_ERROR, 1))
+                self.assertEqual((gc.isenabled(), gc.get_threshold()), self.settings)
+
+    def test_no_cycles(self):
+        # objects refer back to their interpreter weakly, so reference counting alone frees it
+        # and everything it ran
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            interpreter = Interpreter(False)
+            interpreter.run(PROGRAM)
+            main = weakref.ref(interpreter.main_object)
+            self.assertIsInstance(interpreter.main_object.interpreter, weakref.ProxyType)
+            freed = weakref.ref(interpreter)
+            del interpreter
+            self.assertIsNone(freed())
+            self.assertIsNone(main())
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+
+if __name__ == "__main__":
+    unittest.main()
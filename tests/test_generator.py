@@ -0,0 +1,68 @@
+"""
+Tests for the synthetic program generator (see generatorv2).
+"""
+
+import unittest
+from dataclasses import fields, replace
+
+from generatorv2 import GeneratorConfig, generate_program
+from tests.support import Interpreter
+
+
+def run(program, **options):
+    interpreter = Interpreter(False, **options)
+    interpreter.run(program)
+    return interpreter
+
+
+class GeneratorTest(unittest.TestCase):
+    """Generated programs are valid and print exactly their expected output."""
+
+    def check(self, config, **options):
+        program, expected = generate_program(config)
+        self.assertEqual(run(program, **options).get_output(), expected)
+        return program, expected
+
+    def test_default(self):
+        self.check(GeneratorConfig())
+        self.check(GeneratorConfig(), strict=True)
+        self.check(GeneratorConfig(), streaming=True)
+
+    def test_each_dimension(self):
+        for field in fields(GeneratorConfig):
+            for size in (0, 1, 7):
+                config = replace(GeneratorConfig(), **{field.name: size})
+                with self.subTest(config=config):
+                    self.check(config)
+
+    def test_deterministic(self):
+        config = GeneratorConfig(classes=5, string_size=3)
+        self.assertEqual(generate_program(config), generate_program(config))
+
+    def test_inheritance_chains(self):
+        program, _ = generate_program(GeneratorConfig(classes=6, inheritance_depth=2))
+        headers = [line for line in program if line.startswith("(class c")]
+        self.assertEqual(headers, ["(class c0", "(class c1 inherits c0", "(class c2 inherits c1",
+                                   "(class c3", "(class c4 inherits c3", "(class c5 inherits c4"])
+        classes = run(program).program.class_index
+        self.assertEqual(classes["c5"].parent.parent.name, "c3")
+        self.assertIsNone(classes["c3"].parent)
+
+    def test_scales(self):
+        # main calls every method of each class's chain, so output grows with chain length
+        _, shallow = generate_program(GeneratorConfig(classes=8, inheritance_depth=0, methods=2))
+        _, deep = generate_program(GeneratorConfig(classes=8, inheritance_depth=7, methods=2))
+        self.assertEqual(len(shallow) - 4, 8 * 2)
+        self.assertEqual(len(deep) - 4, sum(range(1, 9)) * 2)
+        big, _ = generate_program(GeneratorConfig(classes=40))
+        small, _ = generate_program(GeneratorConfig(classes=10))
+        self.assertGreater(len(big), 3 * len(small))
+
+    def test_expected_values(self):
+        _, expected = generate_program(GeneratorConfig(
+            classes=0, loop_trips=10, recursion_depth=5, string_size=4, let_depth=3))
+        self.assertEqual(expected, ["45", "5", "xxxx", "6"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the heap and allocation profiler (see heapv2).
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from tests.support import Interpreter, lines, run_program
+
+
+PROGRAM = """
+(class animal
+ (field string name "x")
+)
+(class dog inherits animal
+ (field int age 0)
+)
+(class main
+ (field int i 0)
+ (field dog keep null)
+ (method void main ()
+  (begin
+   (while (< i 100)
+    (begin
+     (set keep (new dog))
+     (set i (+ i 1))
+    )
+   )
+   (print i)
+  )
+ )
+)
+"""
+
+
+class HeapTest(unittest.TestCase):
+    """Snapshots count the run's own objects, Values and frames."""
+
+    def test_end_snapshot(self):
+        interpreter = run_program(PROGRAM, heap_profile=True)
+        self.assertEqual(interpreter.get_output(), ["100"])
+        end = interpreter.get_heap_snapshots()[-1]
+        self.assertEqual(end["reason"], "end")
+        self.assertEqual(end["objects"]["dog"]["total"], 100)
+        self.assertEqual(end["objects"]["animal"]["total"], 100)
+        self.assertEqual(end["objects"]["animal"]["parents"], end["objects"]["animal"]["live"])
+        # only the last dog is still referenced, from the main object
+        self.assertEqual(end["objects"]["dog"]["live"], 1)
+        self.assertLess(end["values"]["int"]["live"], end["values"]["int"]["total"])
+        self.assertEqual((end["frames"]["live"], end["frames"]["total"]), (0, 1))  # main's
+        self.assertIsNone(run_program(PROGRAM).get_heap_snapshots())
+
+    def test_threshold_and_dump(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dump = os.path.join(directory, "heap.jsonl")
+            interpreter = run_program(PROGRAM, heap_profile=True, heap_threshold=1000,
+                                      heap_dump=dump)
+            snapshots = interpreter.get_heap_snapshots()
+            self.assertGreater(len(snapshots), 1)
+            self.assertEqual({snapshot["reason"] for snapshot in snapshots[:-1]}, {"threshold"})
+            with open(dump, encoding="utf-8") as handle:
+                self.assertEqual([json.loads(line) for line in handle], snapshots)
+
+    def test_concurrent_runs_not_counted(self):
+        alone = run_program(PROGRAM, heap_profile=True).get_heap_snapshots()[-1]
+        program = Interpreter(False).compile(lines(PROGRAM))
+        start = threading.Barrier(2)
+
+        def other_runs():
+            start.wait()
+            for _ in range(10):
+                Interpreter(False).run(program)
+
+        thread = threading.Thread(target=other_runs)
+        thread.start()
+        start.wait()
+        interpreter = Interpreter(False, None, False, heap_profile=True)
+        for _ in range(10):
+            interpreter.run(program)
+            end = interpreter.get_heap_snapshots()[-1]
+            self.assertEqual(end["objects"], alone["objects"])
+            self.assertEqual({name: counts["total"] for name, counts in end["values"].items()},
+                             {name: counts["total"] for name, counts in alone["values"].items()})
+        thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
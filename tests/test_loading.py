@@ -0,0 +1,161 @@
+"""
+Tests for lazy and strict loading (see Interpreter's lazy and strict options).
+"""
+
+import glob
+import os
+import unittest
+
+from intbase import ErrorType
+from tests.support import ROOT, Interpreter, lines, run_program
+
+
+# main never calls broken, and never instantiates library
+UNUSED_ERRORS = """
+(class library
+ (method void takes ((nosuchtype x)) (print x))
+ (method nosuchtype gives () (return null))
+)
+(class main
+ (method nosuchtype broken () (return null))
+ (method void main () (print "ran"))
+)
+"""
+
+CALLS_BROKEN = """
+(class main
+ (method nosuchtype broken () (return null))
+ (method void main ()
+  (begin
+   (print "before")
+   (call me broken)
+  )
+ )
+)
+"""
+
+# class-typed returns and parameters, including a class declared after its first use
+CLASS_SIGNATURES = """
+(class animal
+ (method animal self () (return me))
+ (method string name () (return "animal"))
+ (method string greet ((animal other) (pet p)) (return (+ (call other name) (call p name))))
+)
+(class pet inherits animal
+ (method string name () (return "pet"))
+)
+(class main
+ (method pet adopt () (return (new pet)))
+ (method void main ()
+  (print (call (call (new animal) self) greet (call me adopt) (call me adopt)))
+ )
+)
+"""
+
+LIBRARY = """
+(class library
+ (method int one () (return 1))
+ (method int two () (return 2))
+ (method int three () (return 3))
+)
+(class main
+ (method void main () (print (call (new library) two)))
+)
+"""
+
+
+def method(interpreter, class_name, method_name):
+    return interpreter.program.class_index[class_name].get_methods()[method_name]
+
+
+def compiled(method_def):
+    return method_def._MethodDef__code is not None  # pylint: disable=protected-access
+
+
+class LoadingTest(unittest.TestCase):
+    """When method signatures are checked and method bodies compiled."""
+
+    def test_default(self):
+        # return types are checked for all methods of a class when it's first instantiated
+        interpreter = run_program(UNUSED_ERRORS)
+        self.assertEqual(interpreter.get_output(), [])
+        self.assertEqual(interpreter.get_error_type_and_line()[0], ErrorType.TYPE_ERROR)
+        interpreter = run_program(LIBRARY)
+        self.assertEqual(interpreter.get_output(), ["2"])
+        self.assertTrue(compiled(method(interpreter, "library", "one")))
+
+    def test_lazy(self):
+        interpreter = run_program(UNUSED_ERRORS, lazy=True)
+        self.assertEqual(interpreter.get_output(), ["ran"])
+        self.assertEqual(interpreter.get_error_type_and_line(), (None, None))
+
+    def test_lazy_reports_on_call(self):
+        interpreter = run_program(CALLS_BROKEN, lazy=True)
+        self.assertEqual(interpreter.get_output(), ["before"])
+        self.assertEqual(interpreter.get_error_type_and_line()[0], ErrorType.TYPE_ERROR)
+        self.assertEqual(run_program(CALLS_BROKEN).get_output(), [])
+
+    def test_lazy_compiles_on_call(self):
+        interpreter = Interpreter(False, lazy=True)
+        interpreter.load(lines(LIBRARY))
+        two = method(interpreter, "library", "two")
+        self.assertFalse(compiled(two))
+        interpreter.execute()
+        self.assertEqual(interpreter.get_output(), ["2"])
+        self.assertTrue(compiled(two))
+        self.assertTrue(two.validated)
+        self.assertFalse(compiled(method(interpreter, "library", "one")))
+        self.assertFalse(method(interpreter, "library", "three").validated)
+
+    def test_strict(self):
+        for source in (UNUSED_ERRORS, CALLS_BROKEN):
+            interpreter = Interpreter(False, strict=True)
+            with self.assertRaises(Exception):
+                interpreter.load(lines(source))
+            self.assertEqual(interpreter.get_error_type_and_line()[0], ErrorType.TYPE_ERROR)
+
+    def test_strict_param_types(self):
+        # only strict loading checks the parameter types of methods never called
+        source = """
+(class main
+ (method void takes ((nosuchtype x)) (print x))
+ (method void main () (print "ran"))
+)
+"""
+        self.assertEqual(run_program(source).get_output(), ["ran"])
+        interpreter = run_program(source, strict=True)
+        self.assertEqual(interpreter.get_output(), [])
+        self.assertEqual(interpreter.get_error_type_and_line()[0], ErrorType.TYPE_ERROR)
+
+    def test_strict_class_signatures(self):
+        # types are checked against the program's own classes, all of which exist by then
+        for options in ({}, {"strict": True}, {"strict": True, "lazy": True}):
+            with self.subTest(options=options):
+                interpreter = run_program(CLASS_SIGNATURES, **options)
+                self.assertEqual(interpreter.get_error_type_and_line(), (None, None))
+                self.assertEqual(interpreter.get_output(), ["petpet"])
+
+    def test_strict_test_programs(self):
+        # strict loading accepts every valid program and runs it alike
+        for path in sorted(glob.glob(os.path.join(ROOT, "v2", "tests", "*.brewin"))):
+            with open(path, encoding="utf-8") as file:
+                source = file.read()
+            inp = None
+            if os.path.exists(path[:-len(".brewin")] + ".in"):
+                with open(path[:-len(".brewin")] + ".in", encoding="utf-8") as file:
+                    inp = file.read().splitlines()
+            with self.subTest(path=os.path.basename(path)):
+                strict = run_program(source, inp, strict=True)
+                self.assertEqual(strict.get_error_type_and_line(), (None, None))
+                self.assertEqual(strict.get_output(), run_program(source, inp).get_output())
+
+    def test_strict_compiles_everything(self):
+        interpreter = Interpreter(False, lazy=True, strict=True)
+        interpreter.load(lines(LIBRARY))
+        for name in ("one", "two", "three"):
+            self.assertTrue(compiled(method(interpreter, "library", name)))
+            self.assertTrue(method(interpreter, "library", name).validated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for memoizing pure methods (see analysisv2.find_pure_methods and memov2.MethodMemo).
+"""
+
+import unittest
+
+from analysisv2 import find_pure_methods
+from memov2 import MethodMemo
+from tests.support import Interpreter, lines, run_program
+from type_valuev2 import Type, Value
+
+
+PURITY = """
+(class base
+ (field int count 0)
+ (method int square ((int n)) (return (* n n)))
+ (method int twice ((int n)) (return (+ (call me square n) (call me square n))))
+ (method int reads () (return count))
+ (method void writes () (set count 1))
+ (method int prints ((int n)) (begin (print n) (return n)))
+ (method int calls_prints ((int n)) (return (call me prints n)))
+ (method int looks ((int n)) (return n))
+ (method int calls_looks ((int n)) (return (call me looks n)))
+ (method int locals ((int n)) (let ((int m 0)) (set m (+ n 1)) (return m)))
+ (method base self () (return me))
+)
+(class derived inherits base
+ (method int looks ((int n)) (begin (inputi count) (return n)))
+)
+(class main
+ (method void main () (print (call (new base) twice 3)))
+)
+"""
+
+FIB = """
+(class main
+ (method int fib ((int n))
+  (if (< n 2) (return n) (return (+ (call me fib (- n 1)) (call me fib (- n 2)))))
+ )
+ (method void main ()
+  (begin
+   (print (call me fib 20))
+   (print (call me fib 20))
+  )
+ )
+)
+"""
+
+
+def pure_names(source):
+    interpreter = Interpreter(False)
+    interpreter.load(lines(source))
+    pure = find_pure_methods(interpreter.program.class_index)
+    return {(method.method_name, class_name)
+            for class_name, class_def in interpreter.program.class_index.items()
+            for method in class_def.get_methods().values() if method in pure}
+
+
+class PurityTest(unittest.TestCase):
+    """Only methods whose result depends on nothing but their arguments are pure."""
+
+    def test_pure_methods(self):
+        self.assertEqual(pure_names(PURITY), {("square", "base"), ("twice", "base"),
+                                              ("locals", "base"), ("looks", "base")})
+
+    def test_rejected(self):
+        pure = {name for name, _ in pure_names(PURITY)}
+        self.assertNotIn("reads", pure)  # reads a field
+        self.assertNotIn("writes", pure)  # sets a field, and returns nothing
+        self.assertNotIn("prints", pure)
+        self.assertNotIn("calls_prints", pure)  # calls an impure method
+        # base's looks is pure, but the call through me could reach derived's, which isn't
+        self.assertNotIn("calls_looks", pure)
+        self.assertNotIn("self", pure)  # returns an object
+
+
+class MemoTest(unittest.TestCase):
+    """The memo counts hits and misses, and keeps at most max_size results."""
+
+    def test_hits_and_misses(self):
+        interpreter = run_program(FIB, memoize=True)
+        self.assertEqual(interpreter.get_output(), ["6765", "6765"])
+        # fib 0 to fib 20 each miss once; the (- n 2) calls of fib 3 to fib 20 and the second
+        # fib 20 hit
+        stats = interpreter.get_memo_stats()
+        self.assertEqual((stats["misses"], stats["size"], stats["evictions"]), (21, 21, 0))
+        self.assertEqual(stats["hits"], 18 + 1)
+        self.assertIsNone(run_program(FIB).get_memo_stats())
+
+    def test_evicts_at_size_limit(self):
+        interpreter = run_program(FIB, memoize=True, memo_size=4)
+        self.assertEqual(interpreter.get_output(), ["6765", "6765"])
+        stats = interpreter.get_memo_stats()
+        self.assertEqual((stats["size"], stats["max_size"]), (4, 4))
+        self.assertEqual(stats["evictions"], stats["misses"] - 4)
+
+    def test_least_recently_used(self):
+        memo = MethodMemo(2)
+        one, two, three = (("m", None, ((Type.INT, n),)) for n in (1, 2, 3))
+        memo.put(one, Value(Type.INT, 1))
+        memo.put(two, Value(Type.INT, 2))
+        self.assertEqual(memo.get(one).value(), 1)  # one is now more recently used than two
+        memo.put(three, Value(Type.INT, 3))
+        self.assertIsNone(memo.get(two))
+        self.assertEqual(memo.get(one).value(), 1)
+        self.assertEqual(memo.get(three).value(), 3)
+        self.assertEqual(memo.get_stats(), {"hits": 3, "misses": 1, "evictions": 1, "size": 2,
+                                            "max_size": 2})
+
+    def test_only_primitive_arguments(self):
+        self.assertIsNone(MethodMemo.make_key("m", None, [Value(Type.CLASS, None, "main")]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the resource quotas (see quotav2).
+"""
+
+import asyncio
+import gc
+import unittest
+
+from tests.support import Interpreter, lines, run_program
+from quotav2 import QuotaExceededError, QuotaType
+
+
+LOOP = """
+(class main
+ (field int i 0)
+ (method void main ()
+  (while (< i 100) (set i (+ i 1)))
+ )
+)
+"""
+
+RECURSION = """
+(class main
+ (method int down ((int n))
+  (if (== n 0) (return 0) (return (call me down (- n 1))))
+ )
+ (method void main ()
+  (print (call me down 50))
+ )
+)
+"""
+
+# each node links to itself, so none of them is freed until the cyclic collector runs
+CYCLES = """
+(class node
+ (field node self null)
+ (method void link () (set self me))
+)
+(class main
+ (field int i 0)
+ (field node n null)
+ (method void main ()
+  (while (< i 3000)
+   (begin
+    (set n (new node))
+    (call n link)
+    (set i (+ i 1))
+   )
+  )
+ )
+)
+"""
+
+OUTPUT = """
+(class main
+ (method void main ()
+  (begin
+   (print "hello")
+   (print "world")
+  )
+ )
+)
+"""
+
+
+class QuotaTest(unittest.TestCase):
+    """Each quota trips at a fixed point of the program, and only when exceeded."""
+
+    def test_steps(self):
+        interpreter = run_program(LOOP, max_steps=50)
+        self.assertEqual(interpreter.get_error_type_and_line()[0], QuotaType.STEPS)
+        interpreter = run_program(LOOP, max_steps=1000)
+        self.assertIsNone(interpreter.get_error_type_and_line()[0])
+
+    def test_call_depth(self):
+        interpreter = run_program(RECURSION, max_call_depth=20)
+        self.assertEqual(interpreter.get_error_type_and_line()[0], QuotaType.CALL_DEPTH)
+        interpreter = run_program(RECURSION, max_call_depth=100)
+        self.assertEqual(interpreter.get_output(), ["0"])
+
+    def test_call_depth_line(self):
+        # reported where the call that goes too deep is made, not where the callee starts
+        for max_call_depth, line in ((20, 2), (1, 5)):
+            interpreter = run_program(RECURSION, max_call_depth=max_call_depth)
+            self.assertEqual(interpreter.get_error_type_and_line(), (QuotaType.CALL_DEPTH, line))
+            interpreter = Interpreter(False, max_call_depth=max_call_depth)
+            with self.assertRaises(QuotaExceededError):
+                asyncio.run(interpreter.run_async(lines(RECURSION)))
+            self.assertEqual(interpreter.get_error_type_and_line(), (QuotaType.CALL_DEPTH, line))
+
+    def test_output(self):
+        interpreter = run_program(OUTPUT, max_output=8)
+        self.assertEqual(interpreter.get_error_type_and_line(), (QuotaType.OUTPUT, 4))
+        self.assertEqual(interpreter.get_output(), ["hello"])
+
+    def test_objects_independent_of_collector(self):
+        # objects are counted when created, so when cycles get collected doesn't matter
+        for gc_mode in (None, "freeze", "defer"):
+            interpreter = Interpreter(False, None, False, gc_mode=gc_mode, max_objects=500)
+            with self.assertRaises(QuotaExceededError) as raised:
+                interpreter.run(lines(CYCLES))
+            self.assertEqual(raised.exception.quota_type, QuotaType.OBJECTS)
+            self.assertEqual(interpreter.get_error_type_and_line(), (QuotaType.OBJECTS, 10))
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            interpreter = run_program(CYCLES, max_objects=500)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        self.assertEqual(interpreter.get_error_type_and_line(), (QuotaType.OBJECTS, 10))
+        # main plus 3000 nodes
+        self.assertIsNone(run_program(CYCLES, max_objects=3001).get_error_type_and_line()[0])
+
+    def test_counters_reset_between_runs(self):
+        interpreter = Interpreter(False, None, False, max_objects=3001)
+        results = list(interpreter.run_inputs(lines(CYCLES), [["1"], ["2"], ["3"]]))
+        self.assertEqual([result.error_type for result in results], [None, None, None])
+        self.assertEqual(interpreter.quota.objects, 3001)
+
+
+if __name__ == "__main__":
+    unittest.main()
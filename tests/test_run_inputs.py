@@ -0,0 +1,144 @@
+"""
+Tests for running one program against many input sets (see Interpreter.run_inputs and the
+batchv2 command line).
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import batchv2
+from intbase import ErrorType
+from tests.support import Interpreter, lines
+
+
+# fails on a negative input, after printing something
+PROGRAM = lines("""
+(class main
+ (field int n 0)
+ (field int total 0)
+ (method void main ()
+  (begin
+   (inputi n)
+   (print "n=" n)
+   (if (< n 0) (call me nothing))
+   (set total (+ total n))
+   (print total)
+  )
+ )
+)
+""")
+
+# main inherits from a class that doesn't exist
+FAILS_TO_LOAD = lines("""
+(class main inherits nothing
+ (method void main () (print 1))
+)
+""")
+
+
+class RunInputsTest(unittest.TestCase):
+    """Each input set runs from a fresh start, on a program loaded once."""
+
+    def test_runs_each_input(self):
+        results = list(Interpreter(False).run_inputs(PROGRAM, [["1"], ["-5"], ["2"]]))
+        self.assertEqual([result.index for result in results], [0, 1, 2])
+        # fields start over, so total doesn't carry over between runs
+        self.assertEqual(results[0], batchv2.JobResult(0, ["n=1", "1"], None, None, None))
+        self.assertEqual(results[2], batchv2.JobResult(2, ["n=2", "2"], None, None, None))
+        failed = results[1]
+        self.assertEqual(failed.output, ["n=-5"])
+        self.assertEqual((failed.error_type, failed.error_line), (ErrorType.NAME_ERROR, 7))
+        self.assertIsNotNone(failed.message)
+
+    def test_loads_once(self):
+        interpreter = Interpreter(False)
+        with mock.patch.object(Interpreter, "load", wraps=interpreter.load) as load:
+            results = list(interpreter.run_inputs(PROGRAM, [["1"], ["2"], ["3"]]))
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual([result.output[-1] for result in results], ["1", "2", "3"])
+
+    def test_loaded_program(self):
+        program = Interpreter(False).compile(PROGRAM)
+        results = list(Interpreter(False).run_inputs(program, [["4"], ["5"]]))
+        self.assertEqual([result.output for result in results], [["n=4", "4"], ["n=5", "5"]])
+
+    def test_missing_input(self):
+        result, = Interpreter(False).run_inputs(PROGRAM, [[]])
+        self.assertIsNotNone(result.message)
+
+    def test_empty_input_set(self):
+        # an empty input set is no input at all: stdin is never read, even by run_many's jobs
+        interpreter = Interpreter(False)
+        with mock.patch("builtins.input", side_effect=AssertionError("read stdin")):
+            results = list(interpreter.run_inputs(PROGRAM, [[], ["1"], ()]))
+            jobs = list(Interpreter.run_many([(PROGRAM, []), (PROGRAM, None)]))
+        self.assertEqual([result.output for result in results], [[], ["n=1", "1"], []])
+        for result in results[:1] + results[2:] + jobs:
+            self.assertEqual(result.output, [])
+            self.assertNotIn("read stdin", result.message)
+        # outside of a batch run, no input list still means reading stdin
+        with mock.patch("builtins.input", return_value="4"):
+            interpreter.run(PROGRAM)
+        self.assertEqual(interpreter.get_output(), ["n=4", "4"])
+
+    def test_fails_to_load(self):
+        results = list(Interpreter(False).run_inputs(FAILS_TO_LOAD, [["1"], ["2"]]))
+        self.assertEqual(len(results), 2)
+        for index, result in enumerate(results):
+            self.assertEqual(result.index, index)
+            self.assertEqual(result.output, [])
+            self.assertEqual((result.error_type, result.error_line), (ErrorType.NAME_ERROR, 0))
+            self.assertIsNotNone(result.message)
+
+    def test_no_inputs(self):
+        self.assertEqual(list(Interpreter(False).run_inputs(PROGRAM, [])), [])
+
+
+class CommandLineTest(unittest.TestCase):
+    """python batchv2.py program.brewin input... reports each run."""
+
+    def run_main(self, program, inputs, *flags):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "program.brewin")
+            with open(source, "w", encoding="utf-8") as file:
+                file.write("\n".join(program) + "\n")
+            paths = []
+            for i, inp in enumerate(inputs):
+                paths.append(os.path.join(directory, f"{i}.in"))
+                with open(paths[-1], "w", encoding="utf-8") as file:
+                    file.write("\n".join(inp) + "\n")
+            printed = io.StringIO()
+            with mock.patch.object(sys, "argv", ["batchv2.py", source, *paths, *flags]), \
+                    contextlib.redirect_stdout(printed):
+                batchv2.main()
+        return paths, printed.getvalue().splitlines()
+
+    def test_text(self):
+        paths, printed = self.run_main(PROGRAM, [["3"], ["-1"]])
+        self.assertEqual(printed[:3], [f"== {paths[0]}", "n=3", "3"])
+        self.assertEqual(printed[3:5], [f"== {paths[1]}", "n=-1"])
+        self.assertTrue(printed[5].startswith("error: "))
+
+    def test_json(self):
+        paths, printed = self.run_main(PROGRAM, [["3"], ["-1"]], "--json", "--codegen")
+        reports = [json.loads(line) for line in printed]
+        self.assertEqual(reports[0], {"input": paths[0], "output": ["n=3", "3"], "error_type": None,
+                                      "error_line": None, "message": None})
+        self.assertEqual(reports[1]["error_type"], str(ErrorType.NAME_ERROR))
+        self.assertEqual(reports[1]["error_line"], 7)
+
+    def test_json_fails_to_load(self):
+        _, printed = self.run_main(FAILS_TO_LOAD, [["1"], ["2"]], "--json")
+        reports = [json.loads(line) for line in printed]
+        self.assertEqual([report["error_type"] for report in reports],
+                         [str(ErrorType.NAME_ERROR)] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for splitting the test suite across machines (see tester.py --shard and --merge).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from tests.support import ROOT
+import tester  # pylint: disable=wrong-import-order
+
+
+NAMES = [test["name"] for test in tester.generate_test_suite_v2()]
+
+
+def shards(count, timings=None):
+    return [tester.select_shard(NAMES, (index, count), timings) for index in range(1, count + 1)]
+
+
+def result(name, score=1, wall_time=None):
+    test = {"name": name, "score": score, "max_score": 1, "visibility": "visible", "output": ""}
+    if wall_time is not None:
+        test["wall_time"] = wall_time
+    return test
+
+
+class SelectShardTest(unittest.TestCase):
+    """Shards partition the suite, the same way on every machine."""
+
+    def check_partition(self, parts):
+        self.assertEqual(sorted(sum(parts, [])), sorted(NAMES))  # each name exactly once
+        for part in parts:
+            self.assertEqual(part, [name for name in NAMES if name in part])  # in suite order
+
+    def test_parse_shard(self):
+        self.assertEqual(tester.parse_shard("2/3"), (2, 3))
+        for text in ("0/3", "4/3", "3", "a/b", "1/2/3"):
+            with self.subTest(text=text), self.assertRaises(argparse.ArgumentTypeError):
+                tester.parse_shard(text)
+
+    def test_hash_partition(self):
+        for count in (1, 2, 3, 7):
+            with self.subTest(count=count):
+                self.check_partition(shards(count))
+        self.assertEqual(shards(1), [NAMES])
+
+    def test_hash_partition_is_stable(self):
+        # str hashes differ between processes; the partition mustn't
+        code = ("import tester; names = [t['name'] for t in tester.generate_test_suite_v2()];"
+                "print(tester.select_shard(names, (1, 3)))")
+        outputs = set()
+        for seed in ("1", "2"):
+            environment = dict(os.environ, PYTHONHASHSEED=seed)
+            outputs.add(subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=environment,
+                                       capture_output=True, text=True, check=True).stdout)
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(outputs.pop().strip(), repr(shards(3)[0]))
+
+    def test_balanced_by_timings(self):
+        timings = {name: 0.01 for name in NAMES}
+        timings[NAMES[0]] = 1.0
+        timings[NAMES[1]] = 1.0
+        parts = shards(3, timings)
+        self.check_partition(parts)
+        self.assertEqual(parts, shards(3, dict(timings)))
+        # the two slow tests land on different shards, and the rest evens out the totals
+        slow = [i for i, part in enumerate(parts) for name in part if timings[name] == 1.0]
+        self.assertEqual(len(set(slow)), 2)
+        totals = [sum(timings[name] for name in part) for part in parts]
+        self.assertLess(max(totals) - min(totals), 1.0)
+
+    def test_partial_timings(self):
+        # names without history count as the average of those with it
+        self.check_partition(shards(4, {NAMES[0]: 0.5, "gone | test": 9.0}))
+
+
+class MergeTest(unittest.TestCase):
+    """--merge combines shard results and rejects overlapping shards."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, tests):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"tests": tests}, handle)
+        return path
+
+    def run_merge(self, *paths):
+        return subprocess.run([sys.executable, os.path.join(ROOT, "tester.py"), "--merge", *paths],
+                              cwd=self.directory.name, capture_output=True, text=True,
+                              check=False)
+
+    def test_merge_results(self):
+        first = self.write("1.json", [result("a"), result("b", 0)])
+        second = self.write("2.json", [result("c")])
+        self.assertEqual([test["name"] for test in tester.merge_results([first, second])],
+                         ["a", "b", "c"])
+
+    def test_overlap(self):
+        first = self.write("1.json", [result("a"), result("b")])
+        second = self.write("2.json", [result("b")])
+        with self.assertRaises(ValueError) as raised:
+            tester.merge_results([first, second])
+        self.assertIn("b is in both", str(raised.exception))
+        merged = self.run_merge(first, second)
+        self.assertNotEqual(merged.returncode, 0)
+        self.assertIn("can't merge", merged.stderr)
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "results.json")))
+
+    def test_merge_command(self):
+        first = self.write("1.json", [result("a", wall_time=0.5), result("b", 0)])
+        second = self.write("2.json", [result("c", wall_time=0.25)])
+        merged = self.run_merge(first, second)
+        self.assertEqual(merged.returncode, 0, merged.stderr)
+        self.assertIn("2/3 tests passed", merged.stdout)
+        with open(os.path.join(self.directory.name, "results.json"), encoding="utf-8") as handle:
+            results = json.load(handle)
+        self.assertEqual([test["name"] for test in results["tests"]], ["a", "b", "c"])
+        # the shards' timings become the history the next split run balances with
+        timings = tester.load_timings(os.path.join(self.directory.name, tester.TIMINGS_FILE))
+        self.assertEqual(timings, {"a": 0.5, "c": 0.25})
+
+    def test_timings_file(self):
+        path = os.path.join(self.directory.name, "timings.json")
+        self.assertEqual(tester.load_timings(path), {})
+        tester.update_timings(path, [result("a", wall_time=1.0), result("b")])
+        tester.update_timings(path, [result("c", wall_time=2.0), result("a", wall_time=3.0)])
+        self.assertEqual(tester.load_timings(path), {"a": 3.0, "c": 2.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for running one Program from many threads at once (see programv2).
+"""
+
+import sys
+import threading
+import unittest
+
+from tests.support import Interpreter, lines
+
+
+THREADS = 8
+RUNS = 20
+
+# the input picks which class each loop iteration sees first, so runs specialize call sites
+# and operators differently, turn call sites megamorphic and deoptimize operators
+PROGRAM = lines("""
+(class shape
+ (field int size 0)
+ (method int size () (return size))
+ (method void resize ((int s)) (set size s))
+ (method int val () (return 1))
+)
+(class a inherits shape (method int val () (return 2)))
+(class b inherits shape (method int val () (return 3)))
+(class c inherits shape (method int val () (return 4)))
+(class d inherits shape (method int val () (return 5)))
+(class e inherits shape (method string val () (return "e")))
+(class main
+ (field int start 0)
+ (field int i 0)
+ (field shape s null)
+ (method shape pick ((int k))
+  (begin
+   (if (== k 0) (return (new a)))
+   (if (== k 1) (return (new b)))
+   (if (== k 2) (return (new c)))
+   (if (== k 3) (return (new d)))
+   (if (== k 4) (return (new e)))
+   (return (new shape))
+  )
+ )
+ (method void main ()
+  (begin
+   (inputi start)
+   (while (< i 12)
+    (begin
+     (set s (call me pick (% (+ start i) 6)))
+     (call s resize i)
+     (print (+ (call s val) (call s val)) " " (== (call s val) (call s val)) " " (call s size))
+     (set i (+ i 1))
+    )
+   )
+  )
+ )
+)
+""")
+
+
+def expected_outputs(**options):
+    # each input's output from a Program of its own
+    outputs = {}
+    for start in range(6):
+        interpreter = Interpreter(False, [str(start)], **options)
+        interpreter.run(PROGRAM)
+        outputs[start] = interpreter.get_output()
+    return outputs
+
+
+class SharedProgramTest(unittest.TestCase):
+    """Concurrent runs of one Program give the output each would give alone."""
+
+    def run_threads(self, **options):
+        expected = expected_outputs(**options)
+        program = Interpreter(False, **options).compile(PROGRAM)
+        start = threading.Barrier(THREADS)
+        failures = []
+
+        def runs(thread):
+            start.wait()
+            for run in range(RUNS):
+                first = (thread + run) % 6
+                interpreter = Interpreter(False, [str(first)], **options)
+                try:
+                    interpreter.run(program)
+                except Exception as exception:  # pylint: disable=broad-except
+                    failures.append((thread, run, repr(exception)))
+                    continue
+                if interpreter.get_output() != expected[first]:
+                    failures.append((thread, run, interpreter.get_output()))
+
+        threads = [threading.Thread(target=runs, args=(thread,)) for thread in range(THREADS)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)  # switch threads often, so the runs' writes interleave
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(failures, [])
+
+    def test_shared(self):
+        self.run_threads()
+
+    def test_shared_lazy(self):
+        # methods are compiled by whichever run calls them first
+        self.run_threads(lazy=True)
+
+    def test_shared_codegen(self):
+        self.run_threads(codegen=True)
+
+    def test_shared_with_quotas(self):
+        # accessors aren't inlined, and each run counts only its own steps
+        self.run_threads(max_steps=10000)
+
+    def test_expected_differs_by_input(self):
+        outputs = expected_outputs()
+        self.assertEqual(outputs[0][0], "4 true 0")
+        self.assertEqual(outputs[4][0], "ee true 0")
+        self.assertNotEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests for short-circuit evaluation of & and | (see Interpreter's short_circuit option) and the
+static check for expressions it would change (see analysisv2.find_short_circuit_hazards).
+"""
+
+import unittest
+
+from intbase import ErrorType
+from tests.support import Interpreter, lines, run_program
+
+
+# the right operands on (0-based) lines 6, 8, 9 and 10 call a method or can raise
+HAZARDS = """
+(class main
+ (field int x 0)
+ (field int calls 0)
+ (method bool tick () (begin (set calls (+ calls 1)) (return true)))
+ (method void main ()
+  (begin
+   (print (& false (call me tick)))
+   (print (| true (== (+ 1 x) 1)))
+   (print (& false (== (/ 1 x) 0)))
+   (print (| true (== (% 1 x) 0)))
+   (print (| true (< 2 (+ "a" 1))))
+   (print (& false (== (/ x 2) (% x 3))))
+   (print (| true (! (== x 0))))
+  )
+ )
+)
+"""
+
+
+def body(*statements):
+    return f"""
+(class main
+ (field int x 0)
+ (field int calls 0)
+ (method bool tick () (begin (set calls (+ calls 1)) (return true)))
+ (method void main ()
+  (begin
+   {" ".join(statements)}
+   (print calls)
+  )
+ )
+)
+"""
+
+
+class ShortCircuitTest(unittest.TestCase):
+    """By default both operands of & and | are evaluated; short_circuit skips a decided one."""
+
+    def test_skips_calls(self):
+        source = body("(print (& false (call me tick)))", "(print (| true (call me tick)))",
+                      "(print (& true (call me tick)))", "(print (| false (call me tick)))")
+        self.assertEqual(run_program(source).get_output(),
+                         ["false", "true", "true", "true", "4"])
+        self.assertEqual(run_program(source, short_circuit=True).get_output(),
+                         ["false", "true", "true", "true", "2"])
+
+    def test_skips_errors(self):
+        source = body('(print (& false (== x "a")))')
+        interpreter = run_program(source)
+        self.assertEqual(interpreter.get_output(), [])
+        self.assertEqual(interpreter.get_error_type_and_line(), (ErrorType.TYPE_ERROR, 6))
+        self.assertEqual(run_program(source, short_circuit=True).get_output(), ["false", "0"])
+
+    def test_skips_division_by_zero(self):
+        source = lines(body("(print (& false (== (/ 1 x) 0)))"))
+        with self.assertRaises(ZeroDivisionError):
+            Interpreter(False).run(source)
+        interpreter = Interpreter(False, short_circuit=True)
+        interpreter.run(source)
+        self.assertEqual(interpreter.get_output(), ["false", "0"])
+
+    def test_left_operand_still_checked(self):
+        # only a bool left operand can decide the result; anything else is still an error
+        interpreter = run_program(body("(print (& 1 (call me tick)))"), short_circuit=True)
+        self.assertEqual(interpreter.get_error_type_and_line(), (ErrorType.TYPE_ERROR, 6))
+        self.assertEqual(interpreter.get_output(), [])
+
+
+class HazardTest(unittest.TestCase):
+    """find_short_circuit_hazards flags exactly the & and | whose right operand matters."""
+
+    def test_hazards(self):
+        hazards = Interpreter(False).find_short_circuit_hazards(lines(HAZARDS))
+        self.assertEqual([line for line, _ in hazards], [6, 8, 9, 10])
+        self.assertIn("calls a method", hazards[0][1])
+        self.assertTrue(all("may raise" in description for _, description in hazards[1:]))
+
+    def test_division_by_literal(self):
+        # only a nonzero literal divisor is known not to raise
+        for divisor, flagged in (("2", False), ("-1", False), ("0", True), ("x", True)):
+            for op in ("/", "%"):
+                source = body(f"(print (& false (== ({op} x {divisor}) 0)))")
+                with self.subTest(op=op, divisor=divisor):
+                    hazards = Interpreter(False).find_short_circuit_hazards(lines(source))
+                    self.assertEqual(bool(hazards), flagged)
+
+    def test_no_short_circuits(self):
+        self.assertEqual(Interpreter(False).find_short_circuit_hazards(lines(body())), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
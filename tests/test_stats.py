@@ -0,0 +1,103 @@
+"""
+Tests for the run-time statistics (see statsv2).
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+from tests.support import Interpreter, lines, run_program
+from type_valuev2 import Value
+
+
+PROGRAM = """
+(class counter
+ (field int n 0)
+ (method void bump () (set n (+ n 1)))
+)
+(class main
+ (field int i 0)
+ (field counter c null)
+ (method void main ()
+  (begin
+   (set c (new counter))
+   (while (< i 1000)
+    (begin
+     (call c bump)
+     (set i (+ i 1))
+    )
+   )
+   (print i)
+  )
+ )
+)
+"""
+
+
+class StatsTest(unittest.TestCase):
+    """Counters describe exactly one run, whatever else runs in the process."""
+
+    def test_counters(self):
+        stats = run_program(PROGRAM, stats=True).get_stats()
+        self.assertEqual(stats["statements"]["while"], 1)
+        self.assertEqual(stats["statements"]["call"], 1000)
+        self.assertEqual(stats["method_calls"], 1001)  # main and bump
+        self.assertEqual(stats["objects"], {"main": 1, "counter": 1})
+        self.assertGreater(stats["values"], 2000)
+        self.assertIsNone(run_program(PROGRAM).get_stats())
+
+    def test_repeatable(self):
+        self.assertEqual(run_program(PROGRAM, stats=True).get_stats(),
+                         run_program(PROGRAM, stats=True).get_stats())
+
+    def test_concurrent_runs_not_counted(self):
+        alone = run_program(PROGRAM, stats=True).get_stats()
+        program = Interpreter(False).compile(lines(PROGRAM))
+        start = threading.Barrier(2)
+
+        def other_runs():
+            start.wait()
+            for _ in range(20):
+                Interpreter(False).run(program)
+
+        thread = threading.Thread(target=other_runs)
+        thread.start()
+        start.wait()
+        interpreter = Interpreter(False, None, False, stats=True)
+        for _ in range(20):
+            interpreter.run(program)
+            stats = interpreter.get_stats()
+            # method lookups depend on how warm the shared Program's inline caches are
+            self.assertEqual(stats["values"], alone["values"])
+            self.assertEqual(stats["statements"], alone["statements"])
+            self.assertEqual(stats["objects"], alone["objects"])
+        thread.join()
+
+    def test_unobserved_runs_skip_observers(self):
+        # only while some run is observed does creating a Value look for observers
+        unobserved = Value.__init__
+        for options, observed in (({}, False), ({"stats": True}, True),
+                                  ({"heap_profile": True}, True)):
+            interpreter = Interpreter(False, **options)
+            during = []
+            with mock.patch.object(interpreter, "output",
+                                   side_effect=lambda _: during.append(Value.__init__)):
+                interpreter.run(lines(PROGRAM))
+            with self.subTest(options=options):
+                self.assertEqual(during[0] is not unobserved, observed)
+                self.assertIs(Value.__init__, unobserved)
+
+    def test_async(self):
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        async def both():
+            counted = Interpreter(False, None, False, stats=True)
+            await asyncio.gather(counted.run_async(lines(PROGRAM), yield_every=10),
+                                 Interpreter(False).run_async(lines(PROGRAM), yield_every=10))
+            return counted.get_stats()
+
+        self.assertEqual(asyncio.run(both()), run_program(PROGRAM, stats=True).get_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for the streaming parser (see stream_parserv2) and streaming loads.
+"""
+
+import glob
+import os
+import tempfile
+import unittest
+
+from batchv2 import program_hash
+from bparser import BParser
+from intbase import ErrorType
+from stream_parserv2 import ParseError, parse_stream
+from tests.support import ROOT, Interpreter, lines
+
+
+PROGRAM = lines("""
+(class animal  # a comment (with parentheses)
+ (method string speak () (return "...(not code)"))
+)
+(class dog inherits animal
+ (method string speak () (return "woof"))
+)
+(class main
+ (method void main () (print (call (new dog) speak)))
+)
+""")
+
+MALFORMED = [
+    ["(class main (method void main () (print 1))))"],
+    ['(class main (method void main () (print "oops)))'],
+    ["(class main (method void main () (print 1))"],
+]
+
+
+def with_lines(item):
+    # a parsed item as nested (token, line number) pairs, to compare line numbers too
+    if isinstance(item, list):
+        return [with_lines(child) for child in item]
+    return (str(item), item.line_num)
+
+
+def stream(source):
+    items = []
+    try:
+        for item in parse_stream(source):
+            items.append(with_lines(item))
+    except ParseError as error:
+        return False, str(error), items
+    return True, items, items
+
+
+def parse(source):
+    status, parsed = BParser.parse(source)
+    return status, with_lines(parsed) if status else parsed
+
+
+class StreamingParserTest(unittest.TestCase):
+    """parse_stream yields what BParser.parse returns, one top-level form at a time."""
+
+    def test_matches_bparser(self):
+        programs = sorted(glob.glob(os.path.join(ROOT, "v2", "*", "*.brewin"))) + [None]
+        for path in programs:
+            if path is None:
+                source = PROGRAM
+            else:
+                with open(path, encoding="utf-8") as file:
+                    source = file.readlines()
+            with self.subTest(path=path):
+                self.assertEqual(stream(source)[:2], parse(source))
+
+    def test_errors_match_bparser(self):
+        for source in MALFORMED:
+            with self.subTest(source=source):
+                status, message, _ = stream(source)
+                self.assertFalse(status)
+                self.assertEqual((status, message), parse(source))
+        self.assertEqual([stream(source)[1] for source in MALFORMED],
+                         ["Extra closing parenthesis", "Unclosed string", "Unclosed parenthesis"])
+
+    def test_items_before_error(self):
+        _, _, items = stream(PROGRAM + [")"])
+        self.assertEqual([item[1][0] for item in items], ["animal", "dog", "main"])
+
+    def test_yields_as_classes_complete(self):
+        read = []
+
+        def reading():
+            for line in PROGRAM:
+                read.append(line)
+                yield line
+
+        items = parse_stream(reading())
+        first = next(items)
+        self.assertEqual(str(first[1]), "animal")
+        self.assertEqual(len(read), 3)  # the class ends on line 3
+        self.assertEqual(len(list(items)), 2)
+        self.assertEqual(len(read), len(PROGRAM))
+
+
+class StreamingLoadTest(unittest.TestCase):
+    """Interpreter(streaming=True) loads classes as they are read."""
+
+    def test_runs_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "program.brewin")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("\n".join(PROGRAM) + "\n")
+            interpreter = Interpreter(False, streaming=True)
+            with open(path, encoding="utf-8") as file:
+                interpreter.run(file)
+        self.assertEqual(interpreter.get_output(), ["woof"])
+        self.assertEqual(interpreter.program.source_hash, program_hash(PROGRAM))
+
+    def test_syntax_error(self):
+        interpreter = Interpreter(False, streaming=True)
+        with self.assertRaises(Exception):
+            interpreter.load(iter(MALFORMED[2]))
+        self.assertEqual(interpreter.get_error_type_and_line()[0], ErrorType.SYNTAX_ERROR)
+
+    def test_load_error_before_syntax_error(self):
+        # the bad class is loaded, and reported, before the parser reaches the unclosed (class
+        source = ["(class dog inherits nothing (method void f () (print 1)))", "(class main"]
+        interpreter = Interpreter(False, streaming=True)
+        with self.assertRaises(Exception):
+            interpreter.load(iter(source))
+        self.assertEqual(interpreter.get_error_type_and_line(), (ErrorType.NAME_ERROR, 0))
+        interpreter = Interpreter(False)
+        with self.assertRaises(Exception):
+            interpreter.load(source)
+        self.assertEqual(interpreter.get_error_type_and_line()[0], ErrorType.SYNTAX_ERROR)
+
+
+if __name__ == "__main__":
+    unittest.main()
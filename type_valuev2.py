@@ -2,6 +2,9 @@
 Module that contains the Value definition and associated type constructs.
 """
 
+import contextlib
+import contextvars
+import threading
 from enum import Enum
 from intbase import InterpreterBase
 
@@ -16,6 +19,12 @@ class Type(Enum):
     NOTHING = 5
 
 
+# observers of the Values allocated by the current run (see statsv2.observing_values), or
+# None; a context variable, so that each thread and asyncio task only sees its own run's.
+# Value.__init__ only looks it up while some run is observed (see observed_values)
+VALUE_OBSERVERS = contextvars.ContextVar("value_observers", default=None)
+
+
 # Represents a value, which has a type and its value
 class Value:
     """A representation for a value that contains a type tag."""
@@ -39,6 +48,95 @@ class Value:
         self.__value = other.value()
 
 
+__UNOBSERVED_INIT = Value.__init__
+
+
+def __observed_init(self, value_type, value=None, class_name=None):
+    __UNOBSERVED_INIT(self, value_type, value, class_name)
+    observers = VALUE_OBSERVERS.get()
+    if observers is not None:
+        for observer in observers:
+            observer.value_created(self)
+
+
+__observed_runs = 0
+__observed_runs_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def observed_values():
+    """
+    While the block runs, Value.__init__ passes each new Value to the observers in
+    VALUE_OBSERVERS. Outside of such blocks (in every thread) it doesn't look them up at all,
+    so runs without stats or heap profiling don't pay for them.
+    """
+    global __observed_runs  # pylint: disable=global-statement
+    with __observed_runs_lock:
+        __observed_runs += 1
+        Value.__init__ = __observed_init
+    try:
+        yield
+    finally:
+        with __observed_runs_lock:
+            __observed_runs -= 1
+            if not __observed_runs:
+                Value.__init__ = __UNOBSERVED_INIT
+
+
+class StringRope:
+    """
+    Lazily joined string value produced by Brewin string concatenation.
+
+    Ropes built from one another share a single list of parts; a rope covers the first
+    `count` entries of that list. Appending to the rope that covers the whole list just
+    pushes onto the list, so a loop like (set s (+ s "x")) runs in amortized O(1) per append
+    instead of copying s every time. The parts are only joined (and cached) when the string
+    is needed as a whole, e.g., to compare or print it.
+    """
+
+    # strings shorter than this are concatenated eagerly; a rope isn't worth it
+    MIN_LENGTH = 64
+
+    __slots__ = ("parts", "count", "length", "flat")
+
+    def __init__(self, parts, count, length):
+        self.parts = parts
+        self.count = count
+        self.length = length
+        self.flat = None
+
+    @staticmethod
+    def concat(left, right):
+        """
+        Concatenates two string payloads (str or StringRope), returning a str or a StringRope.
+        """
+        if isinstance(right, StringRope):
+            right = str(right)
+        if isinstance(left, StringRope):
+            if left.count == len(left.parts):  # left is the newest rope on its parts list
+                left.parts.append(right)
+                return StringRope(left.parts, left.count + 1, left.length + len(right))
+            # someone already appended to this rope's parts list; start a new one
+            return StringRope([str(left), right], 2, left.length + len(right))
+        if len(left) + len(right) < StringRope.MIN_LENGTH:
+            return left + right
+        return StringRope([left, right], 2, len(left) + len(right))
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = "".join(self.parts[:self.count])
+        return self.flat
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+
 # pylint: disable=too-many-return-statements
 def create_value(val, class_name=None):
     """